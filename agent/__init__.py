@@ -7,7 +7,8 @@ from agent.nabahan_logic import (
     get_filter_options,
     get_kpi_stats,
     get_activity_chart_data,
-    get_nature_chart_data
+    get_nature_chart_data,
+    invalidate_reference_cache
 )
 
 from agent.config import (
@@ -26,6 +27,7 @@ __all__ = [
     'get_kpi_stats',
     'get_activity_chart_data',
     'get_nature_chart_data',
+    'invalidate_reference_cache',
     'GROQ_API_KEY',
     'GROQ_MODEL_NAME',
     'DB_PATH',
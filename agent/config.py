@@ -31,11 +31,27 @@ def get_api_key():
 GROQ_API_KEY = get_api_key()
 GROQ_MODEL_NAME = os.getenv("GROQ_MODEL_NAME", "llama-3.3-70b-versatile")
 
+# --- LLM RESPONSE CACHE ---
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+LLM_CACHE_MAX_TEMPERATURE = 0.3  # Only cache near-deterministic calls
+
+# --- SEMANTIC CACHE ---
+# Opt-in: numbers and names must also match exactly, but paraphrase hits remain approximate
+USE_SEMANTIC_CACHE = os.getenv("USE_SEMANTIC_CACHE", "false").lower() == "true"
+SEMANTIC_CACHE_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+SEMANTIC_CACHE_THRESHOLD = 0.87  # Cosine similarity for a cache hit
+SEMANTIC_CACHE_MAX_ENTRIES = 5000
+
 # --- DATABASE CONFIGURATION ---
 BASE_DIR = Path(__file__).parent.parent
 DB_PATH = str(BASE_DIR / "Database" / "nabahan.db")
 DATABASE_PATH = DB_PATH  # Alias for compatibility
 
+# --- LOCAL CACHE ---
+CACHE_DIR = BASE_DIR / ".cache"
+VANNA_CHROMA_PATH = str(CACHE_DIR / "chroma")
+VANNA_TRAINED_MARKER = CACHE_DIR / ".vanna_trained"
+
 # --- TABLE NAMES ---
 TABLE_NAMES = [
     'tenders_full_details',
@@ -69,6 +85,15 @@ VANNA_DOCUMENTATION = """
 
 # --- EVALUATION CONFIGURATION ---
 EVAL_LOG_PATH = str(BASE_DIR / "logs" / "eval_results.csv")
+EVAL_MAX_WORKERS = 4  # Test cases evaluated concurrently (agent calls are I/O bound)
+EVAL_AGENT_CACHE_PATH = str(CACHE_DIR / "eval_agent_cache.pkl")
+EVAL_AGENT_CACHE_VERSION = "1"  # Bump when agent behaviour changes to invalidate cached responses
+
+# --- AGENT RETRIES ---
+AGENT_MAX_ATTEMPTS = 3
+AGENT_HEDGE_DELAY_SECONDS = 1.5  # Start a speculative attempt if the current one is slower
+AGENT_ATTEMPT_WORKERS = 8
+AGENT_RETRY_TEMPERATURE = 0.5  # Retries/hedges sample different SQL (above LLM_CACHE_MAX_TEMPERATURE: never cached)
 
 # --- OUT OF SCOPE MESSAGE ---
 OUT_OF_SCOPE_MESSAGE = "عذرا، غير متوفرة البيانات اللازمة لتحليل هذا السؤال."
@@ -109,6 +134,9 @@ DATABASE_SCHEMA = """
 """
 
 # --- SQL GENERATION PROMPT ---
+# System prompts must stay byte-identical across calls (static text only) so
+# providers with prompt caching can reuse the prefix; per-question data goes
+# in the user message.
 SQL_SYSTEM_PROMPT = f"""انت خبير في كتابة استعلامات SQL لقاعدة بيانات المشتريات الحكومية السعودية.
 
 {DATABASE_SCHEMA}
@@ -134,6 +162,9 @@ Q: توزيع المناقصات حسب الحالة
 SQL: SELECT tender_status, COUNT(*) as count FROM tenders_full_details GROUP BY tender_status ORDER BY count DESC
 """
 
+# Characters of streamed SQL inspected before aborting a non-SELECT generation
+SQL_STREAM_GUARD_CHARS = 20
+
 # --- INSIGHTS PROMPT ---
 INSIGHTS_SYSTEM_PROMPT = """انت محلل بيانات متخصص في المشتريات الحكومية السعودية.
 
@@ -143,10 +174,17 @@ INSIGHTS_SYSTEM_PROMPT = """انت محلل بيانات متخصص في الم
 3. قدم تحليل موجز بالعربية
 4. لا تستخدم رموز تعبيرية
 5. اذكر الارقام من البيانات
+6. حلل البيانات المرسلة في رسالة المستخدم
 
 اجب بتنسيق JSON:
 {"insights": "التحليل", "chart_type": "bar او pie او line او none"}
 """
 
+# Maximum columns sent to the insights prompt
+INSIGHTS_MAX_COLUMNS = 20
+
+# (label, number) results up to this many rows get templated insights (no LLM call)
+TEMPLATED_INSIGHTS_MAX_ROWS = 10
+
 # --- VALID CHART TYPES ---
 VALID_CHART_TYPES = ["bar", "pie", "line", "none"]
@@ -5,9 +5,24 @@ import sqlite3
 import pandas as pd
 import json
 import re
-from typing import Dict, Any, Optional, List
+import hashlib
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import lru_cache
+from typing import Dict, Any, Optional, List, Tuple, Callable
 from groq import Groq
 
+try:
+    import ahocorasick
+except ImportError:  # Optional: falls back to a compiled regex
+    ahocorasick = None
+
+try:
+    import orjson
+except ImportError:  # Optional: falls back to the json module
+    orjson = None
+
 from agent.config import (
     GROQ_API_KEY,
     GROQ_MODEL_NAME,
@@ -15,8 +30,19 @@ from agent.config import (
     SQL_SYSTEM_PROMPT,
     INSIGHTS_SYSTEM_PROMPT,
     OUT_OF_SCOPE_MESSAGE,
-    VALID_CHART_TYPES
+    VALID_CHART_TYPES,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MAX_TEMPERATURE,
+    USE_SEMANTIC_CACHE,
+    INSIGHTS_MAX_COLUMNS,
+    TEMPLATED_INSIGHTS_MAX_ROWS,
+    SQL_STREAM_GUARD_CHARS,
+    AGENT_MAX_ATTEMPTS,
+    AGENT_HEDGE_DELAY_SECONDS,
+    AGENT_RETRY_TEMPERATURE,
+    AGENT_ATTEMPT_WORKERS
 )
+from agent.semantic_cache import get_semantic_cache
 
 # Initialize Groq client
 groq_client = Groq(api_key=GROQ_API_KEY)
@@ -28,6 +54,122 @@ USE_VANNA = False
 # Lazy-loaded Vanna instance
 _vanna = None
 
+# Shared pool for SQL attempts (threads keep their SQLite connections between queries)
+_attempt_executor = ThreadPoolExecutor(max_workers=AGENT_ATTEMPT_WORKERS, thread_name_prefix="nabahan-attempt")
+
+# Per-thread SQLite connections (sqlite3 objects must stay on their thread)
+_thread_local = threading.local()
+
+# Connection-level tuning applied once per connection
+_SQLITE_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536"
+)
+
+# Fixed reference queries (kept as constants so the statement cache reuses them)
+_SQL_FILTER_OPTIONS = """
+    SELECT 'regions' AS kind, region_name AS v, 0 AS c FROM regions
+    UNION ALL
+    SELECT 'tender_statuses', status_name, 0 FROM tender_statuses
+    UNION ALL
+    SELECT 'government_entity', v, c FROM (
+        SELECT government_entity AS v, COUNT(*) AS c
+        FROM tenders_full_details
+        GROUP BY government_entity
+        ORDER BY c DESC LIMIT 50
+    )
+    ORDER BY kind, c DESC, v
+"""
+_SQL_KPI_COUNTS = """
+    SELECT
+        (SELECT COUNT(*) FROM tenders_full_details),
+        (SELECT COUNT(*) FROM future_projects),
+        (SELECT COUNT(*) FROM government_entity),
+        (SELECT COUNT(*) FROM primary_activity)
+"""
+_SQL_TOP_ACTIVITIES = """
+    SELECT competition_activity as activity, COUNT(*) as count
+    FROM tenders_full_details
+    WHERE competition_activity IS NOT NULL
+    GROUP BY competition_activity
+    ORDER BY count DESC LIMIT 10
+"""
+_SQL_NATURE_DISTRIBUTION = """
+    SELECT project_nature, COUNT(*) as count
+    FROM future_projects
+    WHERE project_nature IS NOT NULL
+    GROUP BY project_nature
+    ORDER BY count DESC LIMIT 8
+"""
+_SQL_ANCHOR_NAMES = """
+    SELECT region_name FROM regions
+    UNION
+    SELECT entity_name FROM government_entity
+"""
+_STATEMENT_CACHE_SIZE = 128
+
+# Indexes on frequently filtered / grouped columns (created once)
+_INDEX_MIGRATIONS = (
+    "CREATE INDEX IF NOT EXISTS idx_tfd_entity ON tenders_full_details(government_entity)",
+    "CREATE INDEX IF NOT EXISTS idx_tfd_status ON tenders_full_details(tender_status)",
+    "CREATE INDEX IF NOT EXISTS idx_tfd_activity ON tenders_full_details(competition_activity)",
+    "CREATE INDEX IF NOT EXISTS idx_tfd_loc ON tenders_full_details(execution_location)",
+    "CREATE INDEX IF NOT EXISTS idx_fp_nature ON future_projects(project_nature)",
+    "CREATE INDEX IF NOT EXISTS idx_fp_entity ON future_projects(government_entity)",
+    "ANALYZE"
+)
+
+# Trigram FTS5 indexes over execution_location (substring match, same as LIKE '%..%')
+_LOCATION_FTS_TABLES = {
+    'tenders_full_details': 'tfd_loc_fts',
+    'future_projects': 'fp_loc_fts'
+}
+_FTS_MIN_QUERY_LENGTH = 3  # Trigram tokenizer cannot match shorter strings
+
+_db_write_lock = threading.Lock()
+_indexes_ready = False
+_fts_ready = False
+
+# Precompiled SQL cleanup patterns
+_RE_SQL_FENCE = re.compile(r'```(?:sql)?\s*')
+_RE_WITH_FP = re.compile(r'WITH\s+future_projects\s+AS', re.IGNORECASE)
+_RE_WITH_T = re.compile(r'WITH\s+tenders_full_details\s+AS', re.IGNORECASE)
+_RE_SQL_START = re.compile(r'(?:SQL:\s*)?(WITH|SELECT|--)', re.IGNORECASE)
+# FROM clause naming one unaliased table, with no joins or subqueries
+_RE_SINGLE_FROM = re.compile(r'\bFROM\s+(\w+)\s*(?:WHERE\b|GROUP\s+BY\b|ORDER\s+BY\b|LIMIT\b|;|$)', re.IGNORECASE)
+
+# Scope keywords, matched as substrings in a single regex scan
+_SCOPE_KEYWORDS = frozenset([
+    'مناقصة', 'مناقصات', 'منافسة', 'منافسات', 'مشروع', 'مشاريع',
+    'جهة', 'جهات', 'حكومية', 'وزارة', 'هيئة', 'منطقة', 'مناطق',
+    'الرياض', 'مكة', 'جدة', 'نشاط', 'انشطة', 'حالة', 'نوع',
+    'عدد', 'كم', 'اجمالي', 'توزيع', 'احصائيات', 'سنة', 'ربع'
+])
+_SCOPE_RE = re.compile('|'.join(map(re.escape, sorted(_SCOPE_KEYWORDS, key=len, reverse=True))))
+
+
+def _build_scope_automaton():
+    """Build an Aho-Corasick automaton over the scope keywords (None if unavailable)."""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for kw in _SCOPE_KEYWORDS:
+        automaton.add_word(kw, kw)
+    automaton.make_automaton()
+    return automaton
+
+
+_SCOPE_AUTOMATON = _build_scope_automaton()
+
+# Exact-match LLM response cache: key -> (content, expiry_ts)
+_llm_cache: Dict[str, tuple] = {}
+_llm_cache_lock = threading.Lock()
+
+# In-flight LLM requests: key -> Future, so concurrent identical calls share one request
+_llm_inflight: Dict[str, Future] = {}
+
 
 def get_vanna():
     """Get Vanna instance (lazy initialization)."""
@@ -42,17 +184,271 @@ def get_vanna():
     return _vanna
 
 
-def execute_sql(sql_query: str) -> pd.DataFrame:
-    """Execute SQL query on SQLite database."""
+def _llm_cache_key(model: str, messages: List[Dict], temperature: float, **kwargs) -> Optional[str]:
+    """SHA-256 cache key for a completion request (None if not cacheable)."""
+    if temperature > LLM_CACHE_MAX_TEMPERATURE:
+        return None
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature, "kwargs": kwargs},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _llm_cache_get(key: Optional[str]) -> Optional[str]:
+    """Return cached content for a key if present and not expired."""
+    if key is None:
+        return None
+    with _llm_cache_lock:
+        entry = _llm_cache.get(key)
+        if entry is not None:
+            content, expiry = entry
+            if expiry > time.time():
+                return content
+            del _llm_cache[key]
+    return None
+
+
+def _llm_cache_put(key: Optional[str], content: str):
+    """Store content under a key with the configured TTL."""
+    if key is None:
+        return
+    with _llm_cache_lock:
+        _llm_cache[key] = (content, time.time() + LLM_CACHE_TTL_SECONDS)
+
+
+def _single_flight(key: Optional[str], call: Callable[[], str]) -> str:
+    """
+    Run call once per cache key; concurrent callers with the same key wait for
+    that result instead of sending a duplicate request (e.g. hedged attempts).
+    """
+    if key is None:
+        return call()
+
+    with _llm_cache_lock:
+        future = _llm_inflight.get(key)
+        owner = future is None
+        if owner:
+            future = _llm_inflight[key] = Future()
+    if not owner:
+        return future.result()
+
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            return pd.read_sql_query(sql_query, conn)
+        # A request that finished between the caller's cache check and here
+        content = _llm_cache_get(key)
+        if content is None:
+            content = call()
+        future.set_result(content)
+        return content
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _llm_cache_lock:
+            _llm_inflight.pop(key, None)
+
+
+def _cached_completion(model: str, messages: List[Dict], temperature: float, **kwargs) -> str:
+    """
+    Call Groq chat completion with an exact-match TTL cache.
+    Only low-temperature (near-deterministic) calls are cached.
+    Returns the message content.
+    """
+    key = _llm_cache_key(model, messages, temperature, **kwargs)
+    content = _llm_cache_get(key)
+    if content is not None:
+        return content
+
+    def call() -> str:
+        completion = groq_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            **kwargs
+        )
+        content = completion.choices[0].message.content
+        _llm_cache_put(key, content)
+        return content
+
+    return _single_flight(key, call)
+
+
+def _streamed_sql_completion(model: str, messages: List[Dict], temperature: float, **kwargs) -> str:
+    """
+    Stream a SQL completion and stop early:
+    - abort if the first characters are not a SELECT/WITH query (returns "")
+    - stop reading at the closing ``` fence once the query has started
+    Complete (non-aborted) results share the exact-match cache.
+    """
+    key = _llm_cache_key(model, messages, temperature, **kwargs)
+    content = _llm_cache_get(key)
+    if content is not None:
+        return content
+    return _single_flight(key, lambda: _stream_sql(model, messages, temperature, key, **kwargs))
+
+
+def _stream_sql(model: str, messages: List[Dict], temperature: float, key: Optional[str], **kwargs) -> str:
+    """Send one streaming SQL request (see _streamed_sql_completion)."""
+    stream = groq_client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        stream=True,
+        **kwargs
+    )
+
+    text = ""
+    checked = False
+    try:
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            text += delta
+
+            body = _RE_SQL_FENCE.sub('', text, count=1).lstrip()
+            if not checked and len(body) >= SQL_STREAM_GUARD_CHARS:
+                if not _RE_SQL_START.match(body):
+                    return ""
+                checked = True
+
+            # Closing fence after the query body: nothing useful follows
+            if checked and '```' in body:
+                text = body[:body.index('```')]
+                break
+    finally:
+        stream.close()
+
+    _llm_cache_put(key, text)
+    return text
+
+
+def clear_llm_cache():
+    """Clear the LLM response cache."""
+    with _llm_cache_lock:
+        _llm_cache.clear()
+
+
+def _build_location_fts(conn: sqlite3.Connection):
+    """Create and populate the location FTS5 tables with sync triggers."""
+    for table, fts in _LOCATION_FTS_TABLES.items():
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (fts,)
+        ).fetchone()
+        if exists:
+            continue
+
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE {fts} USING fts5(
+                execution_location, tokenize='trigram',
+                content='{table}', content_rowid='rowid'
+            )
+        """)
+        conn.execute(f"INSERT INTO {fts}({fts}) VALUES('rebuild')")
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts}(rowid, execution_location)
+                VALUES (new.rowid, new.execution_location);
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, execution_location)
+                VALUES ('delete', old.rowid, old.execution_location);
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF execution_location ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, execution_location)
+                VALUES ('delete', old.rowid, old.execution_location);
+                INSERT INTO {fts}(rowid, execution_location)
+                VALUES (new.rowid, new.execution_location);
+            END
+        """)
+
+
+def _ensure_indexes(conn: sqlite3.Connection):
+    """Create query indexes once per process (skipped if the database is read-only)."""
+    global _indexes_ready, _fts_ready
+    with _db_write_lock:
+        if _indexes_ready:
+            return
+        try:
+            for statement in _INDEX_MIGRATIONS:
+                conn.execute(statement)
+        except sqlite3.Error as e:
+            print(f"Index migration skipped: {e}")
+        try:
+            _build_location_fts(conn)
+            _fts_ready = True
+        except sqlite3.Error as e:
+            print(f"Location FTS index skipped: {e}")
+        _indexes_ready = True
+
+
+def _get_connection() -> sqlite3.Connection:
+    """Get this thread's SQLite connection (created once per thread)."""
+    conn = getattr(_thread_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, isolation_level=None, cached_statements=_STATEMENT_CACHE_SIZE)
+        for pragma in _SQLITE_PRAGMAS:
+            conn.execute(pragma)
+        _ensure_indexes(conn)
+        _thread_local.conn = conn
+    return conn
+
+
+def execute_sql(sql_query: str, params: Tuple = ()) -> pd.DataFrame:
+    """Execute SQL query on SQLite database with optional bound parameters."""
+    try:
+        return pd.read_sql_query(sql_query, _get_connection(), params=params)
     except Exception as e:
         raise Exception(f"SQL error: {str(e)}")
 
 
-def generate_sql(question: str, filters: Optional[Dict] = None) -> str:
-    """Generate SQL using Vanna AI or Groq LLM (based on USE_VANNA flag)."""
+# Groq SQL generation settings (also part of the exact-match cache key)
+_SQL_COMPLETION_KWARGS = {"temperature": 0, "max_tokens": 500}
+
+
+def _sql_messages(question: str, filters: Optional[Dict]) -> List[Dict]:
+    """Chat messages for Groq SQL generation."""
+    # Build filter context
+    filter_text = ""
+    if filters:
+        parts = []
+        if filters.get('regions'):
+            parts.append(f"المناطق: {', '.join(filters['regions'])}")
+        if filters.get('government_entity'):
+            parts.append(f"الجهات: {', '.join(filters['government_entity'][:5])}")
+        if filters.get('tender_statuses'):
+            parts.append(f"الحالات: {', '.join(filters['tender_statuses'])}")
+        if parts:
+            filter_text = f"\nالفلاتر: {' | '.join(parts)}"
+
+    # Dynamic content goes last so the system prompt stays a stable cacheable prefix
+    user_prompt = f"السؤال: {question}{filter_text}\n\nSQL:"
+    return [
+        {"role": "system", "content": SQL_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def _evict_sql_cache(question: str, filters: Optional[Dict]):
+    """Drop the cached SQL for a question so a failed query is not replayed."""
+    key = _llm_cache_key(GROQ_MODEL_NAME, _sql_messages(question, filters), **_SQL_COMPLETION_KWARGS)
+    if key is not None:
+        with _llm_cache_lock:
+            _llm_cache.pop(key, None)
+
+
+def generate_sql(question: str, filters: Optional[Dict] = None, attempt: int = 0) -> Tuple[str, Tuple]:
+    """
+    Generate SQL using Vanna AI or Groq LLM (based on USE_VANNA flag).
+    Returns (sql, params) where params bind the filter placeholders.
+    Attempts after the first sample at AGENT_RETRY_TEMPERATURE, so they can
+    return different SQL and bypass the exact-match cache.
+    """
 
     sql = None
 
@@ -70,71 +466,79 @@ def generate_sql(question: str, filters: Optional[Dict] = None) -> str:
 
     # Fall back to direct Groq if Vanna not used or failed
     if sql is None:
-        # Build filter context
-        filter_text = ""
-        if filters:
-            parts = []
-            if filters.get('regions'):
-                parts.append(f"المناطق: {', '.join(filters['regions'])}")
-            if filters.get('government_entity'):
-                parts.append(f"الجهات: {', '.join(filters['government_entity'][:5])}")
-            if filters.get('tender_statuses'):
-                parts.append(f"الحالات: {', '.join(filters['tender_statuses'])}")
-            if parts:
-                filter_text = f"\nالفلاتر: {' | '.join(parts)}"
-
-        user_prompt = f"السؤال: {question}{filter_text}\n\nSQL:"
-
         try:
-            completion = groq_client.chat.completions.create(
+            content = _streamed_sql_completion(
                 model=GROQ_MODEL_NAME,
-                messages=[
-                    {"role": "system", "content": SQL_SYSTEM_PROMPT},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0,
-                max_tokens=500
+                messages=_sql_messages(question, filters),
+                **(_SQL_COMPLETION_KWARGS if attempt == 0
+                   else {**_SQL_COMPLETION_KWARGS, "temperature": AGENT_RETRY_TEMPERATURE})
             )
 
-            sql = completion.choices[0].message.content.strip()
+            sql = content.strip()
 
         except Exception as e:
             raise Exception(f"SQL generation error: {str(e)}")
 
     # Clean SQL
-    sql = re.sub(r'```sql\s*', '', sql)
-    sql = re.sub(r'```\s*', '', sql)
+    sql = _RE_SQL_FENCE.sub('', sql)
     sql = sql.strip()
 
     # Fix circular references
-    sql = re.sub(r'WITH\s+future_projects\s+AS', 'WITH fp_data AS', sql, flags=re.IGNORECASE)
-    sql = re.sub(r'WITH\s+tenders_full_details\s+AS', 'WITH t_data AS', sql, flags=re.IGNORECASE)
+    sql = _RE_WITH_FP.sub('WITH fp_data AS', sql)
+    sql = _RE_WITH_T.sub('WITH t_data AS', sql)
 
     # Apply filters
+    params: Tuple = ()
     if filters:
-        sql = apply_filters(sql, filters)
+        sql, params = apply_filters(sql, filters)
+
+    return sql, params
 
-    return sql
+
+def _location_fts_table(sql: str) -> Optional[str]:
+    """
+    Return the location FTS table when the query reads a single unaliased base table.
+
+    The filter references a bare rowid, so joins, aliases, subqueries and CTEs
+    keep the LIKE path.
+    """
+    _get_connection()  # Ensures the FTS migration has run
+    if not _fts_ready:
+        return None
+    if sql.upper().count('FROM') != 1:
+        return None
+    m = _RE_SINGLE_FROM.search(sql.strip())
+    return _LOCATION_FTS_TABLES.get(m.group(1).lower()) if m else None
 
 
-def apply_filters(sql: str, filters: Dict) -> str:
-    """Apply filters to SQL query."""
+def apply_filters(sql: str, filters: Dict) -> Tuple[str, Tuple]:
+    """Apply filters to SQL query as ?-placeholders. Returns (sql, params)."""
     where_parts = []
+    params = []
 
     if filters.get('regions'):
-        conds = [f"execution_location LIKE '%{r}%'" for r in filters['regions']]
-        where_parts.append(f"({' OR '.join(conds)})")
+        regions = filters['regions']
+        fts = _location_fts_table(sql)
+        if fts and all(len(r) >= _FTS_MIN_QUERY_LENGTH for r in regions):
+            where_parts.append(f"rowid IN (SELECT rowid FROM {fts} WHERE {fts} MATCH ?)")
+            params.append(' OR '.join('"' + r.replace('"', '""') + '"' for r in regions))
+        else:
+            conds = ["execution_location LIKE ?"] * len(regions)
+            where_parts.append(f"({' OR '.join(conds)})")
+            params.extend(f"%{r}%" for r in regions)
 
     if filters.get('government_entity'):
-        ents = [f"'{e}'" for e in filters['government_entity']]
-        where_parts.append(f"government_entity IN ({', '.join(ents)})")
+        ents = filters['government_entity']
+        where_parts.append(f"government_entity IN ({', '.join('?' * len(ents))})")
+        params.extend(ents)
 
     if filters.get('tender_statuses'):
-        conds = [f"tender_status LIKE '%{s}%'" for s in filters['tender_statuses']]
+        conds = ["tender_status LIKE ?"] * len(filters['tender_statuses'])
         where_parts.append(f"({' OR '.join(conds)})")
+        params.extend(f"%{s}%" for s in filters['tender_statuses'])
 
     if not where_parts:
-        return sql
+        return sql, ()
 
     filter_clause = ' AND '.join(where_parts)
     sql_upper = sql.upper()
@@ -151,7 +555,38 @@ def apply_filters(sql: str, filters: Dict) -> str:
         else:
             sql += f" WHERE {filter_clause}"
 
-    return sql
+    return sql, tuple(params)
+
+
+def _format_number(value: Any) -> str:
+    """Format a numeric value with thousands separators."""
+    value = float(value)
+    return f"{value:,.0f}" if value.is_integer() else f"{value:,.2f}"
+
+
+def _templated_insights(question: str, data: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """
+    Build insights without the LLM for simple result shapes:
+    a single numeric value, or up to 10 (label, number) rows.
+    Returns None when the data needs real analysis.
+    """
+    if data.shape[1] > 2 or not pd.api.types.is_numeric_dtype(data.iloc[:, -1]):
+        return None
+
+    if len(data) == 1 and pd.notna(data.iloc[0, -1]):
+        return {
+            "insights": f"نتيجة الاستعلام عن \"{question}\" هي: {_format_number(data.iloc[0, -1])}",
+            "chart_type": "none"
+        }
+
+    if data.shape[1] == 2 and len(data) <= TEMPLATED_INSIGHTS_MAX_ROWS and data.iloc[:, -1].notna().all():
+        lines = [f"- {label}: {_format_number(value)}" for label, value in data.itertuples(index=False)]
+        return {
+            "insights": f"نتائج الاستعلام عن \"{question}\" ({len(data)} صف):\n" + "\n".join(lines),
+            "chart_type": "bar"
+        }
+
+    return None
 
 
 def generate_insights(question: str, data: pd.DataFrame, sql: str) -> Dict[str, Any]:
@@ -160,13 +595,22 @@ def generate_insights(question: str, data: pd.DataFrame, sql: str) -> Dict[str,
     if data.empty:
         return {"insights": OUT_OF_SCOPE_MESSAGE, "chart_type": "none"}
 
-    # Prepare data summary
-    cols = ', '.join(data.columns.tolist())
-    rows_str = data.head(15).to_string(index=False)
+    # Simple shapes don't need an LLM round-trip
+    templated = _templated_insights(question, data)
+    if templated is not None:
+        return templated
 
-    numeric_stats = ""
-    for col in data.select_dtypes(include=['number']).columns:
-        numeric_stats += f"\n{col}: مجموع={data[col].sum():.0f}, متوسط={data[col].mean():.1f}"
+    # Prepare data summary (bounded to keep the prompt small)
+    sample = data.iloc[:15, :INSIGHTS_MAX_COLUMNS]
+    cols = ', '.join(map(str, sample.columns))
+    rows_str = sample.to_csv(index=False)
+
+    numeric = sample.columns.intersection(data.select_dtypes(include=['number']).columns)
+    stats = data[numeric].agg(['sum', 'mean'])
+    numeric_stats = "".join(
+        f"\n{col}: مجموع={stats.at['sum', col]:.0f}, متوسط={stats.at['mean', col]:.1f}"
+        for col in numeric
+    )
 
     user_prompt = f"""السؤال: {question}
 
@@ -176,12 +620,10 @@ SQL: {sql}
 الاعمدة: {cols}
 
 {rows_str}
-{numeric_stats}
-
-حلل البيانات واجب بـ JSON."""
+{numeric_stats}"""
 
     try:
-        completion = groq_client.chat.completions.create(
+        content = _cached_completion(
             model=GROQ_MODEL_NAME,
             messages=[
                 {"role": "system", "content": INSIGHTS_SYSTEM_PROMPT},
@@ -191,7 +633,7 @@ SQL: {sql}
             response_format={"type": "json_object"}
         )
 
-        resp = json.loads(completion.choices[0].message.content)
+        resp = orjson.loads(content) if orjson is not None else json.loads(content)
         insights = resp.get('insights', OUT_OF_SCOPE_MESSAGE)
         chart = resp.get('chart_type', 'none').lower()
 
@@ -206,13 +648,9 @@ SQL: {sql}
 
 def is_in_scope(question: str) -> bool:
     """Check if question is within database scope."""
-    keywords = [
-        'مناقصة', 'مناقصات', 'منافسة', 'منافسات', 'مشروع', 'مشاريع',
-        'جهة', 'جهات', 'حكومية', 'وزارة', 'هيئة', 'منطقة', 'مناطق',
-        'الرياض', 'مكة', 'جدة', 'نشاط', 'انشطة', 'حالة', 'نوع',
-        'عدد', 'كم', 'اجمالي', 'توزيع', 'احصائيات', 'سنة', 'ربع'
-    ]
-    return any(kw in question for kw in keywords)
+    if _SCOPE_AUTOMATON is not None:
+        return next(_SCOPE_AUTOMATON.iter(question), None) is not None
+    return _SCOPE_RE.search(question) is not None
 
 
 def nabahan_agent(question: str, filters: Optional[Dict] = None) -> Dict[str, Any]:
@@ -231,133 +669,184 @@ def nabahan_agent(question: str, filters: Optional[Dict] = None) -> Dict[str, An
             "sql": ""
         }
 
-    for attempt in range(3):
-        try:
-            # Generate SQL
-            sql = generate_sql(question, filters)
-
-            # Validate
-            if not sql or 'SELECT' not in sql.upper():
-                continue
-
-            # Execute
-            data = execute_sql(sql)
-
-            if data.empty and attempt < 2:
-                continue
-
-            if data.empty:
-                return {
-                    "status": "no_data",
-                    "data": pd.DataFrame(),
-                    "insights": OUT_OF_SCOPE_MESSAGE,
-                    "chart_type": "none",
-                    "sql": sql
-                }
-
-            # Generate insights
-            result = generate_insights(question, data, sql)
-
-            return {
-                "status": "success",
-                "data": data,
-                "insights": result["insights"],
-                "chart_type": result["chart_type"],
-                "sql": sql
-            }
+    # Check semantic cache for a paraphrase of a previous question
+    if USE_SEMANTIC_CACHE:
+        cached = get_semantic_cache(_load_anchor_names).lookup(question, filters)
+        if cached is not None:
+            return cached
+
+    # Attempts run on a shared pool: a new attempt starts when the previous one
+    # fails, or as a hedge when it is still running after AGENT_HEDGE_DELAY_SECONDS.
+    # Only the first attempt is deterministic; later ones send distinct, uncached requests
+    pending = set()
+    submitted = 0
+    last = None
+
+    while submitted < AGENT_MAX_ATTEMPTS or pending:
+        if submitted < AGENT_MAX_ATTEMPTS:
+            pending.add(_attempt_executor.submit(_run_attempt, question, filters, submitted))
+            submitted += 1
+
+        done, pending = wait(pending, timeout=AGENT_HEDGE_DELAY_SECONDS, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            outcome = future.result()
+            if outcome["kind"] == "success":
+                for other in pending:
+                    other.cancel()
+                return _build_success_response(question, filters, outcome)
+            last = outcome
+
+    if last is not None and last["kind"] == "empty":
+        return {
+            "status": "no_data",
+            "data": pd.DataFrame(),
+            "insights": OUT_OF_SCOPE_MESSAGE,
+            "chart_type": "none",
+            "sql": last["sql"]
+        }
 
-        except Exception as e:
-            if attempt == 2:
-                return {
-                    "status": "error",
-                    "data": pd.DataFrame(),
-                    "insights": OUT_OF_SCOPE_MESSAGE,
-                    "chart_type": "none",
-                    "sql": "",
-                    "error": str(e)
-                }
-
-    return {
+    response = {
         "status": "error",
         "data": pd.DataFrame(),
         "insights": OUT_OF_SCOPE_MESSAGE,
         "chart_type": "none",
         "sql": ""
     }
+    if last is not None and last["kind"] == "error":
+        response["error"] = last["error"]
+    return response
 
 
-def get_filter_options() -> Dict[str, List[str]]:
-    """Get filter options from database."""
-    options = {}
+def _run_attempt(question: str, filters: Optional[Dict], attempt: int = 0) -> Dict[str, Any]:
+    """
+    One SQL attempt: generate, validate and execute.
+    Returns an outcome dict with kind = success | invalid | empty | error.
+    SQL that does not produce rows is evicted from the LLM cache.
+    """
+    outcome = _execute_attempt(question, filters, attempt)
+    if attempt == 0 and outcome["kind"] != "success":
+        _evict_sql_cache(question, filters)
+    return outcome
 
+
+def _execute_attempt(question: str, filters: Optional[Dict], attempt: int) -> Dict[str, Any]:
+    """Generate, validate and execute SQL (see _run_attempt)."""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            # Regions
-            df = pd.read_sql_query("SELECT region_name FROM regions ORDER BY region_name", conn)
-            options['regions'] = df['region_name'].dropna().tolist()
-
-            # Statuses
-            df = pd.read_sql_query("SELECT status_name FROM tender_statuses ORDER BY status_name", conn)
-            options['tender_statuses'] = df['status_name'].dropna().tolist()
-
-            # Top entities
-            df = pd.read_sql_query("""
-                SELECT government_entity, COUNT(*) as c
-                FROM tenders_full_details
-                GROUP BY government_entity
-                ORDER BY c DESC LIMIT 50
-            """, conn)
-            options['government_entity'] = df['government_entity'].dropna().tolist()
+        # Generate SQL
+        sql, params = generate_sql(question, filters, attempt)
 
-    except Exception:
-        options = {'regions': [], 'tender_statuses': [], 'government_entity': []}
+        # Validate
+        if not sql or 'SELECT' not in sql.upper():
+            return {"kind": "invalid", "sql": sql}
+
+        # Execute
+        data = execute_sql(sql, params)
+
+        if data.empty:
+            return {"kind": "empty", "sql": sql}
+
+        return {"kind": "success", "sql": sql, "data": data}
+
+    except Exception as e:
+        return {"kind": "error", "sql": "", "error": str(e)}
+
+
+def _build_success_response(question: str, filters: Optional[Dict], outcome: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate insights for a successful attempt and cache the response."""
+    data, sql = outcome["data"], outcome["sql"]
+
+    # Generate insights
+    result = generate_insights(question, data, sql)
+
+    response = {
+        "status": "success",
+        "data": data,
+        "insights": result["insights"],
+        "chart_type": result["chart_type"],
+        "sql": sql
+    }
+
+    if USE_SEMANTIC_CACHE:
+        get_semantic_cache(_load_anchor_names).store(question, filters, response)
+
+    return response
+
+
+@lru_cache(maxsize=1)
+def _load_filter_options() -> Dict[str, List[str]]:
+    """Query filter options (cached; raises on failure so errors are not cached)."""
+    options = {'regions': [], 'tender_statuses': [], 'government_entity': []}
+
+    # One round-trip; rows are tagged with the option list they belong to
+    for kind, value, _ in _get_connection().execute(_SQL_FILTER_OPTIONS).fetchall():
+        if value is not None:
+            options[kind].append(value)
 
     return options
 
 
+def _load_anchor_names() -> List[str]:
+    """Region and entity names a semantic cache hit must match exactly."""
+    return [name for (name,) in _get_connection().execute(_SQL_ANCHOR_NAMES).fetchall() if name]
+
+
+def get_filter_options() -> Dict[str, List[str]]:
+    """Get filter options from database."""
+    try:
+        return _load_filter_options()
+    except Exception:
+        return {'regions': [], 'tender_statuses': [], 'government_entity': []}
+
+
+@lru_cache(maxsize=1)
+def _load_kpi_stats() -> Dict[str, int]:
+    """Query KPI counts (cached)."""
+    row = _get_connection().execute(_SQL_KPI_COUNTS).fetchone()
+    return dict(zip(('tenders', 'projects', 'entities', 'activities'), row))
+
+
 def get_kpi_stats() -> Dict[str, int]:
     """Get KPI statistics."""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            tenders = conn.execute("SELECT COUNT(*) FROM tenders_full_details").fetchone()[0]
-            projects = conn.execute("SELECT COUNT(*) FROM future_projects").fetchone()[0]
-            entities = conn.execute("SELECT COUNT(*) FROM government_entity").fetchone()[0]
-            activities = conn.execute("SELECT COUNT(*) FROM primary_activity").fetchone()[0]
-        return {
-            'tenders': tenders,
-            'projects': projects,
-            'entities': entities,
-            'activities': activities
-        }
+        return _load_kpi_stats()
     except Exception:
         return {'tenders': 0, 'projects': 0, 'entities': 0, 'activities': 0}
 
 
+@lru_cache(maxsize=1)
+def _load_activity_chart_data() -> pd.DataFrame:
+    """Query top activities (cached)."""
+    rows = _get_connection().execute(_SQL_TOP_ACTIVITIES).fetchall()
+    return pd.DataFrame(rows, columns=['activity', 'count'])
+
+
 def get_activity_chart_data() -> pd.DataFrame:
     """Get top activities for chart."""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            return pd.read_sql_query("""
-                SELECT competition_activity as activity, COUNT(*) as count
-                FROM tenders_full_details
-                WHERE competition_activity IS NOT NULL
-                GROUP BY competition_activity
-                ORDER BY count DESC LIMIT 10
-            """, conn)
+        return _load_activity_chart_data()
     except Exception:
         return pd.DataFrame()
 
 
+@lru_cache(maxsize=1)
+def _load_nature_chart_data() -> pd.DataFrame:
+    """Query project nature distribution (cached)."""
+    rows = _get_connection().execute(_SQL_NATURE_DISTRIBUTION).fetchall()
+    return pd.DataFrame(rows, columns=['project_nature', 'count'])
+
+
 def get_nature_chart_data() -> pd.DataFrame:
     """Get project nature distribution."""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            return pd.read_sql_query("""
-                SELECT project_nature, COUNT(*) as count
-                FROM future_projects
-                WHERE project_nature IS NOT NULL
-                GROUP BY project_nature
-                ORDER BY count DESC LIMIT 8
-            """, conn)
+        return _load_nature_chart_data()
     except Exception:
         return pd.DataFrame()
+
+
+def invalidate_reference_cache():
+    """Clear cached reference data (call after the database is reloaded)."""
+    _load_filter_options.cache_clear()
+    _load_kpi_stats.cache_clear()
+    _load_activity_chart_data.cache_clear()
+    _load_nature_chart_data.cache_clear()
@@ -0,0 +1,221 @@
+# agent/semantic_cache.py
+# Semantic Cache for Nabahan Agent Responses
+# ==========================================
+# Reuses answers for paraphrased questions via multilingual sentence embeddings
+
+import io
+import re
+import json
+import hashlib
+import threading
+import time
+from typing import Dict, Any, Optional, List, Callable, Iterable, FrozenSet
+
+import numpy as np
+import pandas as pd
+
+from agent.config import (
+    SEMANTIC_CACHE_MODEL,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_MAX_ENTRIES
+)
+
+# Embeddings are stored as int8; cosine = int dot product / 127^2
+_INT8_SCALE = 127
+
+# Arabic-Indic and Persian digits normalized to ASCII before extracting numbers
+_DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹', '0123456789' * 2)
+_RE_NUMBER = re.compile(r'\d+(?:[.,]\d+)?')
+
+
+def _serialize_data(data: pd.DataFrame) -> Any:
+    """Serialize a DataFrame to parquet bytes (falls back to a copy if pyarrow is missing)."""
+    try:
+        buffer = io.BytesIO()
+        data.to_parquet(buffer, index=False)
+        return buffer.getvalue()
+    except Exception:
+        return data.copy()
+
+
+def _deserialize_data(payload: Any) -> pd.DataFrame:
+    """Restore a DataFrame serialized by _serialize_data."""
+    if isinstance(payload, bytes):
+        return pd.read_parquet(io.BytesIO(payload))
+    return payload.copy()
+
+
+def _quantize(vec: np.ndarray) -> np.ndarray:
+    """Quantize a unit-normalized embedding to int8 (scaled by 127)."""
+    return np.round(vec * _INT8_SCALE).astype(np.int8)
+
+
+def _filters_key(filters: Optional[Dict]) -> str:
+    """Canonical string for a filters dict."""
+    return json.dumps(filters or {}, sort_keys=True, ensure_ascii=False)
+
+
+def _anchors(question: str, terms: Iterable[str]) -> FrozenSet[str]:
+    """Numbers and known names (regions, entities) mentioned in a question."""
+    q = question.translate(_DIGITS)
+    return frozenset(_RE_NUMBER.findall(q)).union(t for t in terms if t in q)
+
+
+class SemanticCache:
+    """
+    In-memory semantic cache over question embeddings.
+
+    Questions are embedded with a multilingual MiniLM model and compared by
+    cosine similarity. Only entries with identical filters, numbers and known
+    names are considered, so "... in 2023" never reuses the 2024 answer.
+    Embeddings are stored int8-quantized (4x smaller than float32).
+    Least-recently-used entries are evicted beyond max_entries.
+    """
+
+    def __init__(
+            self,
+            model_name: str = SEMANTIC_CACHE_MODEL,
+            threshold: float = SEMANTIC_CACHE_THRESHOLD,
+            max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+            anchor_terms: Optional[Callable[[], Iterable[str]]] = None
+    ):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.max_entries = max_entries
+
+        self._model = None
+        self._available = True
+        self._lock = threading.Lock()
+
+        # Known names, loaded lazily from anchor_terms on first use
+        self._anchor_loader = anchor_terms
+        self._anchor_terms: Optional[tuple] = None
+
+        # Quantized embedding matrix (N, dim) int8 and parallel entry list
+        self._embeddings: Optional[np.ndarray] = None
+        self._entries: List[Dict[str, Any]] = []
+
+    def _get_model(self):
+        """Load the sentence transformer (lazy initialization)."""
+        if self._model is None and self._available:
+            try:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name)
+            except Exception as e:
+                print(f"Semantic cache disabled: {e}")
+                self._available = False
+        return self._model
+
+    def _anchors(self, question: str) -> FrozenSet[str]:
+        """Anchors of a question against the known names."""
+        if self._anchor_terms is None:
+            try:
+                terms = self._anchor_loader() if self._anchor_loader else ()
+            except Exception as e:
+                print(f"Semantic cache name list unavailable: {e}")
+                terms = ()
+            self._anchor_terms = tuple(t for t in terms if t)
+        return _anchors(question, self._anchor_terms)
+
+    def _encode(self, question: str) -> Optional[np.ndarray]:
+        """Embed a question as a normalized, int8-quantized vector."""
+        model = self._get_model()
+        if model is None:
+            return None
+        vec = model.encode([question], normalize_embeddings=True)
+        return _quantize(np.asarray(vec, dtype=np.float32)[0])
+
+    def lookup(self, question: str, filters: Optional[Dict] = None) -> Optional[Dict[str, Any]]:
+        """Return a cached response for a similar question, or None."""
+        if not self._available or not self._entries:
+            return None
+
+        vec = self._encode(question)
+        if vec is None:
+            return None
+
+        fkey = _filters_key(filters)
+        anchors = self._anchors(question)
+
+        with self._lock:
+            if self._embeddings is None or not self._entries:
+                return None
+
+            # Accumulate in int32 (int16 would overflow for 384 dims)
+            sims = (self._embeddings.astype(np.int32) @ vec.astype(np.int32)) / float(_INT8_SCALE ** 2)
+            for i, entry in enumerate(self._entries):
+                if entry["filters_key"] != fkey or entry["anchors"] != anchors:
+                    sims[i] = -1.0
+
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                return None
+
+            entry = self._entries[best]
+            entry["ts"] = time.time()
+            response = dict(entry["response"])
+
+        response["data"] = _deserialize_data(response["data"])
+        return response
+
+    def store(self, question: str, filters: Optional[Dict], response: Dict[str, Any]):
+        """Add a response to the cache."""
+        if not self._available:
+            return
+
+        vec = self._encode(question)
+        if vec is None:
+            return
+
+        fkey = _filters_key(filters)
+        stored = dict(response)
+        stored["data"] = _serialize_data(response.get("data", pd.DataFrame()))
+
+        entry = {
+            "key_hash": hashlib.sha256(f"{question}|{fkey}".encode('utf-8')).hexdigest(),
+            "filters_key": fkey,
+            "anchors": self._anchors(question),
+            "response": stored,
+            "ts": time.time()
+        }
+
+        with self._lock:
+            # Replace an existing exact entry instead of duplicating it
+            for i, existing in enumerate(self._entries):
+                if existing["key_hash"] == entry["key_hash"]:
+                    self._entries[i] = entry
+                    self._embeddings[i] = vec
+                    return
+
+            if self._embeddings is None:
+                self._embeddings = vec[np.newaxis, :]
+            else:
+                self._embeddings = np.vstack([self._embeddings, vec])
+            self._entries.append(entry)
+
+            # LRU eviction
+            if len(self._entries) > self.max_entries:
+                oldest = min(range(len(self._entries)), key=lambda i: self._entries[i]["ts"])
+                del self._entries[oldest]
+                self._embeddings = np.delete(self._embeddings, oldest, axis=0)
+
+    def clear(self):
+        """Remove all cached entries."""
+        with self._lock:
+            self._embeddings = None
+            self._entries = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Global semantic cache instance
+_semantic_cache: Optional[SemanticCache] = None
+
+
+def get_semantic_cache(anchor_terms: Optional[Callable[[], Iterable[str]]] = None) -> SemanticCache:
+    """Get or create the global semantic cache (anchor_terms is used on creation only)."""
+    global _semantic_cache
+    if _semantic_cache is None:
+        _semantic_cache = SemanticCache(anchor_terms=anchor_terms)
+    return _semantic_cache
@@ -3,6 +3,8 @@
 # ========================================
 # Text-to-SQL using Vanna AI framework with Groq LLM (OpenAI-compatible API)
 
+import json
+import re
 import sqlite3
 from pathlib import Path
 from typing import List, Dict, Optional
@@ -15,7 +17,9 @@ from agent.config import (
     GROQ_API_KEY,
     GROQ_MODEL_NAME,
     DB_PATH,
-    DATABASE_SCHEMA
+    DATABASE_SCHEMA,
+    VANNA_CHROMA_PATH,
+    VANNA_TRAINED_MARKER
 )
 
 
@@ -47,8 +51,9 @@ def get_vanna_instance() -> NabahanVanna:
             base_url='https://api.groq.com/openai/v1'
         )
 
+        # Persistent ChromaDB so embeddings survive restarts
         _vanna_instance = NabahanVanna(
-            chromadb_config={},
+            chromadb_config={'path': VANNA_CHROMA_PATH},
             openai_config={
                 'client': groq_client,
                 'model': GROQ_MODEL_NAME
@@ -165,6 +170,50 @@ def get_training_pairs() -> List[Dict[str, str]]:
     ]
 
 
+def _normalize_sql(sql: str) -> str:
+    """Normalize SQL for duplicate detection (case, whitespace, trailing semicolon)."""
+    return re.sub(r'\s+', ' ', sql).strip().rstrip(';').lower()
+
+
+def deduplicate_training_pairs(pairs: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Keep only the first question for each distinct normalized SQL."""
+    seen = set()
+    unique = []
+    for pair in pairs:
+        key = _normalize_sql(pair["sql"])
+        if key not in seen:
+            seen.add(key)
+            unique.append(pair)
+    return unique
+
+
+def expected_training_count() -> int:
+    """Number of training entries: Q&A pairs plus DDL and documentation."""
+    return len(deduplicate_training_pairs(get_training_pairs())) + 2
+
+
+def add_training_pairs(vn: NabahanVanna, pairs: List[Dict[str, str]]):
+    """
+    Add question-SQL pairs in one ChromaDB call so embeddings are computed as a batch.
+    Falls back to one vn.train call per pair if the collection is not accessible.
+    """
+    try:
+        from vanna.utils import deterministic_uuid
+
+        documents = [
+            json.dumps({"question": p["question"], "sql": p["sql"]}, ensure_ascii=False)
+            for p in pairs
+        ]
+        # The collection's embedding function embeds all documents in one batch
+        vn.sql_collection.upsert(
+            documents=documents,
+            ids=[deterministic_uuid(d) + "-sql" for d in documents]
+        )
+    except Exception:
+        for pair in pairs:
+            vn.train(question=pair["question"], sql=pair["sql"])
+
+
 def train_vanna() -> bool:
     """
     Train Vanna on the database schema and sample queries.
@@ -184,14 +233,13 @@ def train_vanna() -> bool:
         print("Trained on documentation")
 
         # Train on sample question-SQL pairs
-        training_pairs = get_training_pairs()
-        for pair in training_pairs:
-            vn.train(
-                question=pair["question"],
-                sql=pair["sql"]
-            )
+        training_pairs = deduplicate_training_pairs(get_training_pairs())
+        add_training_pairs(vn, training_pairs)
         print(f"Trained on {len(training_pairs)} Q&A pairs")
 
+        VANNA_TRAINED_MARKER.parent.mkdir(parents=True, exist_ok=True)
+        VANNA_TRAINED_MARKER.write_text(str(expected_training_count()), encoding='utf-8')
+
         return True
 
     except Exception as e:
@@ -249,11 +297,11 @@ def get_trained_vanna() -> NabahanVanna:
     """
     vn = get_vanna_instance()
 
-    # Check if we need to train (simple check)
+    # Check if we need to train (marker file + training data count)
     try:
-        # Try to get training data count
         training_data = vn.get_training_data()
-        if training_data is None or len(training_data) == 0:
+        count = 0 if training_data is None else len(training_data)
+        if not VANNA_TRAINED_MARKER.exists() or count < expected_training_count():
             print("Training Vanna...")
             train_vanna()
     except Exception:
@@ -1,15 +1,25 @@
 # evaluation/__init__.py
 # Nabahan Agent Evaluation Package
 
-from evaluation.metrics import NabahanMetrics, EvaluationResult, MetricResult
-from evaluation.visualize import EvaluationVisualizer
+from evaluation.metrics import NabahanMetrics, EvaluationResult, MetricResult, Status, Category
 from evaluation.run_evaluation import NabahanEvaluationPipeline
 from evaluation.eval_suite import NabahanEvaluator
 
+
+def __getattr__(name):
+    # EvaluationVisualizer pulls in matplotlib; import it only when requested
+    if name == 'EvaluationVisualizer':
+        from evaluation.visualize import EvaluationVisualizer
+        return EvaluationVisualizer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = [
     'NabahanMetrics',
     'EvaluationResult',
     'MetricResult',
+    'Status',
+    'Category',
     'EvaluationVisualizer',
     'NabahanEvaluationPipeline',
     'NabahanEvaluator'
@@ -0,0 +1,53 @@
+# evaluation/_stats.py
+# Latency statistics for evaluation charts
+# Single native pass with numba when available, NumPy otherwise
+
+from typing import Tuple
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # Optional: falls back to NumPy
+    numba = None
+
+
+def _latency_hist_kernel(arr: np.ndarray, bins: int):
+    """Equal-width histogram of a non-empty float64 array (range and counts in two passes)."""
+    n = arr.shape[0]
+    lo = arr[0]
+    hi = arr[0]
+    for i in range(n):
+        v = arr[i]
+        if v < lo:
+            lo = v
+        if v > hi:
+            hi = v
+
+    if lo == hi:
+        lo -= 0.5
+        hi += 0.5
+    edges = np.linspace(lo, hi, bins + 1)
+    counts = np.zeros(bins, dtype=np.int64)
+    width = (hi - lo) / bins
+    for i in range(n):
+        idx = int((arr[i] - lo) / width)
+        if idx >= bins:
+            idx = bins - 1  # Last bin is closed on the right
+        counts[idx] += 1
+    return counts, edges
+
+
+if numba is not None:
+    _latency_hist_kernel = numba.njit(cache=True)(_latency_hist_kernel)
+
+
+def latency_histogram(arr: np.ndarray, bins: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Latency histogram for charting.
+
+    Returns (hist_counts, hist_edges).
+    """
+    arr = np.ascontiguousarray(arr, dtype=np.float64)
+    if not arr.size:
+        return np.histogram(arr, bins=bins)
+    return _latency_hist_kernel(arr, bins)
@@ -0,0 +1,90 @@
+# evaluation/agent_cache.py
+# On-disk cache of agent responses for evaluation runs
+# Lets metric changes be re-scored without repeating LLM/DB calls
+
+import sys
+import json
+import pickle
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, Callable
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agent.config import EVAL_AGENT_CACHE_PATH, EVAL_AGENT_CACHE_VERSION
+
+
+class AgentCacheMiss(LookupError):
+    """Raised in replay mode when a question has no cached response."""
+
+
+# Only these outcomes are cached; errors are usually transient (API/network)
+_CACHEABLE_STATUSES = frozenset({"success", "no_data"})
+
+# key -> agent result dict, loaded lazily from EVAL_AGENT_CACHE_PATH
+_cache: Optional[Dict[str, Dict[str, Any]]] = None
+_lock = threading.Lock()
+
+
+def _load() -> Dict[str, Dict[str, Any]]:
+    """Load the pickled cache (empty if missing or unreadable)."""
+    global _cache
+    if _cache is None:
+        try:
+            with open(EVAL_AGENT_CACHE_PATH, 'rb') as f:
+                _cache = pickle.load(f)
+        except FileNotFoundError:
+            _cache = {}
+        except Exception as e:
+            print(f"Agent cache unreadable, starting empty: {e}")
+            _cache = {}
+    return _cache
+
+
+def cache_key(question: str, filters: Optional[Dict], version: str = EVAL_AGENT_CACHE_VERSION) -> str:
+    """Stable key for a (question, filters) pair under an agent version."""
+    payload = json.dumps({"v": version, "q": question, "f": filters or {}}, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def cached_call(
+        runner: Callable[[str, Optional[Dict]], Dict[str, Any]],
+        question: str,
+        filters: Optional[Dict] = None,
+        replay: bool = False,
+        refresh: bool = False
+) -> Dict[str, Any]:
+    """
+    Return the cached response for (question, filters), calling runner on a miss.
+
+    replay:  never call the agent; raise AgentCacheMiss instead
+    refresh: ignore cached entries and overwrite them with fresh responses
+    Only success/no_data responses are stored, so failures are retried next run.
+    """
+    key = cache_key(question, filters)
+
+    with _lock:
+        cache = _load()
+        if not refresh and key in cache:
+            return cache[key]
+
+    if replay:
+        raise AgentCacheMiss(f"No cached response for: {question}")
+
+    result = runner(question, filters)
+
+    if result.get("status") in _CACHEABLE_STATUSES:
+        with _lock:
+            cache[key] = result
+    return result
+
+
+def save():
+    """Persist the cache to disk (no-op if it was never loaded)."""
+    with _lock:
+        if _cache is None:
+            return
+        Path(EVAL_AGENT_CACHE_PATH).parent.mkdir(parents=True, exist_ok=True)
+        with open(EVAL_AGENT_CACHE_PATH, 'wb') as f:
+            pickle.dump(_cache, f, protocol=pickle.HIGHEST_PROTOCOL)
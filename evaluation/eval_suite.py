@@ -7,15 +7,85 @@ import csv
 import os
 import sys
 import re
+import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
 import pandas as pd
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from agent.nabahan_logic import nabahan_agent
-from agent.config import EVAL_LOG_PATH
+from agent.nabahan_logic import nabahan_agent, is_in_scope
+from agent.config import EVAL_LOG_PATH, EVAL_MAX_WORKERS
+from evaluation.metrics import Status, NO_DATA_STATUSES
+from evaluation import agent_cache
+
+# Precompiled patterns and marker sets shared by the evaluators
+_DIGIT_RE = re.compile(r'\d+')
+_ARABIC_RE = re.compile(r'[\u0600-\u06FF]')
+_SELECT_RE = re.compile(r'\bSELECT\b', re.IGNORECASE)
+_NO_DATA_MARKERS = ("عذرا", "غير متوفرة")
+
+# Rows written between flushes of the eval log
+_CSV_FLUSH_EVERY = 50
+
+
+def _has_no_data_marker(text: str) -> bool:
+    """Check whether text contains an apology / no-data marker."""
+    return any(m in text for m in _NO_DATA_MARKERS)
+
+
+# Responses worth memoizing; errors are usually transient (API/network)
+_CACHEABLE_STATUSES = frozenset({"success", "no_data"})
+
+
+class _UncachedResponse(Exception):
+    """Carries an agent response out of _cached_agent so lru_cache does not store it."""
+
+    def __init__(self, response: Dict[str, Any]):
+        super().__init__(response.get('status'))
+        self.response = response
+
+
+@lru_cache(maxsize=512)
+def _cached_agent(question: str, filters_key: str) -> Dict[str, Any]:
+    """Run the agent once per (question, filters); repeated cases reuse the result."""
+    filters = json.loads(filters_key) or None
+    response = nabahan_agent(question, filters)
+    if response.get('status') not in _CACHEABLE_STATUSES:
+        raise _UncachedResponse(response)
+    return response
+
+
+def _run_agent(question: str, filters: Optional[Dict]) -> Dict[str, Any]:
+    """Exact-match memoized agent call (paraphrases are handled by the agent's semantic cache)."""
+    # Out-of-scope questions are rejected by the agent's keyword check before any
+    # LLM/DB work, so call it directly and keep them out of the caches
+    if not is_in_scope(question):
+        return nabahan_agent(question, filters)
+
+    filters_key = json.dumps(filters or {}, sort_keys=True, ensure_ascii=False)
+    try:
+        return _cached_agent(question, filters_key)
+    except _UncachedResponse as e:
+        return e.response
+
+
+def clear_agent_cache():
+    """Drop memoized agent responses (call after changing agent code or data)."""
+    _cached_agent.cache_clear()
+
+
+def cached_agent(question: str, filters: Optional[Dict] = None) -> Dict[str, Any]:
+    """
+    Agent call backed by the on-disk evaluation cache (survives across runs).
+    Bump EVAL_AGENT_CACHE_VERSION to invalidate.
+    """
+    if not is_in_scope(question):
+        return nabahan_agent(question, filters)
+    return agent_cache.cached_call(_run_agent, question, filters)
 
 
 class NabahanEvaluator:
@@ -25,8 +95,10 @@ class NabahanEvaluator:
     Results are saved to CSV - never exposed to frontend.
     """
 
-    def __init__(self, log_path: Optional[str] = None):
+    def __init__(self, log_path: Optional[str] = None, use_agent_cache: bool = False):
         self.log_path = log_path or EVAL_LOG_PATH
+        # Reuse agent responses stored on disk by previous runs
+        self.use_agent_cache = use_agent_cache
         log_dir = Path(self.log_path).parent
         log_dir.mkdir(parents=True, exist_ok=True)
 
@@ -63,27 +135,33 @@ class NabahanEvaluator:
             reasons.append("Non-empty answer")
 
         # Arabic content
-        if any('\u0600' <= c <= '\u06FF' for c in answer):
+        if _ARABIC_RE.search(answer):
             score += 0.25
             reasons.append("Arabic content")
 
         # Numbers if data exists
         if data_rows > 0:
-            numbers = re.findall(r'\d+', answer)
+            numbers = _DIGIT_RE.findall(answer)
             if numbers:
                 score += 0.25
                 reasons.append("Contains numbers")
             else:
                 score += 0.1
         else:
-            if "عذرا" in answer or "غير متوفرة" in answer:
+            if _has_no_data_marker(answer):
                 score += 0.25
                 reasons.append("Correct no-data response")
 
         # Keyword overlap
+        # Count distinct shared words, stopping once the threshold is reached
         q_words = set(question.split())
-        a_words = set(answer.split())
-        overlap = len(q_words.intersection(a_words))
+        overlap = 0
+        for w in answer.split():
+            if w in q_words:
+                q_words.discard(w)
+                overlap += 1
+                if overlap >= 2:
+                    break
         if overlap >= 2:
             score += 0.25
             reasons.append(f"Keyword overlap: {overlap}")
@@ -94,30 +172,32 @@ class NabahanEvaluator:
             "passed": score >= 0.6
         }
 
-    def evaluate_faithfulness(self, answer: str, sql: str, data_rows: int, status: str) -> Dict[str, Any]:
+    def evaluate_faithfulness(self, answer: str, sql: str, data_rows: int, status: Union[str, Status]) -> Dict[str, Any]:
         """
         Evaluate faithfulness - does answer match the data?
         """
         score = 0.0
         reasons = []
 
+        status = Status.parse(status)
+
         # Answer matches status
-        if status == "success" and data_rows > 0:
+        if status == Status.SUCCESS and data_rows > 0:
             if len(answer) > 30 and "عذرا" not in answer:
                 score += 0.4
                 reasons.append("Substantive answer for success")
-        elif status in ["no_data", "out_of_scope", "error"]:
-            if "عذرا" in answer or "غير متوفرة" in answer:
+        elif status in NO_DATA_STATUSES:
+            if _has_no_data_marker(answer):
                 score += 0.5
                 reasons.append("Correct no-data indication")
 
         # Valid SQL
-        if sql and "SELECT" in sql.upper():
+        if sql and _SELECT_RE.search(sql):
             score += 0.3
             reasons.append("Valid SQL")
 
         # Numbers consistency
-        if data_rows > 0 and any(c.isdigit() for c in answer):
+        if data_rows > 0 and _DIGIT_RE.search(answer):
             score += 0.3
             reasons.append("Numbers in answer")
         elif data_rows == 0:
@@ -129,13 +209,31 @@ class NabahanEvaluator:
             "passed": score >= 0.6
         }
 
-    def run_evaluation(self, question: str, filters: Optional[Dict] = None) -> Dict[str, Any]:
-        """Run evaluation on a single question."""
-        timestamp = datetime.now().isoformat()
+    def run_evaluation(self, question: str, filters: Optional[Dict] = None, writer=None) -> Dict[str, Any]:
+        """
+        Run evaluation on a single question.
+        Pass a csv writer to log into an already-open file.
+        """
+        result, row = self._evaluate(question, filters, datetime.now().isoformat(timespec='seconds'))
+
+        if writer is not None:
+            writer.writerow(row)
+        else:
+            with open(self.log_path, 'a', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerow(row)
+
+        return result
+
+    def _evaluate(self, question: str, filters: Optional[Dict], timestamp: str) -> tuple:
+        """Score one question; returns (result summary, CSV log row) without writing."""
 
         # Get agent response
-        result = nabahan_agent(question, filters)
-        data_rows = len(result['data']) if not result['data'].empty else 0
+        if self.use_agent_cache:
+            result = cached_agent(question, filters)
+        else:
+            result = _run_agent(question, filters)
+        data = result.get('data')
+        data_rows = 0 if data is None else data.shape[0]
 
         # Evaluate
         relevancy = self.evaluate_relevancy(question, result['insights'], data_rows)
@@ -153,27 +251,26 @@ class NabahanEvaluator:
             result['sql'][:200] if result['sql'] else '',
             data_rows,
             result['insights'][:300],
-            f"{relevancy['score']:.2f}",
-            f"{faithfulness['score']:.2f}",
+            round(relevancy['score'], 2),
+            round(faithfulness['score'], 2),
             relevancy['passed'],
             faithfulness['passed'],
             overall_passed
         ]
 
-        with open(self.log_path, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(row)
-
         return {
             "question": question,
             "status": result['status'],
             "relevancy_score": relevancy['score'],
             "faithfulness_score": faithfulness['score'],
             "overall_passed": overall_passed
-        }
+        }, row
 
-    def run_test_suite(self, test_cases: List[Dict]) -> Dict[str, Any]:
-        """Run evaluation on multiple test cases."""
+    def run_test_suite(self, test_cases: List[Dict], max_workers: int = EVAL_MAX_WORKERS) -> Dict[str, Any]:
+        """
+        Run evaluation on multiple test cases.
+        Agent calls run concurrently; rows are logged in test-case order from this thread.
+        """
         print("=" * 60)
         print("Nabahan Evaluation Suite")
         print(f"Log file: {self.log_path}")
@@ -182,20 +279,36 @@ class NabahanEvaluator:
         results = []
         passed = 0
 
-        for i, tc in enumerate(test_cases, 1):
-            question = tc.get('question', '')
-            filters = tc.get('filters')
+        # Open the log once for the whole suite
+        with open(self.log_path, 'a', newline='', encoding='utf-8') as f, \
+                ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            writer = csv.writer(f)
 
-            print(f"\n[{i}/{len(test_cases)}] {question[:40]}...")
+            # One timestamp for the whole batch
+            timestamp = datetime.now().isoformat(timespec='seconds')
+            evaluated = executor.map(
+                lambda tc: self._evaluate(tc.get('question', ''), tc.get('filters'), timestamp),
+                test_cases
+            )
 
-            result = self.run_evaluation(question, filters)
-            results.append(result)
+            for i, (result, row) in enumerate(evaluated, 1):
+                print(f"\n[{i}/{len(test_cases)}] {result['question'][:40]}...")
 
-            if result['overall_passed']:
-                passed += 1
-                print(f"  PASSED (R:{result['relevancy_score']:.2f}, F:{result['faithfulness_score']:.2f})")
-            else:
-                print(f"  FAILED (R:{result['relevancy_score']:.2f}, F:{result['faithfulness_score']:.2f})")
+                writer.writerow(row)
+                results.append(result)
+
+                if result['overall_passed']:
+                    passed += 1
+                    print(f"  PASSED (R:{result['relevancy_score']:.2f}, F:{result['faithfulness_score']:.2f})")
+                else:
+                    print(f"  FAILED (R:{result['relevancy_score']:.2f}, F:{result['faithfulness_score']:.2f})")
+
+                # Flush periodically so a crash keeps most of the log
+                if i % _CSV_FLUSH_EVERY == 0:
+                    f.flush()
+
+        if self.use_agent_cache:
+            agent_cache.save()
 
         # Summary
         summary = {
@@ -238,9 +351,11 @@ def main():
 
     parser = argparse.ArgumentParser(description='Nabahan Evaluation')
     parser.add_argument('--log-path', type=str, default=None)
+    parser.add_argument('--agent-cache', action='store_true',
+                        help='Reuse agent responses cached on disk by earlier runs')
     args = parser.parse_args()
 
-    evaluator = NabahanEvaluator(log_path=args.log_path)
+    evaluator = NabahanEvaluator(log_path=args.log_path, use_agent_cache=args.agent_cache)
     test_cases = get_default_test_cases()
     evaluator.run_test_suite(test_cases)
 
@@ -2,11 +2,103 @@
 # Nabahan Agent - Evaluation Metrics
 # Measures: Retrieval Accuracy, Generation Fidelity, Latency
 
+import sys
 import time
 import re
-from typing import Dict, Any, List, Optional
-from dataclasses import dataclass, field
-from datetime import datetime
+from functools import lru_cache
+from enum import IntEnum
+from typing import Dict, Any, List, Optional, Union
+from dataclasses import dataclass, field, fields
+
+import numpy as np
+import pandas as pd
+
+try:
+    import ahocorasick
+except ImportError:  # Optional: falls back to per-keyword substring checks
+    ahocorasick = None
+
+# Precompiled patterns and marker sets shared by the metric functions
+_DIGIT_RE = re.compile(r'\d+')
+_ARABIC_RE = re.compile(r'[\u0600-\u06FF]')
+_SELECT_RE = re.compile(r'\bSELECT\b', re.IGNORECASE)
+_NO_DATA_MARKERS = ("عذرا", "غير متوفرة")
+# Several markers are multi-word phrases, so they are matched as substrings
+_HALLUCINATION_MARKERS = (
+    "اعتقد", "ربما", "قد يكون", "لست متأكد",
+    "I think", "maybe", "probably"
+)
+
+# Initial capacity of the latency buffer
+_LATENCY_BUFFER_SIZE = 1024
+
+
+class Status(IntEnum):
+    """Agent response status as an integer code."""
+    SUCCESS = 0
+    NO_DATA = 1
+    OUT_OF_SCOPE = 2
+    ERROR = 3
+    OTHER = 4
+
+    @classmethod
+    def parse(cls, value: Union[str, int, None]) -> "Status":
+        """Map an agent status string (or an existing code) to a Status."""
+        if isinstance(value, int):
+            return cls(value)
+        return _STATUS_BY_NAME.get(value, cls.OTHER)
+
+
+class Category(IntEnum):
+    """Test case category as an integer code."""
+    OTHER = 0
+    COUNT = 1
+    AGGREGATION = 2
+    DISTRIBUTION = 3
+    LOOKUP = 4
+    REGION_FILTER = 5
+    TIME_FILTER = 6
+    VALUE_FILTER = 7
+    OUT_OF_SCOPE = 8
+
+    @classmethod
+    def parse(cls, value: Union[str, int, None]) -> "Category":
+        """Map a test case category string (or an existing code) to a Category."""
+        if isinstance(value, int):
+            return cls(value)
+        return _CATEGORY_BY_NAME.get(value, cls.OTHER)
+
+
+_STATUS_BY_NAME = {s.name.lower(): s for s in Status if s is not Status.OTHER}
+_CATEGORY_BY_NAME = {c.name.lower(): c for c in Category if c is not Category.OTHER}
+
+# Statuses where an apology / no-data answer is the expected response
+NO_DATA_STATUSES = frozenset({Status.NO_DATA, Status.OUT_OF_SCOPE, Status.ERROR})
+
+
+def _has_no_data_marker(text: str) -> bool:
+    """Check whether text contains an apology / no-data marker."""
+    return any(m in text for m in _NO_DATA_MARKERS)
+
+
+@lru_cache(maxsize=64)
+def _table_re(table: str) -> "re.Pattern":
+    """Case-insensitive matcher for a table name in SQL (compiled once per table)."""
+    return re.compile(re.escape(table), re.IGNORECASE)
+
+
+def _build_table_automaton(table_keywords: Dict[str, List[str]]):
+    """Build an Aho-Corasick automaton mapping keywords to (priority, table) (None if unavailable)."""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for priority, (table, keywords) in enumerate(table_keywords.items()):
+        for kw in keywords:
+            # Keep the first table declared for a shared keyword
+            if not automaton.exists(kw):
+                automaton.add_word(kw, (priority, table))
+    automaton.make_automaton()
+    return automaton
 
 
 @dataclass
@@ -18,11 +110,15 @@ class MetricResult:
     details: str = ""
 
 
-@dataclass
+# Slotted dataclasses (no per-instance __dict__) need Python 3.10+
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_SLOTS)
 class EvaluationResult:
     """Complete evaluation result for a single query."""
     question: str
-    timestamp: str
+    timestamp: float  # Unix time; format with datetime.fromtimestamp when writing
     status: str
     sql_generated: str
     data_rows: int
@@ -45,6 +141,36 @@ class EvaluationResult:
     expected_table: str = ""
 
 
+# Column order for the columnar result store
+_RESULT_FIELDS = tuple(f.name for f in fields(EvaluationResult))
+
+
+@dataclass
+class _QueryFeatures:
+    """String features of one response, extracted once and shared by all metrics."""
+    insights_len: int
+    arabic_chars: int
+    digit_count: int
+    has_no_data_marker: bool
+    has_apology: bool
+    has_hallucination: bool
+    has_select: bool
+
+
+def _extract_features(insights: str, sql: str) -> _QueryFeatures:
+    """Scan insights and SQL once for everything the metrics check."""
+    insights = insights or ""
+    return _QueryFeatures(
+        insights_len=len(insights),
+        arabic_chars=len(_ARABIC_RE.findall(insights)),
+        digit_count=len(_DIGIT_RE.findall(insights)),
+        has_no_data_marker=_has_no_data_marker(insights),
+        has_apology="عذرا" in insights,
+        has_hallucination=any(marker in insights for marker in _HALLUCINATION_MARKERS),
+        has_select=bool(sql) and _SELECT_RE.search(sql) is not None
+    )
+
+
 class NabahanMetrics:
     """
     Metrics calculator for Nabahan agent evaluation.
@@ -67,11 +193,18 @@ class NabahanMetrics:
     }
 
     def __init__(self):
-        self.results: List[EvaluationResult] = []
+        # Results are stored column-wise; see the results property and to_dataframe()
+        self._columns: Dict[str, list] = {name: [] for name in _RESULT_FIELDS}
+        self._df: Optional[pd.DataFrame] = None
+        self._results: Optional[List[EvaluationResult]] = None
         self.start_time: Optional[float] = None
+        self._table_automaton = _build_table_automaton(self.TABLE_KEYWORDS)
+
+        # Running aggregates so get_summary never rescans results
+        self._reset_aggregates()
 
     def start_timer(self):
-        """Start timing a query."""
+        """Start timing a query (single-threaded callers only; the pipeline times calls itself)."""
         self.start_time = time.time()
 
     def stop_timer(self) -> float:
@@ -87,9 +220,10 @@ class NabahanMetrics:
         question: str,
         sql: str,
         data_rows: int,
-        status: str,
+        status: Union[str, Status],
         expected_table: Optional[str] = None,
-        category: Optional[str] = None
+        category: Union[str, Category, None] = None,
+        features: Optional[_QueryFeatures] = None
     ) -> MetricResult:
         """
         Calculate Retrieval Accuracy (0 or 1).
@@ -100,10 +234,11 @@ class NabahanMetrics:
         """
         details = []
         score = 0.0
+        status = Status.parse(status)
 
         # Handle out-of-scope correctly
-        if category == "out_of_scope":
-            if status == "out_of_scope":
+        if Category.parse(category) == Category.OUT_OF_SCOPE:
+            if status == Status.OUT_OF_SCOPE:
                 score = 1.0
                 details.append("Correctly identified out-of-scope query")
             else:
@@ -122,7 +257,8 @@ class NabahanMetrics:
         total_checks = 3
 
         # Check 1: Valid SQL generated
-        if sql and "SELECT" in sql.upper():
+        has_select = features.has_select if features else bool(sql) and _SELECT_RE.search(sql) is not None
+        if has_select:
             checks_passed += 1
             details.append("Valid SQL generated")
         else:
@@ -130,7 +266,7 @@ class NabahanMetrics:
 
         # Check 2: Correct table targeted
         if expected_table:
-            if expected_table.lower() in sql.lower():
+            if sql and _table_re(expected_table).search(sql):
                 checks_passed += 1
                 details.append(f"Correct table: {expected_table}")
             else:
@@ -138,7 +274,7 @@ class NabahanMetrics:
         else:
             # Infer expected table from question
             detected_table = self._detect_table_from_question(question)
-            if detected_table and detected_table.lower() in sql.lower():
+            if detected_table and sql and _table_re(detected_table).search(sql):
                 checks_passed += 1
                 details.append(f"Detected table: {detected_table}")
             elif sql:
@@ -146,10 +282,10 @@ class NabahanMetrics:
                 details.append("Table inference uncertain")
 
         # Check 3: Data retrieved (if expected)
-        if status == "success" and data_rows > 0:
+        if status == Status.SUCCESS and data_rows > 0:
             checks_passed += 1
             details.append(f"Retrieved {data_rows} rows")
-        elif status == "no_data":
+        elif status == Status.NO_DATA:
             checks_passed += 0.5  # Query worked but no matching data
             details.append("Query executed but no data matched")
         else:
@@ -172,8 +308,9 @@ class NabahanMetrics:
         insights: str,
         sql: str,
         data_rows: int,
-        status: str,
-        category: Optional[str] = None
+        status: Union[str, Status],
+        category: Union[str, Category, None] = None,
+        features: Optional[_QueryFeatures] = None
     ) -> MetricResult:
         """
         Calculate Generation Fidelity (0 or 1).
@@ -185,10 +322,12 @@ class NabahanMetrics:
         details = []
         checks_passed = 0
         total_checks = 4
+        status = Status.parse(status)
+        f = features or _extract_features(insights, sql)
 
         # Handle out-of-scope
-        if category == "out_of_scope":
-            if "عذرا" in insights or "غير متوفرة" in insights:
+        if Category.parse(category) == Category.OUT_OF_SCOPE:
+            if f.has_no_data_marker:
                 return MetricResult(
                     name="generation_fidelity",
                     score=1.0,
@@ -204,14 +343,14 @@ class NabahanMetrics:
                 )
 
         # Check 1: Response matches status
-        if status == "success" and data_rows > 0:
-            if len(insights) > 30 and "عذرا" not in insights:
+        if status == Status.SUCCESS and data_rows > 0:
+            if f.insights_len > 30 and not f.has_apology:
                 checks_passed += 1
                 details.append("Substantive response for success status")
             else:
                 details.append("Insufficient response for success status")
-        elif status in ["no_data", "error"]:
-            if "عذرا" in insights or "غير متوفرة" in insights or len(insights) < 50:
+        elif status in (Status.NO_DATA, Status.ERROR):
+            if f.has_no_data_marker or f.insights_len < 50:
                 checks_passed += 1
                 details.append("Appropriate response for no-data/error")
             else:
@@ -220,8 +359,7 @@ class NabahanMetrics:
             checks_passed += 0.5
 
         # Check 2: Arabic language consistency
-        arabic_chars = sum(1 for c in insights if '\u0600' <= c <= '\u06FF')
-        if arabic_chars > len(insights) * 0.3:
+        if f.arabic_chars > f.insights_len * 0.3:
             checks_passed += 1
             details.append("Arabic language used")
         else:
@@ -229,10 +367,9 @@ class NabahanMetrics:
 
         # Check 3: Numbers consistency (if data exists)
         if data_rows > 0:
-            numbers_in_insight = re.findall(r'\d+', insights)
-            if numbers_in_insight:
+            if f.digit_count:
                 checks_passed += 1
-                details.append(f"Contains {len(numbers_in_insight)} numbers")
+                details.append(f"Contains {f.digit_count} numbers")
             else:
                 details.append("No numbers in insight despite data")
         else:
@@ -240,12 +377,7 @@ class NabahanMetrics:
             details.append("No data to verify numbers against")
 
         # Check 4: No obvious hallucination markers
-        hallucination_markers = [
-            "اعتقد", "ربما", "قد يكون", "لست متأكد",
-            "I think", "maybe", "probably"
-        ]
-        has_hallucination = any(marker in insights for marker in hallucination_markers)
-        if not has_hallucination:
+        if not f.has_hallucination:
             checks_passed += 1
             details.append("No hallucination markers")
         else:
@@ -295,6 +427,11 @@ class NabahanMetrics:
         """Detect which table a question is likely targeting."""
         question_lower = question.lower()
 
+        if self._table_automaton is not None:
+            # Single scan; ties resolve to the earliest table in TABLE_KEYWORDS
+            matches = [payload for _, payload in self._table_automaton.iter(question_lower)]
+            return min(matches)[1] if matches else None
+
         for table, keywords in self.TABLE_KEYWORDS.items():
             for keyword in keywords:
                 if keyword in question_lower:
@@ -317,14 +454,19 @@ class NabahanMetrics:
         sql = result.get('sql', '')
         insights = result.get('insights', '')
         data = result.get('data')
-        data_rows = len(data) if data is not None and not data.empty else 0
+        data_rows = 0 if data is None else data.shape[0]
+
+        # Map status/category to integer codes and scan strings once for both metrics
+        status_code = Status.parse(status)
+        category_code = Category.parse(category)
+        features = _extract_features(insights, sql)
 
         # Calculate metrics
         retrieval = self.calculate_retrieval_accuracy(
-            question, sql, data_rows, status, expected_table, category
+            question, sql, data_rows, status_code, expected_table, category_code, features
         )
         fidelity = self.calculate_generation_fidelity(
-            question, insights, sql, data_rows, status, category
+            question, insights, sql, data_rows, status_code, category_code, features
         )
         latency_metric = self.calculate_latency(latency)
 
@@ -332,7 +474,7 @@ class NabahanMetrics:
 
         eval_result = EvaluationResult(
             question=question,
-            timestamp=datetime.now().isoformat(),
+            timestamp=time.time(),
             status=status,
             sql_generated=sql[:500] if sql else "",
             data_rows=data_rows,
@@ -349,12 +491,70 @@ class NabahanMetrics:
             expected_table=expected_table or ""
         )
 
-        self.results.append(eval_result)
+        for name in _RESULT_FIELDS:
+            self._columns[name].append(getattr(eval_result, name))
+        self._df = None
+        self._results = None
+        self._accumulate(eval_result)
         return eval_result
 
+    @property
+    def results(self) -> List[EvaluationResult]:
+        """
+        Evaluated queries as EvaluationResult objects (cached until the next result).
+        Read-only view of the columns: add results through evaluate_query.
+        """
+        if self._results is None:
+            self._results = [EvaluationResult(*row) for row in zip(*(self._columns[n] for n in _RESULT_FIELDS))]
+        return self._results
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """All evaluated queries as a typed, columnar DataFrame (cached until the next result)."""
+        if self._df is None:
+            self._df = pd.DataFrame(self._columns, columns=list(_RESULT_FIELDS))
+        return self._df
+
+    def _reset_aggregates(self):
+        """Reset running totals used by get_summary."""
+        self._n = 0
+        self._pass = 0
+        self._sum_ret = 0.0
+        self._sum_fid = 0.0
+        self._sum_lat = 0.0
+        # Latency buffer, grown by doubling; only [:_n] is valid
+        self._latencies = np.empty(_LATENCY_BUFFER_SIZE, dtype=np.float64)
+        self._by_category: Dict[str, Dict] = {}
+
+    def _accumulate(self, r: EvaluationResult):
+        """Fold one result into the running totals."""
+        self._n += 1
+        self._pass += 1 if r.overall_passed else 0
+        self._sum_ret += r.retrieval_accuracy
+        self._sum_fid += r.generation_fidelity
+        self._sum_lat += r.latency_seconds
+        if self._n > len(self._latencies):
+            self._latencies = np.resize(self._latencies, 2 * len(self._latencies))
+        self._latencies[self._n - 1] = r.latency_seconds
+
+        cat = r.category or "unknown"
+        data = self._by_category.get(cat)
+        if data is None:
+            data = self._by_category[cat] = {
+                "total": 0,
+                "passed": 0,
+                "retrieval_sum": 0.0,
+                "fidelity_sum": 0.0,
+                "latency_sum": 0.0
+            }
+        data["total"] += 1
+        data["passed"] += 1 if r.overall_passed else 0
+        data["retrieval_sum"] += r.retrieval_accuracy
+        data["fidelity_sum"] += r.generation_fidelity
+        data["latency_sum"] += r.latency_seconds
+
     def get_summary(self) -> Dict[str, Any]:
         """Get summary statistics for all evaluated queries."""
-        if not self.results:
+        if not self._n:
             return {
                 "total_queries": 0,
                 "passed": 0,
@@ -364,58 +564,46 @@ class NabahanMetrics:
                 "avg_generation_fidelity": 0.0,
                 "avg_latency": 0.0,
                 "latency_p50": 0.0,
-                "latency_p95": 0.0
+                "latency_p95": 0.0,
+                "latency_p99": 0.0
             }
 
-        total = len(self.results)
-        passed = sum(1 for r in self.results if r.overall_passed)
-
-        latencies = sorted([r.latency_seconds for r in self.results])
-        p50_idx = int(len(latencies) * 0.5)
-        p95_idx = int(len(latencies) * 0.95)
+        total = self._n
+        passed = self._pass
+        # np.percentile selects with a partition rather than a full sort
+        p50, p95, p99 = np.percentile(self._latencies[:total], [50, 95, 99])
 
         return {
             "total_queries": total,
             "passed": passed,
             "failed": total - passed,
             "pass_rate": passed / total,
-            "avg_retrieval_accuracy": sum(r.retrieval_accuracy for r in self.results) / total,
-            "avg_generation_fidelity": sum(r.generation_fidelity for r in self.results) / total,
-            "avg_latency": sum(r.latency_seconds for r in self.results) / total,
-            "latency_p50": latencies[p50_idx] if latencies else 0,
-            "latency_p95": latencies[p95_idx] if latencies else 0,
+            "avg_retrieval_accuracy": self._sum_ret / total,
+            "avg_generation_fidelity": self._sum_fid / total,
+            "avg_latency": self._sum_lat / total,
+            "latency_p50": float(p50),
+            "latency_p95": float(p95),
+            "latency_p99": float(p99),
             "by_category": self._get_category_breakdown()
         }
 
     def _get_category_breakdown(self) -> Dict[str, Dict]:
         """Get metrics breakdown by category."""
         categories = {}
-        for r in self.results:
-            cat = r.category or "unknown"
-            if cat not in categories:
-                categories[cat] = {
-                    "total": 0,
-                    "passed": 0,
-                    "retrieval_sum": 0.0,
-                    "fidelity_sum": 0.0,
-                    "latency_sum": 0.0
-                }
-            categories[cat]["total"] += 1
-            categories[cat]["passed"] += 1 if r.overall_passed else 0
-            categories[cat]["retrieval_sum"] += r.retrieval_accuracy
-            categories[cat]["fidelity_sum"] += r.generation_fidelity
-            categories[cat]["latency_sum"] += r.latency_seconds
-
-        # Calculate averages
-        for cat, data in categories.items():
-            if data["total"] > 0:
-                data["pass_rate"] = data["passed"] / data["total"]
-                data["avg_retrieval"] = data["retrieval_sum"] / data["total"]
-                data["avg_fidelity"] = data["fidelity_sum"] / data["total"]
-                data["avg_latency"] = data["latency_sum"] / data["total"]
+        for cat, sums in self._by_category.items():
+            data = dict(sums)
+            total = data["total"]
+            data["pass_rate"] = data["passed"] / total
+            data["avg_retrieval"] = data["retrieval_sum"] / total
+            data["avg_fidelity"] = data["fidelity_sum"] / total
+            data["avg_latency"] = data["latency_sum"] / total
+            categories[cat] = data
 
         return categories
 
     def clear_results(self):
         """Clear all stored results."""
-        self.results = []
+        self._columns = {name: [] for name in _RESULT_FIELDS}
+        self._df = None
+        self._results = None
+        self._reset_aggregates()
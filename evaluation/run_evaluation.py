@@ -6,16 +6,174 @@ import os
 import sys
 import json
 import csv
+import time
+import asyncio
+from functools import lru_cache, cached_property
+from operator import attrgetter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, TYPE_CHECKING
+import pandas as pd
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # Optional: falls back to the json module
+    def _json_loads(data: bytes):
+        return json.loads(data.decode('utf-8'))
+
+try:
+    from tqdm.auto import tqdm
+except ImportError:  # Optional: no progress bar
+    tqdm = None
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from evaluation.metrics import NabahanMetrics, EvaluationResult
-from evaluation.visualize import EvaluationVisualizer
+from evaluation import agent_cache
 from agent.nabahan_logic import nabahan_agent
+from agent.config import EVAL_MAX_WORKERS
+
+if TYPE_CHECKING:
+    from evaluation.visualize import EvaluationVisualizer
+
+
+# Write buffer for report CSVs
+_CSV_BUFFER_SIZE = 1 << 20
+# Reports at least this long are written through pandas' C writer
+_PANDAS_CSV_MIN_ROWS = 1000
+
+_REPORT_HEADER = [
+    'Query #', 'Timestamp', 'Question', 'Category', 'Expected Table',
+    'Status', 'SQL Generated', 'Data Rows', 'Insights',
+    'Retrieval Accuracy', 'Generation Fidelity', 'Latency (s)',
+    'Retrieval Passed', 'Fidelity Passed', 'Overall Passed',
+    'Retrieval Details', 'Fidelity Details'
+]
+
+# EvaluationResult fields passed to the visualizer
+_CHART_FIELDS = (
+    'question', 'retrieval_accuracy', 'generation_fidelity',
+    'latency_seconds', 'overall_passed', 'category'
+)
+_get_chart_fields = attrgetter(*_CHART_FIELDS)
+
+
+@lru_cache(maxsize=8)
+def _load_test_cases_cached(filepath: str, mtime: float) -> tuple:
+    """Parse a test cases file; cached until the file's mtime changes."""
+    return tuple(_json_loads(Path(filepath).read_bytes()))
+
+
+# Bound format methods reused for every report row
+_fmt_score = '{:.2f}'.format
+_fmt_latency = '{:.3f}'.format
+
+
+# EvaluationResult fields in detailed-report column order (one C-level fetch per row)
+_REPORT_FIELDS = (
+    'timestamp', 'question', 'category', 'expected_table', 'status',
+    'sql_generated', 'data_rows', 'insights',
+    'retrieval_accuracy', 'generation_fidelity', 'latency_seconds',
+    'retrieval_passed', 'fidelity_passed', 'overall_passed',
+    'retrieval_details', 'fidelity_details'
+)
+_get_report_fields = attrgetter(*_REPORT_FIELDS)
+_fromtimestamp = datetime.fromtimestamp
+
+
+def _report_row(index: int, r: EvaluationResult) -> list:
+    """One row of the detailed results CSV."""
+    (ts, question, category, expected_table, status, sql, data_rows, insights,
+     retrieval, fidelity, latency, retrieval_passed, fidelity_passed, overall_passed,
+     retrieval_details, fidelity_details) = _get_report_fields(r)
+    return [
+        index,
+        _fromtimestamp(ts).isoformat(timespec='seconds'),
+        question,
+        category,
+        expected_table,
+        status,
+        (sql or '')[:200],
+        data_rows,
+        (insights or '')[:300],
+        _fmt_score(retrieval),
+        _fmt_score(fidelity),
+        _fmt_latency(latency),
+        retrieval_passed,
+        fidelity_passed,
+        overall_passed,
+        retrieval_details,
+        fidelity_details
+    ]
+
+
+def _report_frame(results: List[EvaluationResult]) -> pd.DataFrame:
+    """Detailed report as a DataFrame, formatted exactly like _report_row."""
+    df = pd.DataFrame.from_records(map(_get_report_fields, results), columns=list(_REPORT_FIELDS))
+    columns = [
+        range(1, len(df) + 1),
+        [_fromtimestamp(ts).isoformat(timespec='seconds') for ts in df['timestamp']],
+        df['question'],
+        df['category'],
+        df['expected_table'],
+        df['status'],
+        df['sql_generated'].fillna('').str.slice(0, 200),
+        df['data_rows'],
+        df['insights'].fillna('').str.slice(0, 300),
+        df['retrieval_accuracy'].map(_fmt_score),
+        df['generation_fidelity'].map(_fmt_score),
+        df['latency_seconds'].map(_fmt_latency),
+        df['retrieval_passed'],
+        df['fidelity_passed'],
+        df['overall_passed'],
+        df['retrieval_details'],
+        df['fidelity_details']
+    ]
+    return pd.DataFrame(dict(zip(_REPORT_HEADER, columns)))
+
+
+def _call_agent(test_case: Dict, cache_mode: Optional[str] = None) -> tuple:
+    """
+    Run the agent for one test case; returns (result, latency seconds).
+    cache_mode: None (no cache), 'use', 'replay' or 'refresh' for the on-disk agent cache.
+    """
+    question = test_case.get('question', '')
+    filters = test_case.get('filters')
+    start_ns = time.perf_counter_ns()
+    try:
+        if cache_mode is None:
+            result = nabahan_agent(question, filters)
+        else:
+            result = agent_cache.cached_call(
+                nabahan_agent, question, filters,
+                replay=cache_mode == 'replay',
+                refresh=cache_mode == 'refresh'
+            )
+    except agent_cache.AgentCacheMiss:
+        raise
+    except Exception as e:
+        result = {
+            'status': 'error',
+            'data': None,
+            'insights': f"Error: {str(e)}",
+            'sql': '',
+            'chart_type': 'none'
+        }
+    return result, (time.perf_counter_ns() - start_ns) * 1e-9
+
+
+async def _gather_agent_calls(test_cases: List[Dict], cache_mode: Optional[str], concurrency: int) -> List[tuple]:
+    """Run agent calls as asyncio tasks on worker threads, at most `concurrency` at a time."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_one(tc: Dict) -> tuple:
+        async with semaphore:
+            return await asyncio.to_thread(_call_agent, tc, cache_mode)
+
+    return await asyncio.gather(*(run_one(tc) for tc in test_cases))
 
 
 class NabahanEvaluationPipeline:
@@ -29,23 +187,32 @@ class NabahanEvaluationPipeline:
     - Saves detailed CSV report
     """
 
-    def __init__(self, output_dir: Optional[str] = None):
+    def __init__(self, output_dir: Optional[str] = None, cache_mode: Optional[str] = None):
+        # On-disk agent response cache: None, 'use', 'replay' or 'refresh'
+        self.cache_mode = cache_mode
         self.output_dir = Path(output_dir) if output_dir else Path(__file__).parent / "results"
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
         self.metrics = NabahanMetrics()
-        self.visualizer = EvaluationVisualizer(str(self.output_dir / "charts"))
+        self.charts_dir = self.output_dir / "charts"
 
         self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
+    @cached_property
+    def visualizer(self) -> "EvaluationVisualizer":
+        """Chart generator; imported on first use so runs without charts skip matplotlib."""
+        from evaluation.visualize import EvaluationVisualizer
+        return EvaluationVisualizer(str(self.charts_dir))
+
     def load_test_cases(self, filepath: Optional[str] = None) -> List[Dict]:
         """Load test cases from JSON file."""
         if filepath is None:
             filepath = Path(__file__).parent / "test_cases.json"
 
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            cases = _load_test_cases_cached(str(filepath), os.path.getmtime(filepath))
+            # Fresh dicts so callers can't mutate the cached copy
+            return [dict(tc) for tc in cases]
         except FileNotFoundError:
             print(f"Test cases file not found: {filepath}")
             return self._get_default_test_cases()
@@ -64,43 +231,60 @@ class NabahanEvaluationPipeline:
 
     def run_single_test(self, test_case: Dict) -> EvaluationResult:
         """Run evaluation on a single test case."""
-        question = test_case.get('question', '')
-        filters = test_case.get('filters')
-        expected_table = test_case.get('expected_table')
-        category = test_case.get('category')
+        result, latency = _call_agent(test_case, self.cache_mode)
+        return self._score(test_case, result, latency)
 
-        # Start timing
-        self.metrics.start_timer()
-
-        # Call the agent
-        try:
-            result = nabahan_agent(question, filters)
-        except Exception as e:
-            result = {
-                'status': 'error',
-                'data': None,
-                'insights': f"Error: {str(e)}",
-                'sql': '',
-                'chart_type': 'none'
-            }
-
-        # Stop timing
-        latency = self.metrics.stop_timer()
-
-        # Evaluate
-        eval_result = self.metrics.evaluate_query(
-            question=question,
+    def _score(self, test_case: Dict, result: Dict[str, Any], latency: float) -> EvaluationResult:
+        """Evaluate an agent result (runs on the main thread; metrics are not thread-safe)."""
+        return self.metrics.evaluate_query(
+            question=test_case.get('question', ''),
             result=result,
             latency=latency,
-            expected_table=expected_table,
-            category=category
+            expected_table=test_case.get('expected_table'),
+            category=test_case.get('category')
         )
 
-        return eval_result
-
-    def run_full_evaluation(self, test_cases: List[Dict] = None) -> Dict[str, Any]:
+    def _agent_responses(self, test_cases: List[Dict], workers: int, use_async: bool):
+        """
+        Yield (result, latency) per test case, in test-case order.
+        Duplicate (question, filters) pairs share a single agent call.
+        """
+        slots: Dict[tuple, int] = {}
+        unique_cases: List[Dict] = []
+        case_slots: List[int] = []
+        for tc in test_cases:
+            key = (tc.get('question', ''), json.dumps(tc.get('filters'), sort_keys=True, ensure_ascii=False))
+            if key not in slots:
+                slots[key] = len(unique_cases)
+                unique_cases.append(tc)
+            case_slots.append(slots[key])
+
+        if len(unique_cases) < len(test_cases):
+            print(f"Deduplicated {len(test_cases) - len(unique_cases)} repeated test case(s)")
+
+        if use_async:
+            responses = asyncio.run(_gather_agent_calls(unique_cases, self.cache_mode, workers))
+            yield from (responses[slot] for slot in case_slots)
+            return
+
+        # Agent calls are I/O bound (LLM + SQLite), so threads avoid pickling the agent
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = [executor.submit(_call_agent, tc, self.cache_mode) for tc in unique_cases]
+            for slot in case_slots:
+                yield futures[slot].result()
+
+    def run_full_evaluation(
+        self,
+        test_cases: List[Dict] = None,
+        workers: int = EVAL_MAX_WORKERS,
+        verbose: bool = False,
+        use_async: bool = False
+    ) -> Dict[str, Any]:
         """
         Run complete evaluation pipeline.
+        Agent calls run concurrently on `workers` threads (or asyncio tasks with
+        use_async); scoring stays on this thread.
+        Per-case lines are printed only when verbose; otherwise a progress bar is shown.
 
         Returns summary with all metrics.
         """
@@ -115,25 +299,32 @@ class NabahanEvaluationPipeline:
         print(f"Output Dir: {self.output_dir}")
         print("=" * 70)
 
-        results = []
+        results: List[Optional[EvaluationResult]] = [None] * len(test_cases)
 
-        for i, tc in enumerate(test_cases, 1):
-            question = tc.get('question', '')[:50]
-            category = tc.get('category', 'unknown')
+        responses = self._agent_responses(test_cases, workers, use_async)
+        if not verbose and tqdm is not None:
+            responses = tqdm(responses, total=len(test_cases), desc="Evaluating")
 
-            print(f"\n[{i}/{len(test_cases)}] {category.upper()}")
-            print(f"    Q: {question}...")
+        for i, (tc, (result, latency)) in enumerate(zip(test_cases, responses), 1):
+            eval_result = self._score(tc, result, latency)
+            results[i - 1] = eval_result
 
-            eval_result = self.run_single_test(tc)
-            results.append(eval_result)
+            if verbose:
+                question = tc.get('question', '')[:50]
+                category = tc.get('category', 'unknown')
+                status_icon = "PASS" if eval_result.overall_passed else "FAIL"
+                print(f"\n[{i}/{len(test_cases)}] {category.upper()}")
+                print(f"    Q: {question}...")
+                print(f"    Retrieval: {eval_result.retrieval_accuracy:.0%} | "
+                      f"Fidelity: {eval_result.generation_fidelity:.0%} | "
+                      f"Latency: {eval_result.latency_seconds:.2f}s | "
+                      f"[{status_icon}]")
 
-            status_icon = "PASS" if eval_result.overall_passed else "FAIL"
-            print(f"    Retrieval: {eval_result.retrieval_accuracy:.0%} | "
-                  f"Fidelity: {eval_result.generation_fidelity:.0%} | "
-                  f"Latency: {eval_result.latency_seconds:.2f}s | "
-                  f"[{status_icon}]")
+        if self.cache_mode is not None:
+            agent_cache.save()
 
-        # Get summary
+        # Overall and per-category totals were accumulated by evaluate_query during
+        # the scoring loop, so this only finalizes averages (no rescan of results)
         summary = self.metrics.get_summary()
 
         # Print summary
@@ -151,6 +342,7 @@ class NabahanEvaluationPipeline:
         print(f"Avg Latency:             {summary['avg_latency']:.2f}s")
         print(f"P50 Latency:             {summary['latency_p50']:.2f}s")
         print(f"P95 Latency:             {summary['latency_p95']:.2f}s")
+        print(f"P99 Latency:             {summary['latency_p99']:.2f}s")
         print("=" * 70)
 
         return {
@@ -166,40 +358,21 @@ class NabahanEvaluationPipeline:
         filename = f"evaluation_results_{self.timestamp}.csv"
         filepath = self.output_dir / filename
 
-        # Detailed results CSV
-        with open(filepath, 'w', newline='', encoding='utf-8') as f:
+        # Large reports: pandas' C writer (same \r\n line endings as csv.writer)
+        if len(results) >= _PANDAS_CSV_MIN_ROWS:
+            _report_frame(results).to_csv(filepath, index=False, encoding='utf-8', lineterminator='\r\n')
+            print(f"\nDetailed results saved to: {filepath}")
+            return str(filepath)
+
+        # Detailed results CSV (large buffer: rows reach the OS in a few big writes)
+        with open(filepath, 'w', newline='', encoding='utf-8', buffering=_CSV_BUFFER_SIZE) as f:
             writer = csv.writer(f)
 
             # Header
-            writer.writerow([
-                'Query #', 'Timestamp', 'Question', 'Category', 'Expected Table',
-                'Status', 'SQL Generated', 'Data Rows', 'Insights',
-                'Retrieval Accuracy', 'Generation Fidelity', 'Latency (s)',
-                'Retrieval Passed', 'Fidelity Passed', 'Overall Passed',
-                'Retrieval Details', 'Fidelity Details'
-            ])
-
-            # Data rows
-            for i, r in enumerate(results, 1):
-                writer.writerow([
-                    i,
-                    r.timestamp,
-                    r.question,
-                    r.category,
-                    r.expected_table,
-                    r.status,
-                    r.sql_generated[:200] if r.sql_generated else '',
-                    r.data_rows,
-                    r.insights[:300] if r.insights else '',
-                    f"{r.retrieval_accuracy:.2f}",
-                    f"{r.generation_fidelity:.2f}",
-                    f"{r.latency_seconds:.3f}",
-                    r.retrieval_passed,
-                    r.fidelity_passed,
-                    r.overall_passed,
-                    r.retrieval_details,
-                    r.fidelity_details
-                ])
+            writer.writerow(_REPORT_HEADER)
+
+            # Data rows (fewer than _PANDAS_CSV_MIN_ROWS here)
+            writer.writerows(_report_row(i, r) for i, r in enumerate(results, 1))
 
         print(f"\nDetailed results saved to: {filepath}")
         return str(filepath)
@@ -225,6 +398,7 @@ class NabahanEvaluationPipeline:
             writer.writerow(['Avg Latency (s)', f"{summary['avg_latency']:.2f}"])
             writer.writerow(['P50 Latency (s)', f"{summary['latency_p50']:.2f}"])
             writer.writerow(['P95 Latency (s)', f"{summary['latency_p95']:.2f}"])
+            writer.writerow(['P99 Latency (s)', f"{summary['latency_p99']:.2f}"])
 
             # Category breakdown
             writer.writerow([])
@@ -251,33 +425,30 @@ class NabahanEvaluationPipeline:
         Generate all visualization charts.
         """
         # Convert EvaluationResult objects to dicts for visualization
-        results_dicts = [
-            {
-                'question': r.question,
-                'retrieval_accuracy': r.retrieval_accuracy,
-                'generation_fidelity': r.generation_fidelity,
-                'latency_seconds': r.latency_seconds,
-                'overall_passed': r.overall_passed,
-                'category': r.category
-            }
-            for r in results
-        ]
+        results_dicts = [dict(zip(_CHART_FIELDS, _get_chart_fields(r))) for r in results]
 
         charts = self.visualizer.generate_all_charts(summary, results_dicts)
         return charts
 
-    def run_complete_pipeline(self, test_cases: List[Dict] = None) -> Dict[str, Any]:
+    def run_complete_pipeline(
+        self,
+        test_cases: List[Dict] = None,
+        workers: int = EVAL_MAX_WORKERS,
+        generate_charts: bool = True,
+        verbose: bool = False,
+        use_async: bool = False
+    ) -> Dict[str, Any]:
         """
         Run the complete evaluation pipeline:
         1. Execute all test cases
         2. Calculate metrics
-        3. Generate visualizations
+        3. Generate visualizations (skipped when generate_charts is False)
         4. Save CSV reports
 
         Returns complete results package.
         """
         # Run evaluation
-        eval_data = self.run_full_evaluation(test_cases)
+        eval_data = self.run_full_evaluation(test_cases, workers, verbose, use_async)
 
         # Save CSV reports
         print("\n" + "-" * 40)
@@ -286,8 +457,10 @@ class NabahanEvaluationPipeline:
         summary_csv = self.save_summary_csv(eval_data['summary'])
 
         # Generate visualizations
-        print("\n" + "-" * 40)
-        charts = self.generate_visualizations(eval_data['summary'], eval_data['results'])
+        charts = {}
+        if generate_charts:
+            print("\n" + "-" * 40)
+            charts = self.generate_visualizations(eval_data['summary'], eval_data['results'])
 
         print("\n" + "=" * 70)
         print("EVALUATION COMPLETE")
@@ -295,9 +468,10 @@ class NabahanEvaluationPipeline:
         print(f"\nOutput files:")
         print(f"  - Detailed CSV: {detailed_csv}")
         print(f"  - Summary CSV:  {summary_csv}")
-        print(f"  - Charts:       {self.visualizer.output_dir}")
-        for name, path in charts.items():
-            print(f"      - {name}: {Path(path).name}")
+        if charts:
+            print(f"  - Charts:       {self.charts_dir}")
+            for name, path in charts.items():
+                print(f"      - {name}: {Path(path).name}")
 
         return {
             'summary': eval_data['summary'],
@@ -321,10 +495,25 @@ def main():
                         help='Output directory for results')
     parser.add_argument('--quick', action='store_true',
                         help='Run quick test with fewer cases')
+    parser.add_argument('--workers', type=int, default=EVAL_MAX_WORKERS,
+                        help='Concurrent agent calls')
+    parser.add_argument('--no-charts', action='store_true',
+                        help='Skip chart generation (CSV reports only)')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Print a line per test case instead of a progress bar')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Dispatch agent calls with asyncio (bounded by --workers)')
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument('--cache', dest='cache_mode', action='store_const', const='use',
+                             help='Reuse agent responses cached on disk, calling the agent on misses')
+    cache_group.add_argument('--replay', dest='cache_mode', action='store_const', const='replay',
+                             help='Score cached agent responses only; fail on a cache miss')
+    cache_group.add_argument('--refresh', dest='cache_mode', action='store_const', const='refresh',
+                             help='Call the agent for every case and overwrite the cache')
     args = parser.parse_args()
 
     # Initialize pipeline
-    pipeline = NabahanEvaluationPipeline(output_dir=args.output_dir)
+    pipeline = NabahanEvaluationPipeline(output_dir=args.output_dir, cache_mode=args.cache_mode)
 
     # Load test cases
     if args.test_file:
@@ -338,7 +527,13 @@ def main():
         print(f"Quick mode: Using {len(test_cases)} test cases")
 
     # Run pipeline
-    results = pipeline.run_complete_pipeline(test_cases)
+    results = pipeline.run_complete_pipeline(
+        test_cases,
+        workers=args.workers,
+        generate_charts=not args.no_charts,
+        verbose=args.verbose,
+        use_async=args.use_async
+    )
 
     # Print final pass rate
     print(f"\n{'='*70}")
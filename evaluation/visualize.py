@@ -2,18 +2,44 @@
 # Nabahan Agent - Evaluation Visualization
 # Generates charts and tables from evaluation results
 
+import io
 import os
 import sys
+import json
+import shutil
+import hashlib
+import inspect
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Any, Optional
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import matplotlib
+from PIL import Image, ImageDraw, ImageFont  # Pillow ships with matplotlib
 matplotlib.use('Agg')  # Non-interactive backend for saving files
 
+try:
+    import pyspng
+except ImportError:  # Optional: faster PNG encoding via libspng
+    pyspng = None
+
+try:
+    import arabic_reshaper
+    from bidi.algorithm import get_display
+except ImportError:  # Optional: Arabic table text is drawn unshaped
+    arabic_reshaper = None
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from evaluation._stats import latency_histogram
+
 # Set up for Arabic text support
-plt.rcParams['font.family'] = ['DejaVu Sans', 'Arial', 'sans-serif']
-plt.rcParams['axes.unicode_minus'] = False
+matplotlib.rcParams['font.family'] = ['DejaVu Sans', 'Arial', 'sans-serif']
+matplotlib.rcParams['axes.unicode_minus'] = False
 
 # Color scheme matching Nabahan branding
 COLORS = {
@@ -28,6 +54,239 @@ COLORS = {
 
 GREEN_PALETTE = ['#1a635a', '#2fb38e', '#57cc99', '#80ed99', '#c7f9cc']
 
+# Detailed results table (drawn directly with Pillow)
+_TABLE_WIDTH = 1400
+_TABLE_ROW_HEIGHT = 30
+_TABLE_TITLE_HEIGHT = 50
+_TABLE_COL_WIDTHS = (60, 620, 180, 180, 180, 180)
+
+
+def _load_table_font(size: int, bold: bool = False):
+    """TrueType font matching the matplotlib charts (Pillow default if unavailable)."""
+    try:
+        from matplotlib import font_manager
+        path = font_manager.findfont(font_manager.FontProperties(
+            family='DejaVu Sans', weight='bold' if bold else 'normal'))
+        return ImageFont.truetype(path, size)
+    except Exception:
+        return ImageFont.load_default()
+
+
+# Figures are sized up front and laid out with tight_layout, so no
+# bbox_inches='tight' re-render pass; fast deflate suits flat-colour charts
+_SAVEFIG_KWARGS = {'facecolor': 'white', 'pil_kwargs': {'compress_level': 1}}
+
+# 100 dpi keeps charts sharp at dashboard width with 2.25x fewer pixels than 150
+_DEFAULT_DPI = 100
+
+# Chart cache directories kept under output_dir/.cache (most recently used first)
+_CHART_CACHE_MAX_DIRS = 5
+
+
+def _encode_png(fig, dpi: int = _DEFAULT_DPI) -> bytes:
+    """Encode a figure as PNG bytes, using libspng on the Agg buffer when available."""
+    if pyspng is None:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=dpi, **_SAVEFIG_KWARGS)
+        return buffer.getvalue()
+    fig.set_dpi(dpi)
+    fig.canvas.draw()
+    buf = np.asarray(fig.canvas.buffer_rgba())
+    return pyspng.encode(buf, compress_level=_SAVEFIG_KWARGS['pil_kwargs']['compress_level'])
+
+
+@lru_cache(maxsize=1)
+def _table_fonts() -> tuple:
+    """(cell, header, title) fonts, resolved on first table draw."""
+    return _load_table_font(15), _load_table_font(15, bold=True), _load_table_font(22, bold=True)
+
+
+@lru_cache(maxsize=1)
+def _pyplot():
+    """matplotlib.pyplot, imported on first use (it costs a few hundred ms)."""
+    import matplotlib.pyplot as plt
+    return plt
+
+
+@lru_cache(maxsize=1024)
+def _shape_ar(text: str) -> str:
+    """Reshape and reorder Arabic text for display (Pillow does no bidi/shaping)."""
+    if arabic_reshaper is None or not text:
+        return text
+    return get_display(arabic_reshaper.reshape(text))
+
+
+def _results_table_image(table_data: List[List[str]]) -> "Image.Image":
+    """Draw the detailed results table (title, header row, cells) into a bitmap."""
+    headers = ['#', 'Question (truncated)', 'Retrieval', 'Fidelity', 'Latency', 'Status']
+    cell_font, header_font, title_font = _table_fonts()
+    row_h = _TABLE_ROW_HEIGHT
+    top = _TABLE_TITLE_HEIGHT
+    total_h = top + row_h * (len(table_data) + 1) + 10
+    image = Image.new('RGB', (_TABLE_WIDTH, total_h), 'white')
+    draw = ImageDraw.Draw(image)
+
+    draw.text((_TABLE_WIDTH // 2, top // 2), 'Detailed Evaluation Results',
+              fill='black', font=title_font, anchor='mm')
+
+    status_fills = {'PASS': COLORS['light'], 'FAIL': '#fecaca'}
+    rows = [(headers, True)] + [(row, False) for row in table_data]
+
+    for r_idx, (row, is_header) in enumerate(rows):
+        y0 = top + r_idx * row_h
+        x0 = 0
+        for c_idx, (cell, width) in enumerate(zip(row, _TABLE_COL_WIDTHS)):
+            if is_header:
+                fill = COLORS['primary']
+            elif c_idx == 5:
+                fill = status_fills.get(cell, 'white')
+            else:
+                fill = 'white'
+            draw.rectangle([x0, y0, x0 + width - 1, y0 + row_h - 1], fill=fill, outline='black')
+            draw.text((x0 + width // 2, y0 + row_h // 2), cell,
+                      fill='white' if is_header else 'black',
+                      font=header_font if is_header else cell_font, anchor='mm')
+            x0 += width
+
+    return image
+
+
+@lru_cache(maxsize=1)
+def _empty_results_png() -> bytes:
+    """PNG bytes of the 'No results available' table, encoded once per process."""
+    buffer = io.BytesIO()
+    _results_table_image([['', 'No results available', '', '', '', '']]).save(
+        buffer, format='PNG', optimize=False, compress_level=1)
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=4)
+def _empty_category_png(dpi: int = _DEFAULT_DPI) -> bytes:
+    """PNG bytes of the 'No category data available' chart, rendered once per process."""
+    plt = _pyplot()
+    fig = plt.figure(figsize=(10, 6))
+    try:
+        fig.add_subplot().text(0.5, 0.5, 'No category data available', ha='center', va='center')
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=dpi, **_SAVEFIG_KWARGS)
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+def _extract_latencies(results: List[Dict]) -> np.ndarray:
+    """Latency column of the results as a float64 array."""
+    return np.fromiter(
+        (r.get('latency_seconds', r.get('latency', 0.0)) for r in results),
+        dtype=np.float64, count=len(results)
+    )
+
+
+def _link_file(src: Path, dst: Path):
+    """Hardlink src to dst, replacing dst (copies across filesystems)."""
+    if dst.exists():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+@dataclass(frozen=True)
+class DerivedSummary:
+    """Values derived from (summary, results) once and shared by every chart."""
+    retrieval_pct: float
+    fidelity_pct: float
+    pass_pct: float
+    latencies_arr: np.ndarray
+    latency_mean: float
+
+    @classmethod
+    def build(cls, summary: Dict[str, Any], results: Optional[List[Dict]] = None) -> "DerivedSummary":
+        latencies = _extract_latencies(results or [])
+        return cls(
+            retrieval_pct=summary.get('avg_retrieval_accuracy', 0) * 100,
+            fidelity_pct=summary.get('avg_generation_fidelity', 0) * 100,
+            pass_pct=summary.get('pass_rate', 0) * 100,
+            latencies_arr=latencies,
+            latency_mean=float(latencies.mean()) if latencies.size else 0.0
+        )
+
+
+def _draw_metrics_bars(ax, derived: DerivedSummary, labels: List[str], fontsize: Optional[int] = None):
+    """Metric bars with value labels, pass threshold and grid (overview and dashboard)."""
+    values = [derived.retrieval_pct, derived.fidelity_pct, derived.pass_pct]
+    bars = ax.bar(labels, values, color=[COLORS['primary'], COLORS['secondary'], COLORS['success']])
+
+    # Add value labels on bars
+    for bar, val in zip(bars, values):
+        ax.annotate(f'{val:.1f}%',
+                    xy=(bar.get_x() + bar.get_width() / 2, bar.get_height()),
+                    xytext=(0, 3),
+                    textcoords="offset points",
+                    ha='center', va='bottom',
+                    fontsize=fontsize, fontweight='bold')
+
+    ax.set_ylim(0, 110)
+    ax.axhline(y=60, color=COLORS['warning'], linestyle='--', alpha=0.7, label='Pass Threshold (60%)')
+    ax.yaxis.grid(True, linestyle='--', alpha=0.3)
+    ax.set_axisbelow(True)
+
+
+def _draw_pass_fail_pie(ax, passed: int, failed: int, label_sep: str = ' ', **pie_kwargs):
+    """Pass/fail pie; returns the percentage labels."""
+    _, _, autotexts = ax.pie(
+        [passed, failed],
+        explode=(0.05, 0),
+        labels=[f'Passed{label_sep}({passed})', f'Failed{label_sep}({failed})'],
+        colors=[COLORS['success'], COLORS['error']],
+        autopct='%1.1f%%',
+        shadow=True,
+        **pie_kwargs
+    )
+    return autotexts
+
+
+def _draw_latency_hist(ax, latencies: np.ndarray, mean: float, bins: int, fontsize: Optional[int] = None):
+    """Latency histogram with the mean marked (binned in one pass, painted as bars)."""
+    counts, edges = latency_histogram(latencies, bins)
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge',
+           color=COLORS['primary'], edgecolor='white', alpha=0.8)
+    ax.axvline(x=mean, color=COLORS['error'], linestyle='--', linewidth=2, label=f'Avg: {mean:.2f}s')
+    ax.set_xlabel('Latency (seconds)', fontsize=fontsize)
+    ax.set_ylabel('Frequency', fontsize=fontsize)
+    ax.legend()
+    ax.yaxis.grid(True, linestyle='--', alpha=0.3)
+
+
+def _render_chart(
+        visualizer: "EvaluationVisualizer",
+        method_name: str,
+        args: tuple,
+        kwargs: Optional[Dict[str, Any]] = None
+) -> str:
+    """Process-pool entry point: render one chart and return its path."""
+    return getattr(visualizer, method_name)(*args, **(kwargs or {}))
+
+
+def _render_chart_isolated(
+        output_dir: Path,
+        dpi: int,
+        method_name: str,
+        args: tuple,
+        kwargs: Optional[Dict[str, Any]]
+) -> str:
+    """Thread entry point: render with a private visualizer so figures are never shared."""
+    visualizer = EvaluationVisualizer(output_dir, dpi=dpi)
+    try:
+        return _render_chart(visualizer, method_name, args, kwargs)
+    finally:
+        visualizer.close_figures()
+
+
+# pyplot's figure registry is global; guard it when rendering from threads
+_PYPLOT_LOCK = threading.Lock()
+
 
 class EvaluationVisualizer:
     """
@@ -40,53 +299,103 @@ class EvaluationVisualizer:
     - Summary tables
     """
 
-    def __init__(self, output_dir: str = None):
+    def __init__(self, output_dir: str = None, dpi: int = _DEFAULT_DPI):
         self.output_dir = Path(output_dir) if output_dir else Path(__file__).parent / "charts"
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.dpi = dpi
+        self._figures: Dict[tuple, Any] = {}  # figsize -> reusable Figure
+        self._deferred: Optional[List[tuple]] = None  # (path, bytes) awaiting a batched write
+        self._latency_layout: Optional[tuple] = None  # (fig, ax_hist, ax_line, data_artists)
+
+    def __getstate__(self):
+        # Figures stay in the owning process (workers build their own)
+        state = self.__dict__.copy()
+        state['_figures'] = {}
+        state['_deferred'] = None
+        state['_latency_layout'] = None
+        return state
+
+    def _figure(self, figsize: tuple):
+        """Cleared Figure of the given size, reused across calls."""
+        fig = self._figures.get(figsize)
+        if fig is None:
+            with _PYPLOT_LOCK:
+                fig = self._figures[figsize] = _pyplot().figure(figsize=figsize)
+        else:
+            fig.clf()
+        return fig
+
+    def _emit(self, filepath: Path, data: bytes):
+        """Write an output file now, or queue it while writes are being batched."""
+        if self._deferred is not None:
+            self._deferred.append((filepath, data))
+        else:
+            filepath.write_bytes(data)
+
+    def _flush_outputs(self):
+        """Write all queued outputs concurrently."""
+        pending, self._deferred = self._deferred or [], None
+        if not pending:
+            return
+        with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+            list(executor.map(lambda item: item[0].write_bytes(item[1]), pending))
+
+    def close_figures(self):
+        """Release the reusable figures."""
+        with _PYPLOT_LOCK:
+            for fig in self._figures.values():
+                _pyplot().close(fig)
+        self._figures.clear()
+        self._latency_layout = None
+
+    def _latency_figure(self) -> tuple:
+        """
+        Latency figure whose static parts (titles, labels, target line, grid)
+        are built once; repeat calls only swap the data artists.
+        """
+        if self._latency_layout is not None:
+            fig, ax1, ax2, artists = self._latency_layout
+            ax1.cla()
+            for artist in artists:
+                artist.remove()
+            artists.clear()
+            return self._latency_layout
+
+        fig = self._figure((14, 5))
+        ax1, ax2 = fig.subplots(1, 2)
+        ax2.axhline(y=5, color=COLORS['warning'], linestyle='--', alpha=0.7, label='Target: 5s')
+        ax2.set_xlabel('Query Number', fontsize=11)
+        ax2.set_ylabel('Latency (seconds)', fontsize=11)
+        ax2.set_title('Latency per Query', fontsize=12, fontweight='bold')
+        ax2.legend()
+        ax2.yaxis.grid(True, linestyle='--', alpha=0.3)
+        fig.suptitle('Nabahan Agent - Latency Analysis', fontsize=14, fontweight='bold', y=0.98)
+
+        self._latency_layout = (fig, ax1, ax2, [])
+        return self._latency_layout
 
     def create_metrics_bar_chart(
         self,
         summary: Dict[str, Any],
-        filename: str = "metrics_overview.png"
+        filename: str = "metrics_overview.png",
+        derived: Optional[DerivedSummary] = None
     ) -> str:
         """
         Create bar chart showing average scores for each metric.
         """
-        fig, ax = plt.subplots(figsize=(10, 6))
+        fig = self._figure((10, 6))
+        ax = fig.add_subplot()
 
-        metrics = ['Retrieval\nAccuracy', 'Generation\nFidelity', 'Pass Rate']
-        values = [
-            summary.get('avg_retrieval_accuracy', 0) * 100,
-            summary.get('avg_generation_fidelity', 0) * 100,
-            summary.get('pass_rate', 0) * 100
-        ]
-
-        bars = ax.bar(metrics, values, color=[COLORS['primary'], COLORS['secondary'], COLORS['success']])
+        derived = derived or DerivedSummary.build(summary)
+        _draw_metrics_bars(ax, derived, ['Retrieval\nAccuracy', 'Generation\nFidelity', 'Pass Rate'], fontsize=12)
 
-        # Add value labels on bars
-        for bar, val in zip(bars, values):
-            height = bar.get_height()
-            ax.annotate(f'{val:.1f}%',
-                        xy=(bar.get_x() + bar.get_width() / 2, height),
-                        xytext=(0, 3),
-                        textcoords="offset points",
-                        ha='center', va='bottom',
-                        fontsize=12, fontweight='bold')
-
-        ax.set_ylim(0, 110)
         ax.set_ylabel('Score (%)', fontsize=12)
         ax.set_title('Nabahan Agent - Evaluation Metrics Overview', fontsize=14, fontweight='bold')
-        ax.axhline(y=60, color=COLORS['warning'], linestyle='--', alpha=0.7, label='Pass Threshold (60%)')
         ax.legend(loc='upper right')
 
-        # Add grid
-        ax.yaxis.grid(True, linestyle='--', alpha=0.3)
-        ax.set_axisbelow(True)
-
-        plt.tight_layout()
+        fig.tight_layout()
         filepath = self.output_dir / filename
-        plt.savefig(filepath, dpi=150, bbox_inches='tight', facecolor='white')
-        plt.close()
+        self._emit(filepath, _encode_png(fig, self.dpi))
 
         return str(filepath)
 
@@ -98,7 +407,8 @@ class EvaluationVisualizer:
         """
         Create pie chart showing pass/fail distribution.
         """
-        fig, ax = plt.subplots(figsize=(8, 8))
+        fig = self._figure((8, 8))
+        ax = fig.add_subplot()
 
         passed = summary.get('passed', 0)
         failed = summary.get('failed', 0)
@@ -106,21 +416,8 @@ class EvaluationVisualizer:
         if passed + failed == 0:
             passed, failed = 1, 0  # Avoid division by zero
 
-        sizes = [passed, failed]
-        labels = [f'Passed\n({passed})', f'Failed\n({failed})']
-        colors = [COLORS['success'], COLORS['error']]
-        explode = (0.05, 0)
-
-        wedges, texts, autotexts = ax.pie(
-            sizes,
-            explode=explode,
-            labels=labels,
-            colors=colors,
-            autopct='%1.1f%%',
-            shadow=True,
-            startangle=90,
-            textprops={'fontsize': 12}
-        )
+        autotexts = _draw_pass_fail_pie(ax, passed, failed, label_sep='\n',
+                                        startangle=90, textprops={'fontsize': 12})
 
         for autotext in autotexts:
             autotext.set_fontweight('bold')
@@ -128,55 +425,48 @@ class EvaluationVisualizer:
 
         ax.set_title('Test Results Distribution', fontsize=14, fontweight='bold')
 
-        plt.tight_layout()
+        fig.tight_layout()
         filepath = self.output_dir / filename
-        plt.savefig(filepath, dpi=150, bbox_inches='tight', facecolor='white')
-        plt.close()
+        self._emit(filepath, _encode_png(fig, self.dpi))
 
         return str(filepath)
 
     def create_latency_chart(
         self,
         results: List[Dict],
-        filename: str = "latency_analysis.png"
+        filename: str = "latency_analysis.png",
+        derived: Optional[DerivedSummary] = None
     ) -> str:
         """
         Create chart showing latency distribution and trends.
         """
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
+        fig, ax1, ax2, artists = self._latency_figure()
 
-        latencies = [r.get('latency_seconds', r.get('latency', 0)) for r in results]
+        if derived is not None:
+            latencies, avg_lat = derived.latencies_arr, derived.latency_mean
+        else:
+            latencies = _extract_latencies(results)
+            avg_lat = latencies.mean() if latencies.size else 0.0
 
-        if not latencies:
-            latencies = [0]
+        if not latencies.size:
+            latencies = np.zeros(1)
 
         # Left: Histogram
-        ax1.hist(latencies, bins=10, color=COLORS['primary'], edgecolor='white', alpha=0.8)
-        ax1.axvline(x=sum(latencies)/len(latencies), color=COLORS['error'],
-                    linestyle='--', linewidth=2, label=f'Avg: {sum(latencies)/len(latencies):.2f}s')
-        ax1.set_xlabel('Latency (seconds)', fontsize=11)
-        ax1.set_ylabel('Frequency', fontsize=11)
+        _draw_latency_hist(ax1, latencies, avg_lat, bins=10, fontsize=11)
         ax1.set_title('Latency Distribution', fontsize=12, fontweight='bold')
-        ax1.legend()
-        ax1.yaxis.grid(True, linestyle='--', alpha=0.3)
 
         # Right: Line chart (query sequence)
-        ax2.plot(range(1, len(latencies) + 1), latencies, marker='o',
-                 color=COLORS['primary'], linewidth=2, markersize=6)
-        ax2.axhline(y=5, color=COLORS['warning'], linestyle='--', alpha=0.7, label='Target: 5s')
-        ax2.fill_between(range(1, len(latencies) + 1), latencies,
-                         alpha=0.2, color=COLORS['primary'])
-        ax2.set_xlabel('Query Number', fontsize=11)
-        ax2.set_ylabel('Latency (seconds)', fontsize=11)
-        ax2.set_title('Latency per Query', fontsize=12, fontweight='bold')
-        ax2.legend()
-        ax2.yaxis.grid(True, linestyle='--', alpha=0.3)
-
-        plt.suptitle('Nabahan Agent - Latency Analysis', fontsize=14, fontweight='bold', y=1.02)
-        plt.tight_layout()
+        x = np.arange(1, len(latencies) + 1)
+        artists.extend(ax2.plot(x, latencies, marker='o',
+                                color=COLORS['primary'], linewidth=2, markersize=6))
+        artists.append(ax2.fill_between(x, latencies, alpha=0.2, color=COLORS['primary']))
+        ax2.relim()
+        ax2.update_datalim([(1, 0)])  # relim skips the fill; keep its zero baseline in view
+        ax2.autoscale_view()
+
+        fig.tight_layout(rect=[0, 0, 1, 0.93])
         filepath = self.output_dir / filename
-        plt.savefig(filepath, dpi=150, bbox_inches='tight', facecolor='white')
-        plt.close()
+        self._emit(filepath, _encode_png(fig, self.dpi))
 
         return str(filepath)
 
@@ -189,29 +479,24 @@ class EvaluationVisualizer:
         Create grouped bar chart showing metrics by query category.
         """
         if not category_data:
-            # Create empty chart
-            fig, ax = plt.subplots(figsize=(10, 6))
-            ax.text(0.5, 0.5, 'No category data available', ha='center', va='center')
             filepath = self.output_dir / filename
-            plt.savefig(filepath, dpi=150, bbox_inches='tight', facecolor='white')
-            plt.close()
+            self._emit(filepath, _empty_category_png(self.dpi))
             return str(filepath)
 
-        fig, ax = plt.subplots(figsize=(12, 6))
+        fig = self._figure((12, 6))
+        ax = fig.add_subplot()
 
-        categories = list(category_data.keys())
-        x = range(len(categories))
+        df = pd.DataFrame.from_dict(category_data, orient='index')
+        df = df.reindex(columns=['avg_retrieval', 'avg_fidelity', 'pass_rate']).fillna(0) * 100
+        categories = df.index.tolist()
+        x = np.arange(len(categories))
         width = 0.25
 
-        retrieval_scores = [category_data[c].get('avg_retrieval', 0) * 100 for c in categories]
-        fidelity_scores = [category_data[c].get('avg_fidelity', 0) * 100 for c in categories]
-        pass_rates = [category_data[c].get('pass_rate', 0) * 100 for c in categories]
-
-        bars1 = ax.bar([i - width for i in x], retrieval_scores, width,
+        bars1 = ax.bar(x - width, df['avg_retrieval'].to_numpy(), width,
                        label='Retrieval Accuracy', color=COLORS['primary'])
-        bars2 = ax.bar(x, fidelity_scores, width,
+        bars2 = ax.bar(x, df['avg_fidelity'].to_numpy(), width,
                        label='Generation Fidelity', color=COLORS['secondary'])
-        bars3 = ax.bar([i + width for i in x], pass_rates, width,
+        bars3 = ax.bar(x + width, df['pass_rate'].to_numpy(), width,
                        label='Pass Rate', color=COLORS['success'])
 
         ax.set_xlabel('Category', fontsize=11)
@@ -224,10 +509,9 @@ class EvaluationVisualizer:
         ax.yaxis.grid(True, linestyle='--', alpha=0.3)
         ax.axhline(y=60, color=COLORS['warning'], linestyle='--', alpha=0.5)
 
-        plt.tight_layout()
+        fig.tight_layout()
         filepath = self.output_dir / filename
-        plt.savefig(filepath, dpi=150, bbox_inches='tight', facecolor='white')
-        plt.close()
+        self._emit(filepath, _encode_png(fig, self.dpi))
 
         return str(filepath)
 
@@ -238,12 +522,14 @@ class EvaluationVisualizer:
     ) -> str:
         """
         Create a visual table showing detailed results for each query.
+        Drawn straight into a Pillow bitmap; matplotlib's table artist is slow.
         """
-        fig, ax = plt.subplots(figsize=(14, max(4, len(results) * 0.5 + 2)))
-        ax.axis('off')
+        filepath = self.output_dir / filename
+        if not results:
+            self._emit(filepath, _empty_results_png())
+            return str(filepath)
 
         # Prepare table data
-        headers = ['#', 'Question (truncated)', 'Retrieval', 'Fidelity', 'Latency', 'Status']
         table_data = []
 
         for i, r in enumerate(results[:20], 1):  # Limit to 20 rows
@@ -255,45 +541,56 @@ class EvaluationVisualizer:
 
             table_data.append([
                 str(i),
-                question,
+                _shape_ar(question),
                 f"{retrieval:.0%}",
                 f"{fidelity:.0%}",
                 f"{latency:.2f}s",
                 'PASS' if passed else 'FAIL'
             ])
 
-        if not table_data:
-            table_data = [['', 'No results available', '', '', '', '']]
-
-        table = ax.table(
-            cellText=table_data,
-            colLabels=headers,
-            cellLoc='center',
-            loc='center',
-            colColours=[COLORS['primary']] * len(headers)
-        )
-
-        table.auto_set_font_size(False)
-        table.set_fontsize(9)
-        table.scale(1, 1.5)
-
-        # Style header
-        for i in range(len(headers)):
-            table[(0, i)].set_text_props(color='white', fontweight='bold')
+        buffer = io.BytesIO()
+        _results_table_image(table_data).save(buffer, format='PNG', optimize=False, compress_level=1)
+        self._emit(filepath, buffer.getvalue())
 
-        # Color status cells
-        for i, row in enumerate(table_data, 1):
-            if row[5] == 'PASS':
-                table[(i, 5)].set_facecolor(COLORS['light'])
-            elif row[5] == 'FAIL':
-                table[(i, 5)].set_facecolor('#fecaca')
+        return str(filepath)
 
-        ax.set_title('Detailed Evaluation Results', fontsize=14, fontweight='bold', pad=20)
+    def create_detailed_results_table_html(
+        self,
+        results: List[Dict],
+        filename: str = "detailed_results.html"
+    ) -> str:
+        """
+        Write the detailed results as an HTML table (all rows, full questions).
+        A few KB of markup instead of a rasterized image, for dashboards and CI.
+        """
+        df = pd.DataFrame({
+            '#': range(1, len(results) + 1),
+            'Question': [r.get('question', '') for r in results],
+            'Retrieval': [r.get('retrieval_accuracy', r.get('retrieval', 0)) for r in results],
+            'Fidelity': [r.get('generation_fidelity', r.get('fidelity', 0)) for r in results],
+            'Latency': [r.get('latency_seconds', r.get('latency', 0)) for r in results],
+            'Status': ['PASS' if r.get('overall_passed', r.get('passed', False)) else 'FAIL' for r in results],
+        })
+        formats = {'Retrieval': '{:.0%}', 'Fidelity': '{:.0%}', 'Latency': '{:.2f}s'}
+        status_fills = {'PASS': COLORS['light'], 'FAIL': '#fecaca'}
+
+        try:
+            html = (
+                df.style
+                .format(formats, escape='html')
+                .apply(lambda col: [f"background-color: {status_fills[v]}" for v in col], subset=['Status'])
+                .set_table_attributes('class="nabahan"')
+                .hide(axis='index')
+                .to_html()
+            )
+        except ImportError:  # Styler needs jinja2; fall back to an unstyled table
+            html = df.to_html(
+                classes='nabahan', index=False, escape=True,
+                formatters={col: fmt.format for col, fmt in formats.items()}
+            )
 
-        plt.tight_layout()
         filepath = self.output_dir / filename
-        plt.savefig(filepath, dpi=150, bbox_inches='tight', facecolor='white')
-        plt.close()
+        self._emit(filepath, html.encode('utf-8'))
 
         return str(filepath)
 
@@ -301,56 +598,40 @@ class EvaluationVisualizer:
         self,
         summary: Dict[str, Any],
         results: List[Dict],
-        filename: str = "evaluation_dashboard.png"
+        filename: str = "evaluation_dashboard.png",
+        derived: Optional[DerivedSummary] = None
     ) -> str:
         """
         Create a comprehensive dashboard with all key visualizations.
         """
-        fig = plt.figure(figsize=(16, 12))
+        fig = self._figure((16, 12))
 
         # Title
         fig.suptitle('Nabahan Agent - Evaluation Dashboard', fontsize=18, fontweight='bold', y=0.98)
 
         # 1. Metrics Overview (top left)
         ax1 = fig.add_subplot(2, 2, 1)
-        metrics = ['Retrieval\nAccuracy', 'Generation\nFidelity', 'Pass\nRate']
-        values = [
-            summary.get('avg_retrieval_accuracy', 0) * 100,
-            summary.get('avg_generation_fidelity', 0) * 100,
-            summary.get('pass_rate', 0) * 100
-        ]
-        bars = ax1.bar(metrics, values, color=[COLORS['primary'], COLORS['secondary'], COLORS['success']])
-        for bar, val in zip(bars, values):
-            ax1.annotate(f'{val:.1f}%', xy=(bar.get_x() + bar.get_width() / 2, bar.get_height()),
-                         xytext=(0, 3), textcoords="offset points", ha='center', fontweight='bold')
-        ax1.set_ylim(0, 110)
+        derived = derived or DerivedSummary.build(summary, results)
+        _draw_metrics_bars(ax1, derived, ['Retrieval\nAccuracy', 'Generation\nFidelity', 'Pass\nRate'])
         ax1.set_title('Metrics Overview', fontweight='bold')
-        ax1.axhline(y=60, color=COLORS['warning'], linestyle='--', alpha=0.7)
-        ax1.yaxis.grid(True, linestyle='--', alpha=0.3)
 
         # 2. Pass/Fail Pie (top right)
         ax2 = fig.add_subplot(2, 2, 2)
         passed = summary.get('passed', 0)
         failed = summary.get('failed', 0)
         if passed + failed > 0:
-            ax2.pie([passed, failed], labels=[f'Passed ({passed})', f'Failed ({failed})'],
-                    colors=[COLORS['success'], COLORS['error']], autopct='%1.1f%%',
-                    explode=(0.05, 0), shadow=True, textprops={'fontweight': 'bold'})
+            _draw_pass_fail_pie(ax2, passed, failed, textprops={'fontweight': 'bold'})
         ax2.set_title('Test Results', fontweight='bold')
 
         # 3. Latency Distribution (bottom left)
         ax3 = fig.add_subplot(2, 2, 3)
-        latencies = [r.get('latency_seconds', r.get('latency', 0)) for r in results]
-        if latencies:
-            ax3.hist(latencies, bins=8, color=COLORS['primary'], edgecolor='white', alpha=0.8)
-            avg_lat = sum(latencies) / len(latencies)
-            ax3.axvline(x=avg_lat, color=COLORS['error'], linestyle='--',
-                        linewidth=2, label=f'Avg: {avg_lat:.2f}s')
-            ax3.legend()
-        ax3.set_xlabel('Latency (seconds)')
-        ax3.set_ylabel('Frequency')
+        if derived.latencies_arr.size:
+            _draw_latency_hist(ax3, derived.latencies_arr, derived.latency_mean, bins=8)
+        else:
+            ax3.set_xlabel('Latency (seconds)')
+            ax3.set_ylabel('Frequency')
+            ax3.yaxis.grid(True, linestyle='--', alpha=0.3)
         ax3.set_title('Latency Distribution', fontweight='bold')
-        ax3.yaxis.grid(True, linestyle='--', alpha=0.3)
 
         # 4. Summary Stats (bottom right)
         ax4 = fig.add_subplot(2, 2, 4)
@@ -377,51 +658,164 @@ class EvaluationVisualizer:
                  verticalalignment='top', fontfamily='monospace',
                  bbox=dict(boxstyle='round', facecolor='#f3f4f6', alpha=0.8))
 
-        plt.tight_layout(rect=[0, 0, 1, 0.96])
+        fig.tight_layout(rect=[0, 0, 1, 0.96])
         filepath = self.output_dir / filename
-        plt.savefig(filepath, dpi=150, bbox_inches='tight', facecolor='white')
-        plt.close()
+        self._emit(filepath, _encode_png(fig, self.dpi))
 
         return str(filepath)
 
+    def _chart_cache_dir(self, summary: Dict[str, Any], results: List[Dict]) -> Path:
+        """Cache directory for the charts of this exact (summary, results) input."""
+        payload = json.dumps({"s": summary, "r": results, "dpi": self.dpi}, sort_keys=True, default=str, ensure_ascii=False)
+        key = hashlib.blake2b(payload.encode('utf-8')).hexdigest()[:16]
+        return self.output_dir / ".cache" / key
+
+    @staticmethod
+    def _evict_chart_cache(cache_root: Path, keep: Path):
+        """Drop all but the _CHART_CACHE_MAX_DIRS most recently used cache directories."""
+        try:
+            dirs = sorted(
+                (d for d in cache_root.iterdir() if d.is_dir() and d != keep),
+                key=lambda d: d.stat().st_mtime,
+                reverse=True
+            )
+        except OSError:
+            return
+        for stale in dirs[_CHART_CACHE_MAX_DIRS - 1:]:
+            shutil.rmtree(stale, ignore_errors=True)
+
+    def _chart_filenames(self, jobs: List[tuple]) -> List[str]:
+        """Output filename of every chart job (the method's default filename)."""
+        return [
+            inspect.signature(getattr(self, method)).parameters['filename'].default
+            for _, method, _, _ in jobs
+        ]
+
+    def _chart_jobs(self, summary: Dict[str, Any], results: List[Dict]) -> List[tuple]:
+        """(name, method_name, args, kwargs) for every chart to render."""
+        shared = {'derived': DerivedSummary.build(summary, results)}
+        jobs = [
+            ('metrics_overview', 'create_metrics_bar_chart', (summary,), shared),
+            ('pass_fail', 'create_pass_fail_pie_chart', (summary,), None),
+            ('latency', 'create_latency_chart', (results,), shared),
+        ]
+        if 'by_category' in summary:
+            jobs.append(('category_breakdown', 'create_category_breakdown_chart', (summary['by_category'],), None))
+        jobs.append(('detailed_results', 'create_detailed_results_table', (results,), None))
+        jobs.append(('detailed_results_html', 'create_detailed_results_table_html', (results,), None))
+        jobs.append(('dashboard', 'create_summary_dashboard', (summary, results), shared))
+        return jobs
+
+    def generate_all_charts_async(
+        self,
+        summary: Dict[str, Any],
+        results: List[Dict],
+        max_workers: int = 2
+    ) -> Dict[str, Future]:
+        """
+        Start rendering all charts on background threads and return immediately.
+        Agg releases the GIL while rasterizing, so callers can overlap other
+        work and call .result() on a future when they need its path.
+
+        Returns dict mapping chart name to Future[str].
+        """
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="charts")
+        futures = {
+            name: executor.submit(_render_chart_isolated, self.output_dir, self.dpi, method, args, kwargs)
+            for name, method, args, kwargs in self._chart_jobs(summary, results)
+        }
+        executor.shutdown(wait=False)  # Workers exit once the queued charts are done
+        return futures
+
     def generate_all_charts(
         self,
         summary: Dict[str, Any],
-        results: List[Dict]
+        results: List[Dict],
+        parallel: bool = False,
+        use_cache: bool = True
     ) -> Dict[str, str]:
         """
         Generate all visualization charts.
+        Charts are independent files, so with parallel=True each one is rendered
+        (and PNG-encoded) in its own worker process. Off by default: spawned
+        workers re-import the evaluation package (and the agent through it),
+        which costs more than rendering the standard charts sequentially.
+        With use_cache=True, charts previously rendered from identical inputs are
+        hardlinked from output_dir/.cache/<hash>/ instead of being re-rendered;
+        only the _CHART_CACHE_MAX_DIRS most recently used inputs are kept.
 
         Returns dict mapping chart name to file path.
         """
-        charts = {}
+        if not results and not summary.get('total_queries'):
+            print("No evaluation results, skipping charts.")
+            return {}
 
         print("Generating visualization charts...")
 
-        # Metrics overview
-        charts['metrics_overview'] = self.create_metrics_bar_chart(summary)
-        print(f"  Created: {charts['metrics_overview']}")
-
-        # Pass/fail pie
-        charts['pass_fail'] = self.create_pass_fail_pie_chart(summary)
-        print(f"  Created: {charts['pass_fail']}")
-
-        # Latency analysis
-        charts['latency'] = self.create_latency_chart(results)
-        print(f"  Created: {charts['latency']}")
+        cache_dir = self._chart_cache_dir(summary, results) if use_cache else None
+        manifest_path = cache_dir / "manifest.json" if cache_dir else None
+        if manifest_path is not None and manifest_path.exists():
+            try:
+                manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+                charts = {}
+                for name, filename in manifest.items():
+                    target = self.output_dir / filename
+                    _link_file(cache_dir / filename, target)
+                    charts[name] = str(target)
+                    print(f"  Cached: {target}")
+                os.utime(cache_dir)  # Mark as recently used for eviction
+                return charts
+            except (OSError, ValueError) as e:
+                print(f"Chart cache unusable, re-rendering: {e}")
+
+        jobs = self._chart_jobs(summary, results)
+
+        # Chart outputs hardlinked from the cache must not be overwritten in place
+        for filename in self._chart_filenames(jobs):
+            output = self.output_dir / filename
+            if output.is_file() and output.stat().st_nlink > 1:
+                output.unlink()
+
+        paths = None
+        if parallel and len(jobs) > 1:
+            try:
+                # spawn: forking a process with matplotlib state loaded is unsafe on macOS
+                with ProcessPoolExecutor(
+                        max_workers=min(len(jobs), os.cpu_count() or 1),
+                        mp_context=multiprocessing.get_context("spawn")
+                ) as executor:
+                    futures = [executor.submit(_render_chart, self, method, args, kwargs) for _, method, args, kwargs in jobs]
+                    paths = [f.result() for f in futures]
+            except Exception as e:
+                print(f"Parallel chart rendering failed, falling back to sequential: {e}")
+
+        if paths is None:
+            # Encode everything first, then overlap the file writes
+            self._deferred = []
+            try:
+                paths = [_render_chart(self, method, args, kwargs) for _, method, args, kwargs in jobs]
+                self._flush_outputs()
+            finally:
+                self._deferred = None
+                self.close_figures()
 
-        # Category breakdown
-        if 'by_category' in summary:
-            charts['category_breakdown'] = self.create_category_breakdown_chart(summary['by_category'])
-            print(f"  Created: {charts['category_breakdown']}")
-
-        # Detailed results table
-        charts['detailed_results'] = self.create_detailed_results_table(results)
-        print(f"  Created: {charts['detailed_results']}")
-
-        # Full dashboard
-        charts['dashboard'] = self.create_summary_dashboard(summary, results)
-        print(f"  Created: {charts['dashboard']}")
+        charts = {}
+        for (name, *_), path in zip(jobs, paths):
+            charts[name] = path
+            print(f"  Created: {path}")
+
+        if cache_dir is not None:
+            try:
+                cache_dir.mkdir(parents=True, exist_ok=True)
+                manifest = {}
+                for name, path in charts.items():
+                    filename = Path(path).name
+                    _link_file(Path(path), cache_dir / filename)
+                    manifest[name] = filename
+                manifest_path.write_text(json.dumps(manifest, ensure_ascii=False), encoding='utf-8')
+                self._evict_chart_cache(cache_dir.parent, keep=cache_dir)
+            except OSError as e:
+                print(f"Could not cache charts: {e}")
 
         return charts
 
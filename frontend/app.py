@@ -3,21 +3,27 @@
 # No Emojis - Green Branding - Professional Theme
 
 import sys
+import csv
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import numpy as np
 import sqlite3
 
+try:
+    from tsdownsample import LTTBDownsampler
+except ImportError:  # Optional: falls back to the NumPy LTTB below
+    LTTBDownsampler = None
+
 from agent.nabahan_logic import (
     nabahan_agent,
     get_filter_options,
-    get_kpi_stats,
-    get_activity_chart_data,
-    get_nature_chart_data
+    get_kpi_stats
 )
 from agent.config import PRIMARY_COLOR, SECONDARY_COLOR, PRIMARY_GRADIENT, GREEN_SHADES, DB_PATH
 
@@ -33,17 +39,16 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Hide sidebar completely
-st.markdown("""
-<style>
-    [data-testid="stSidebar"] {display: none;}
-    [data-testid="stSidebarNav"] {display: none;}
-</style>
-""", unsafe_allow_html=True)
-
 # Main CSS - Green Branding, IBM Plex Sans Arabic, RTL, Navigation Bar
-st.markdown(f"""
+@st.cache_resource
+def _compiled_css():
+    """Main stylesheet, interpolated once per process (branding constants never change)."""
+    return f"""
 <style>
+    /* Hide sidebar completely */
+    [data-testid="stSidebar"] {{display: none;}}
+    [data-testid="stSidebarNav"] {{display: none;}}
+
     @import url('https://fonts.googleapis.com/css2?family=IBM+Plex+Sans+Arabic:wght@400;500;600;700&display=swap');
 
     html, body, [class*="css"], .stMarkdown, p, h1, h2, h3, h4, span, div {{
@@ -416,18 +421,81 @@ st.markdown(f"""
         margin-bottom: 20px;
         border: 1px solid #e5e7eb;
     }}
+
+    /* Small white clear-filters button */
+    .clear-btn-container button {{
+        background-color: white !important;
+        color: #666 !important;
+        border: 1px solid #ddd !important;
+        padding: 0.3rem 1rem !important;
+        font-size: 0.85rem !important;
+        border-radius: 6px !important;
+    }}
+    .clear-btn-container button:hover {{
+        background-color: #f8f8f8 !important;
+        border-color: #bbb !important;
+    }}
 </style>
-""", unsafe_allow_html=True)
+"""
+
+
+# Emitted on every rerun (Streamlit drops elements that a rerun does not re-send)
+st.markdown(_compiled_css(), unsafe_allow_html=True)
+
+# Static page markup (built once per process; KPI cards only fill in their numbers)
+_PAGE_TITLE_TMPL = '''
+<h2 style="font-size: 1.8rem; font-weight: 700; margin-bottom: 1.5rem;">
+    <span class="text-gradient">{title}</span>
+</h2>
+'''
+_TENDERS_TITLE_HTML = _PAGE_TITLE_TMPL.format(title="المنافسات الحكومية")
+_PROJECTS_TITLE_HTML = _PAGE_TITLE_TMPL.format(title="المشاريع المستقبلية")
+
+_HOME_INTRO_HTML = '''
+<div class="info-banner">
+    <h4>كيفية استخدام المساعد الذكي</h4>
+    <p>
+        اسال نبهان اي سؤال حول البيانات، مثل: "ما هي اكثر الانشطة طلبا؟" او "كم عدد المناقصات في الرياض؟"
+        سيقوم النظام باستخراج البيانات وتقديم التحليلات المناسبة.
+    </p>
+</div>
+<h2 style="font-size: 1.8rem; font-weight: 700; margin: 1.5rem 0;">
+    استعلم عن <span class="text-gradient">المنافسات الحكومية</span>
+</h2>
+'''
+
+_KPI_CARD_TMPL = '''
+<div class="{css_class}">
+    <h2>{value:,}</h2>
+    <p>{label}</p>
+</div>
+'''
+
+_APP_FOOTER_HTML = '''
+<br><hr>
+<p style="text-align: center; color: #6b7280; font-size: 0.9rem;">
+    نبهان برو 2026 | منصة تحليل بيانات المشتريات الحكومية
+</p>
+'''
+
+
+def render_kpi_row(cards, css_class="kpi-card"):
+    """Render (value, label) KPI cards side by side."""
+    for col, (value, label) in zip(st.columns(len(cards)), cards):
+        with col:
+            st.markdown(_KPI_CARD_TMPL.format(css_class=css_class, value=value, label=label), unsafe_allow_html=True)
 
 
+@st.cache_data(ttl=3600, show_spinner=False)
 def load_csv_options(filename):
-    """Load options from CSV lookup file."""
+    """Load options from CSV lookup file (unique first-column values, cached)."""
     try:
         filepath = CSV_LOOKUP_PATH / filename
-        df = pd.read_csv(filepath, encoding='utf-8-sig')
-        # Get first column values
-        col = df.columns[0]
-        return df[col].dropna().unique().tolist()
+        with open(filepath, encoding='utf-8-sig', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)  # Header
+            # dict.fromkeys keeps first-seen order while dropping duplicates
+            return list(dict.fromkeys(row[0] for row in reader if row and row[0]))
     except Exception:
         return []
 
@@ -438,8 +506,16 @@ def init_state():
         st.session_state.current_page = 'home'
     if 'filter_options' not in st.session_state:
         st.session_state.filter_options = get_filter_options()
+    if 'csv_lookup' not in st.session_state:
+        st.session_state.csv_lookup = {
+            'entities': load_csv_options("Government Entity.csv"),
+            'regions': load_csv_options("regions.csv"),
+            'types': load_csv_options("tender_types.csv")
+        }
     if 'last_result' not in st.session_state:
         st.session_state.last_result = None
+    if 'pending_query' not in st.session_state:
+        st.session_state.pending_query = None
 
 
 def render_header():
@@ -485,91 +561,357 @@ def calculate_table_height(row_count, row_height=35, header_height=40, max_heigh
     return max(min_height, min(calculated, max_height))
 
 
-def get_tenders_data():
-    """Fetch all tenders data."""
+# Tender rows sent to the browser per "load more" step
+_TENDERS_PAGE_SIZE = 500
+
+# Shorter project searches are ignored (they match nearly every row)
+_PROJECT_SEARCH_MIN_CHARS = 2
+
+# Pie charts show this many largest slices (the long tail is left out)
+_PIE_MAX_SLICES = 10
+
+# Line charts are downsampled to this many points before reaching Plotly
+_LINE_CHART_MAX_POINTS = 2000
+
+
+def _lttb_indices(y, n_out):
+    """Largest-triangle-three-buckets over row positions; returns kept row indices."""
+    if LTTBDownsampler is not None:
+        return LTTBDownsampler().downsample(y, n_out=n_out)
+
+    n = len(y)
+    x = np.arange(n, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_hi = edges[i + 2] if i + 2 < n_out - 1 else n
+        avg_x = x[hi:nxt_hi].mean() if nxt_hi > hi else x[-1]
+        avg_y = y[hi:nxt_hi].mean() if nxt_hi > hi else y[-1]
+        area = np.abs(
+            (x[prev] - avg_x) * (y[lo:hi] - y[prev])
+            - (x[prev] - x[lo:hi]) * (avg_y - y[prev])
+        )
+        prev = lo + int(area.argmax())
+        kept[i + 1] = prev
+    return kept
+
+
+def downsample_line_data(df, val_col, n_out=_LINE_CHART_MAX_POINTS):
+    """Reduce a line-chart frame to n_out visually representative rows (LTTB)."""
+    if len(df) <= n_out:
+        return df
+    y = pd.to_numeric(df[val_col], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+    return df.iloc[np.sort(_lttb_indices(y, n_out))]
+
+
+# Connection tuning for the dashboard's shared read connection
+_DASHBOARD_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-131072",  # ~128MB
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456"
+)
+
+# Indexes backing the Tenders page filters (entity/location ones also exist in the agent's migrations)
+_DASHBOARD_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_tfd_entity ON tenders_full_details(government_entity)",
+    "CREATE INDEX IF NOT EXISTS idx_tfd_type ON tenders_full_details(tender_type)",
+    "CREATE INDEX IF NOT EXISTS idx_tfd_loc ON tenders_full_details(execution_location)",
+    "CREATE INDEX IF NOT EXISTS idx_tfd_deadline ON tenders_full_details(submission_deadline)",
+    "CREATE INDEX IF NOT EXISTS idx_tfd_activity ON tenders_full_details(competition_activity)",
+    "CREATE INDEX IF NOT EXISTS idx_fp_nature ON future_projects(project_nature)"
+)
+
+
+@st.cache_resource
+def _get_conn():
+    """Single SQLite connection shared across reruns and sessions (page cache stays hot)."""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+    for statement in _DASHBOARD_PRAGMAS + _DASHBOARD_INDEXES:
+        try:
+            conn.execute(statement)
+        except sqlite3.Error:
+            pass  # e.g. WAL and indexes need a writable database
+    return conn
+
+
+def _compact_frame(df, category_cols=(), int_cols=(), string_cols=()):
+    """
+    Store repeated strings as category and downcast integer columns (done once, inside the cache).
+
+    string_cols become Arrow-backed strings so substring search runs in Arrow's compute kernels.
+    """
+    for col in category_cols:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    for col in int_cols:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    for col in string_cols:
+        if col in df.columns:
+            df[col] = df[col].astype("string[pyarrow]")
+    return df
+
+
+def _like_pattern(term):
+    """Substring LIKE pattern with % and _ escaped (matched with ESCAPE '\\')."""
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def get_activity_chart_data():
+    """Top competition activities by tender count, aggregated in SQL."""
+    try:
+        return pd.read_sql_query(
+            """
+            SELECT competition_activity AS activity, COUNT(*) AS count
+            FROM tenders_full_details
+            WHERE competition_activity IS NOT NULL
+            GROUP BY competition_activity
+            ORDER BY count DESC
+            LIMIT 15
+            """,
+            _get_conn()
+        )
+    except Exception:
+        return pd.DataFrame(columns=['activity', 'count'])
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def get_nature_chart_data():
+    """Future projects per nature, aggregated in SQL."""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            df = pd.read_sql_query("""
-                SELECT
-                    url as 'الرابط',
-                    tender_name as 'اسم المنافسة',
-                    tender_number as 'رقم المنافسة',
-                    reference_number as 'الرقم المرجعي',
-                    tender_purpose as 'الغرض',
-                    tender_status as 'الحالة',
-                    government_entity as 'الجهة الحكومية',
-                    execution_location as 'مكان التنفيذ',
-                    tender_type as 'نوع المنافسة',
-                    competition_activity as 'النشاط',
-                    submission_deadline as 'موعد التقديم',
-                    opening_date as 'تاريخ الفتح',
-                    tender_document_value as 'قيمة الوثيقة',
-                    contract_duration as 'مدة العقد'
-                FROM tenders_full_details
-                ORDER BY submission_deadline DESC
-            """, conn)
-            return df
+        return pd.read_sql_query(
+            """
+            SELECT project_nature, COUNT(*) AS count
+            FROM future_projects
+            WHERE project_nature IS NOT NULL
+            GROUP BY project_nature
+            ORDER BY count DESC
+            LIMIT 8
+            """,
+            _get_conn()
+        )
+    except Exception:
+        return pd.DataFrame(columns=['project_nature', 'count'])
+
+
+@st.cache_data(ttl=300, show_spinner="جاري تحميل البيانات...")
+def get_tenders_data(search='', entities=(), types=(), regions=()):
+    """
+    Fetch tenders matching the page filters.
+    Filtering runs in SQLite; the cache key is the (hashable) filter tuple.
+    """
+    clauses, params = [], []
+    if search:
+        clauses.append("(tender_name LIKE ? ESCAPE '\\' OR CAST(reference_number AS TEXT) LIKE ? ESCAPE '\\')")
+        params += [_like_pattern(search)] * 2
+    if entities:
+        clauses.append(f"government_entity IN ({','.join('?' * len(entities))})")
+        params += list(entities)
+    if types:
+        clauses.append(f"tender_type IN ({','.join('?' * len(types))})")
+        params += list(types)
+    if regions:
+        clauses.append("(" + " OR ".join(["execution_location LIKE ? ESCAPE '\\'"] * len(regions)) + ")")
+        params += [_like_pattern(r) for r in regions]
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    try:
+        df = pd.read_sql_query(f"""
+            SELECT
+                rowid as '_rowid',
+                url as 'الرابط',
+                tender_name as 'اسم المنافسة',
+                tender_number as 'رقم المنافسة',
+                reference_number as 'الرقم المرجعي',
+                tender_status as 'الحالة',
+                government_entity as 'الجهة الحكومية',
+                tender_type as 'نوع المنافسة',
+                submission_deadline as 'موعد التقديم'
+            FROM tenders_full_details
+            {where}
+            ORDER BY submission_deadline DESC
+        """, _get_conn(), params=params, parse_dates={'موعد التقديم': {'errors': 'coerce'}})
+        return _compact_frame(
+            df,
+            category_cols=('الحالة', 'الجهة الحكومية', 'نوع المنافسة'),
+            int_cols=('_rowid',),
+            string_cols=('الرابط', 'اسم المنافسة', 'رقم المنافسة')
+        )
     except Exception:
         return pd.DataFrame()
 
 
+def get_tender_category_options(column, limit=None):
+    """Fallback filter options: the categories of a column in the cached, unfiltered tenders frame."""
+    df = get_tenders_data()
+    if column not in df.columns:
+        return []
+    return df[column].cat.categories[:limit].tolist()
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_tender_details(rowid):
+    """Fetch the wide/free-text fields of one tender (loaded when its row is selected)."""
+    try:
+        df = pd.read_sql_query("""
+            SELECT
+                tender_purpose as 'الغرض',
+                execution_location as 'مكان التنفيذ',
+                competition_activity as 'النشاط',
+                opening_date as 'تاريخ الفتح',
+                tender_document_value as 'قيمة الوثيقة',
+                contract_duration as 'مدة العقد'
+            FROM tenders_full_details
+            WHERE rowid = ?
+        """, _get_conn(), params=(int(rowid),), parse_dates={'تاريخ الفتح': {'errors': 'coerce'}})
+        return df.iloc[0].to_dict() if not df.empty else {}
+    except Exception:
+        return {}
+
+
+@st.cache_resource(ttl=300, show_spinner="جاري تحميل البيانات...")
 def get_projects_data():
-    """Fetch all future projects data without duration sorting."""
+    """
+    Fetch all future projects data without duration sorting.
+    Shared by reference (no per-rerun copy), so callers must treat the frame as read-only.
+    """
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            df = pd.read_sql_query("""
-                SELECT
-                    id as 'الرقم',
-                    project_name as 'اسم المشروع',
-                    government_entity as 'الجهة',
-                    quarter as 'الربع السنوي',
-                    year as 'السنة',
-                    execution_location as 'مكان التنفيذ',
-                    project_nature as 'طبيعة المشروع',
-                    project_description as 'وصف المشروع',
-                    project_status as 'الحالة',
-                    expected_duration_days as 'المدة (ايام)',
-                    expected_duration_months as 'المدة (اشهر)',
-                    expected_duration_years as 'المدة (سنوات)'
-                FROM future_projects
-                ORDER BY year DESC, quarter DESC
-            """, conn)
-            return df
+        df = pd.read_sql_query("""
+            SELECT
+                id as 'الرقم',
+                project_name as 'اسم المشروع',
+                government_entity as 'الجهة',
+                quarter as 'الربع السنوي',
+                year as 'السنة',
+                execution_location as 'مكان التنفيذ',
+                project_nature as 'طبيعة المشروع',
+                project_description as 'وصف المشروع',
+                project_status as 'الحالة',
+                expected_duration_days as 'المدة (ايام)',
+                expected_duration_months as 'المدة (اشهر)',
+                expected_duration_years as 'المدة (سنوات)'
+            FROM future_projects
+            ORDER BY year DESC, quarter DESC
+        """, _get_conn())
+        df = _compact_frame(
+            df,
+            category_cols=('الجهة', 'الربع السنوي', 'مكان التنفيذ', 'طبيعة المشروع', 'الحالة'),
+            int_cols=('الرقم', 'السنة', 'المدة (ايام)', 'المدة (اشهر)'),
+            string_cols=('اسم المشروع', 'وصف المشروع')
+        )
+        # Keys the caches derived from this frame (see _projects_token)
+        df.attrs['load_token'] = time.time_ns()
+        return df
     except Exception:
         return pd.DataFrame()
 
 
+def _projects_token(df):
+    """Load token of a projects frame; derived caches are keyed on it so a reload never mixes frames."""
+    return df.attrs.get('load_token', 0)
+
+
+@st.cache_resource(ttl=300, show_spinner=False, max_entries=2)
+def _project_search_blob(_df, token):
+    """Lowercased name + description per project, built once per load so search is a single scan."""
+    # Newline joins the fields: a single-line search term cannot match across them
+    blob = _df['اسم المشروع'].fillna('') + '\n' + _df['وصف المشروع'].fillna('')
+    return blob.str.lower().astype("string[pyarrow]")
+
+
+@st.cache_data(ttl=300, show_spinner=False, max_entries=256)
+def get_project_matches(_df, token, search='', years=(), quarters=()):
+    """Row positions of projects matching the page filters (cached per frame load and filter combination)."""
+    df = _df  # Unhashed (keyed by token); the shared frame is never copied or mutated
+    mask = np.ones(len(df), dtype=bool)
+
+    if search:
+        mask &= _project_search_blob(df, token).str.contains(
+            search.lower(), regex=False, na=False
+        ).to_numpy(dtype=bool)
+
+    if years:
+        mask &= df['السنة'].isin(years).to_numpy()
+
+    if quarters:
+        mask &= df['الربع السنوي'].isin(quarters).to_numpy()
+
+    return np.flatnonzero(mask)
+
+
+@st.cache_data(ttl=300, show_spinner=False, max_entries=256)
+def get_project_nature_counts(_df, token, search='', years=(), quarters=(), top=_PIE_MAX_SLICES):
+    """
+    Projects per nature for the filtered rows, top natures only.
+    Natures are free text with a very long tail, so a remainder bucket would
+    swallow most of the pie; the chart shows shares among the top natures.
+    """
+    natures = _df['طبيعة المشروع']
+    if search or years or quarters:
+        natures = natures.iloc[get_project_matches(_df, token, search, years, quarters)]
+    # Categorical value_counts lists every category; keep only the ones present
+    counts = natures.value_counts().loc[lambda c: c > 0].iloc[:top]
+    result = counts.reset_index()
+    result.columns = ['الطبيعة', 'العدد']
+    return result
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_projects_summary():
+    """Counts and filter options derived from the projects frame (computed once per load)."""
+    df = get_projects_data()
+    return {
+        'entities': df['الجهة'].nunique(),
+        'natures': df['طبيعة المشروع'].nunique(),
+        'years': sorted(df['السنة'].dropna().unique().tolist(), reverse=True),
+        'quarters': df['الربع السنوي'].cat.categories.tolist()
+    }
+
+
+@st.cache_resource
+def _agent_executor():
+    """Thread pool running agent queries off the script thread (shared across sessions)."""
+    return ThreadPoolExecutor(max_workers=4)
+
+
+@st.fragment(run_every=1.0)
+def _pending_query_status():
+    """Poll the running agent query; rerun the app once its result is ready."""
+    future = st.session_state.pending_query
+    if future is None:
+        return
+    if future.done():
+        st.session_state.pending_query = None
+        st.session_state.last_result = future.result()
+        st.rerun()
+    st.status("جاري تحليل البيانات...", state="running")
+
+
 # =============================================
 # PAGE 1: HOME (الرئيسية)
 # =============================================
 def render_home_page():
     """Render home page with chat interface."""
 
-    # Info banner
-    st.markdown('''
-    <div class="info-banner">
-        <h4>كيفية استخدام المساعد الذكي</h4>
-        <p>
-            اسال نبهان اي سؤال حول البيانات، مثل: "ما هي اكثر الانشطة طلبا؟" او "كم عدد المناقصات في الرياض؟"
-            سيقوم النظام باستخراج البيانات وتقديم التحليلات المناسبة.
-        </p>
-    </div>
-    ''', unsafe_allow_html=True)
-
-    # Title
-    st.markdown('''
-    <h2 style="font-size: 1.8rem; font-weight: 700; margin: 1.5rem 0;">
-        استعلم عن <span class="text-gradient">المنافسات الحكومية</span>
-    </h2>
-    ''', unsafe_allow_html=True)
+    # Info banner and title
+    st.markdown(_HOME_INTRO_HTML, unsafe_allow_html=True)
 
     # Chat input
     prompt = st.chat_input("اطرح سؤالك هنا...")
 
+    # The query runs in the background; the page (and navigation) stays responsive meanwhile
     if prompt:
-        with st.spinner("جاري تحليل البيانات..."):
-            result = nabahan_agent(prompt, None)
-            st.session_state.last_result = result
+        st.session_state.pending_query = _agent_executor().submit(nabahan_agent, prompt, None)
+
+    if st.session_state.pending_query is not None:
+        _pending_query_status()
 
     # Display results
     if st.session_state.last_result:
@@ -596,13 +938,12 @@ def render_home_page():
             df = result["data"]
             if len(df.columns) >= 2:
                 label_col = df.columns[0]
-                val_col = None
-                for col in df.columns[1:]:
-                    if pd.api.types.is_numeric_dtype(df[col]):
-                        val_col = col
-                        break
+                # First numeric column after the label
+                num_cols = df.iloc[:, 1:].select_dtypes(include='number').columns
+                val_col = num_cols[0] if len(num_cols) else None
 
                 if val_col and result.get("chart_type") != "none":
+                    import plotly.express as px  # Lazy: heavy import, only needed for charts
                     chart_type = result.get("chart_type", "bar")
 
                     if chart_type == "pie":
@@ -615,7 +956,7 @@ def render_home_page():
                         )
                     elif chart_type == "line":
                         fig = px.line(
-                            df,
+                            downsample_line_data(df, val_col),
                             x=label_col,
                             y=val_col,
                             color_discrete_sequence=[PRIMARY_COLOR]
@@ -655,44 +996,17 @@ def render_home_page():
 def render_kpi_cards():
     """Render KPI metric cards."""
     stats = get_kpi_stats()
-
-    col1, col2, col3, col4 = st.columns(4)
-
-    with col1:
-        st.markdown(f'''
-        <div class="kpi-card">
-            <h2>{stats["tenders"]:,}</h2>
-            <p>اجمالي المنافسات</p>
-        </div>
-        ''', unsafe_allow_html=True)
-
-    with col2:
-        st.markdown(f'''
-        <div class="kpi-card">
-            <h2>{stats["projects"]:,}</h2>
-            <p>المشاريع المستقبلية</p>
-        </div>
-        ''', unsafe_allow_html=True)
-
-    with col3:
-        st.markdown(f'''
-        <div class="kpi-card">
-            <h2>{stats["entities"]:,}</h2>
-            <p>الجهات الحكومية</p>
-        </div>
-        ''', unsafe_allow_html=True)
-
-    with col4:
-        st.markdown(f'''
-        <div class="kpi-card">
-            <h2>{stats["activities"]:,}</h2>
-            <p>الانشطة الاساسية</p>
-        </div>
-        ''', unsafe_allow_html=True)
+    render_kpi_row([
+        (stats["tenders"], "اجمالي المنافسات"),
+        (stats["projects"], "المشاريع المستقبلية"),
+        (stats["entities"], "الجهات الحكومية"),
+        (stats["activities"], "الانشطة الاساسية")
+    ])
 
 
 def render_charts():
     """Render default dashboard charts."""
+    import plotly.express as px  # Lazy: heavy import, only needed for charts
     st.subheader("احصائيات السوق العامة")
 
     tab1, tab2 = st.tabs(["انشطة المنافسات", "طبيعة المشاريع"])
@@ -743,23 +1057,19 @@ def render_charts():
 def render_tenders_page():
     """Render tenders page with CSV-based filters."""
 
-    st.markdown('''
-    <h2 style="font-size: 1.8rem; font-weight: 700; margin-bottom: 1.5rem;">
-        <span class="text-gradient">المنافسات الحكومية</span>
-    </h2>
-    ''', unsafe_allow_html=True)
+    st.markdown(_TENDERS_TITLE_HTML, unsafe_allow_html=True)
 
-    # Load data
-    df = get_tenders_data()
+    _tenders_fragment()
 
-    if df.empty:
-        st.warning("لا توجد بيانات متاحة")
-        return
 
-    # Load filter options from CSV files
-    entities_options = load_csv_options("Government Entity.csv")
-    regions_options = load_csv_options("regions.csv")
-    tender_types_options = load_csv_options("tender_types.csv")
+@st.fragment
+def _tenders_fragment():
+    """Search, filters and table; interacting here reruns only this fragment."""
+    # Filter options from the CSV lookups (loaded once per session in init_state)
+    csv_lookup = st.session_state.csv_lookup
+    entities_options = csv_lookup['entities']
+    regions_options = csv_lookup['regions']
+    tender_types_options = csv_lookup['types']
 
     # Search box
     search_term = st.text_input(
@@ -777,14 +1087,14 @@ def render_tenders_page():
     with col1:
         entity_filter = st.multiselect(
             "الجهة الحكومية",
-            options=entities_options[:50] if entities_options else df['الجهة الحكومية'].dropna().unique().tolist()[:50],
+            options=entities_options[:50] if entities_options else get_tender_category_options('الجهة الحكومية', 50),
             placeholder="اختر الجهة"
         )
 
     with col2:
         type_filter = st.multiselect(
             "نوع المنافسة",
-            options=tender_types_options if tender_types_options else df['نوع المنافسة'].dropna().unique().tolist(),
+            options=tender_types_options if tender_types_options else get_tender_category_options('نوع المنافسة'),
             placeholder="اختر النوع"
         )
 
@@ -798,22 +1108,6 @@ def render_tenders_page():
     # Small white clear button
     col_clear, col_space = st.columns([1, 5])
     with col_clear:
-        st.markdown("""
-            <style>
-            .clear-btn-container button {
-                background-color: white !important;
-                color: #666 !important;
-                border: 1px solid #ddd !important;
-                padding: 0.3rem 1rem !important;
-                font-size: 0.85rem !important;
-                border-radius: 6px !important;
-            }
-            .clear-btn-container button:hover {
-                background-color: #f8f8f8 !important;
-                border-color: #bbb !important;
-            }
-            </style>
-        """, unsafe_allow_html=True)
         st.markdown('<div class="clear-btn-container">', unsafe_allow_html=True)
         if st.button("مسح الفلاتر", key="clear_tenders"):
             st.rerun()
@@ -821,43 +1115,31 @@ def render_tenders_page():
 
     st.markdown('</div>', unsafe_allow_html=True)
 
-    # Apply filters
-    filtered_df = df.copy()
+    # Apply filters (in SQLite)
+    filter_key = (search_term.strip(), tuple(entity_filter), tuple(type_filter), tuple(region_filter))
+    filtered_df = get_tenders_data(*filter_key)
 
-    if search_term:
-        mask = (
-            filtered_df['اسم المنافسة'].astype(str).str.contains(search_term, case=False, na=False) |
-            filtered_df['الرقم المرجعي'].astype(str).str.contains(search_term, case=False, na=False)
-        )
-        filtered_df = filtered_df[mask]
+    # Only the first row_limit rows are rendered; a new filter starts again from one page
+    if st.session_state.get('tenders_filter_key') != filter_key:
+        st.session_state.tenders_filter_key = filter_key
+        st.session_state.row_limit = _TENDERS_PAGE_SIZE
+    row_limit = st.session_state.row_limit
 
-    if entity_filter:
-        filtered_df = filtered_df[filtered_df['الجهة الحكومية'].isin(entity_filter)]
-
-    if type_filter:
-        filtered_df = filtered_df[filtered_df['نوع المنافسة'].isin(type_filter)]
-
-    if region_filter:
-        region_mask = filtered_df['مكان التنفيذ'].apply(
-            lambda x: any(r in str(x) for r in region_filter) if pd.notna(x) else False
-        )
-        filtered_df = filtered_df[region_mask]
+    if filtered_df.empty and not (search_term or entity_filter or type_filter or region_filter):
+        st.warning("لا توجد بيانات متاحة")
+        return
 
     # Stats row
     st.markdown(f"**عدد النتائج:** {len(filtered_df):,} منافسة")
 
-    # Format date columns - extract first 10 characters
-    date_cols = ['موعد التقديم', 'تاريخ الفتح']
-    for col in date_cols:
-        if col in filtered_df.columns:
-            filtered_df[col] = filtered_df[col].astype(str).str[:10]
+    shown_df = filtered_df.head(row_limit)
 
     # Calculate dynamic height
-    table_height = calculate_table_height(len(filtered_df))
+    table_height = calculate_table_height(len(shown_df))
 
-    # Display with link column - full width
-    st.dataframe(
-        filtered_df,
+    # Display with link column - full width (select a row for its details)
+    selection = st.dataframe(
+        shown_df,
         column_config={
             "الرابط": st.column_config.LinkColumn(
                 "الرابط",
@@ -868,16 +1150,38 @@ def render_tenders_page():
                 "الرقم المرجعي",
                 format="%d"
             ),
-            "قيمة الوثيقة": st.column_config.NumberColumn(
-                "قيمة الوثيقة",
-                format="%.0f ريال"
-            )
+            "موعد التقديم": st.column_config.DateColumn(
+                "موعد التقديم",
+                format="YYYY-MM-DD"
+            ),
+            "_rowid": None  # Hidden; keys the details lookup
         },
         width='stretch',
         height=table_height,
-        hide_index=True
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key="tenders_table"
     )
 
+    if len(filtered_df) > row_limit:
+        if st.button(f"عرض المزيد ({row_limit:,} من {len(filtered_df):,})", key="tenders_load_more"):
+            st.session_state.row_limit += _TENDERS_PAGE_SIZE
+            st.rerun(scope="fragment")
+
+    # Details of the selected row, fetched on demand
+    selected_rows = selection.selection.rows if selection else []
+    if selected_rows:
+        row = shown_df.iloc[selected_rows[0]]
+        details = get_tender_details(row['_rowid'])
+        with st.expander(f"تفاصيل المنافسة: {row['اسم المنافسة']}", expanded=True):
+            for label, value in details.items():
+                if label == 'تاريخ الفتح' and pd.notna(value):
+                    value = value.strftime('%Y-%m-%d')
+                elif label == 'قيمة الوثيقة' and pd.notna(value):
+                    value = f"{value:,.0f} ريال"
+                st.markdown(f"**{label}:** {value if pd.notna(value) else '-'}")
+
 
 # =============================================
 # PAGE 3: PROJECTS (المشاريع)
@@ -885,11 +1189,7 @@ def render_tenders_page():
 def render_projects_page():
     """Render future projects page without duration sorting."""
 
-    st.markdown('''
-    <h2 style="font-size: 1.8rem; font-weight: 700; margin-bottom: 1.5rem;">
-        <span class="text-gradient">المشاريع المستقبلية</span>
-    </h2>
-    ''', unsafe_allow_html=True)
+    st.markdown(_PROJECTS_TITLE_HTML, unsafe_allow_html=True)
 
     # Load data (no duration sorting)
     df = get_projects_data()
@@ -900,37 +1200,28 @@ def render_projects_page():
 
     # Modern KPI Cards
     stats = get_kpi_stats()
-    unique_entities = df['الجهة'].nunique()
-    unique_natures = df['طبيعة المشروع'].nunique()
+    summary = get_projects_summary()
+    render_kpi_row([
+        (stats["projects"], "اجمالي المشاريع"),
+        (summary['entities'], "الجهات المشاركة"),
+        (summary['natures'], "انواع المشاريع")
+    ], css_class="kpi-modern")
 
-    col1, col2, col3 = st.columns(3)
+    st.write("")
 
-    with col1:
-        st.markdown(f'''
-        <div class="kpi-modern">
-            <h2>{stats["projects"]:,}</h2>
-            <p>اجمالي المشاريع</p>
-        </div>
-        ''', unsafe_allow_html=True)
+    _projects_fragment(df, summary)
 
-    with col2:
-        st.markdown(f'''
-        <div class="kpi-modern">
-            <h2>{unique_entities:,}</h2>
-            <p>الجهات المشاركة</p>
-        </div>
-        ''', unsafe_allow_html=True)
 
-    with col3:
-        st.markdown(f'''
-        <div class="kpi-modern">
-            <h2>{unique_natures:,}</h2>
-            <p>انواع المشاريع</p>
-        </div>
-        ''', unsafe_allow_html=True)
+def _clear_project_filters():
+    """Reset the projects search and filters (runs before the fragment reruns)."""
+    st.session_state.project_search = ""
+    st.session_state.project_years = []
+    st.session_state.project_quarters = []
 
-    st.write("")
 
+@st.fragment
+def _projects_fragment(df, summary):
+    """Search, filters, table and chart; interacting here reruns only this fragment."""
     # Search box
     search_term = st.text_input(
         "البحث",
@@ -943,43 +1234,40 @@ def render_projects_page():
     col1, col2, col3 = st.columns([1, 1, 1])
 
     with col1:
-        years = sorted(df['السنة'].dropna().unique().tolist(), reverse=True)
+        years = summary['years']
         year_filter = st.multiselect(
             "السنة",
             options=years,
-            placeholder="اختر السنة"
+            placeholder="اختر السنة",
+            key="project_years"
         )
 
     with col2:
-        quarters = df['الربع السنوي'].dropna().unique().tolist()
+        quarters = summary['quarters']
         quarter_filter = st.multiselect(
             "الربع السنوي",
             options=quarters,
-            placeholder="اختر الربع"
+            placeholder="اختر الربع",
+            key="project_quarters"
         )
 
     with col3:
         st.write("")  # Spacing to align with dropdowns
         st.markdown('<div class="clear-btn-container">', unsafe_allow_html=True)
-        if st.button("مسح الفلاتر", key="clear_proj_filters"):
-            st.rerun()
+        st.button("مسح الفلاتر", key="clear_proj_filters", on_click=_clear_project_filters)
         st.markdown('</div>', unsafe_allow_html=True)
 
-    # Apply filters
-    filtered_df = df.copy()
-
-    if search_term:
-        mask = (
-            filtered_df['اسم المشروع'].astype(str).str.contains(search_term, case=False, na=False) |
-            filtered_df['وصف المشروع'].astype(str).str.contains(search_term, case=False, na=False)
-        )
-        filtered_df = filtered_df[mask]
-
-    if year_filter:
-        filtered_df = filtered_df[filtered_df['السنة'].isin(year_filter)]
+    # Apply filters (single-character searches are ignored; no filters means no work)
+    search_term = search_term.strip()
+    if len(search_term) < _PROJECT_SEARCH_MIN_CHARS:
+        search_term = ''
 
-    if quarter_filter:
-        filtered_df = filtered_df[filtered_df['الربع السنوي'].isin(quarter_filter)]
+    if search_term or year_filter or quarter_filter:
+        filtered_df = df.iloc[get_project_matches(
+            df, _projects_token(df), search_term, tuple(year_filter), tuple(quarter_filter)
+        )]
+    else:
+        filtered_df = df
 
     # Stats
     st.markdown(f"**عدد النتائج:** {len(filtered_df):,} مشروع")
@@ -1004,12 +1292,14 @@ def render_projects_page():
 
     # Project nature chart
     st.subheader("توزيع المشاريع حسب الطبيعة")
-    nature_counts = filtered_df['طبيعة المشروع'].value_counts().reset_index()
-    nature_counts.columns = ['الطبيعة', 'العدد']
+    nature_counts = get_project_nature_counts(
+        df, _projects_token(df), search_term, tuple(year_filter), tuple(quarter_filter)
+    )
 
     if not nature_counts.empty:
+        import plotly.express as px  # Lazy: heavy import, only needed for charts
         fig = px.pie(
-            nature_counts.head(10),
+            nature_counts,
             names='الطبيعة',
             values='العدد',
             hole=0.4,
@@ -1025,72 +1315,98 @@ def render_projects_page():
 # =============================================
 # PAGE 4: ABOUT (من نحن)
 # =============================================
-def render_about_page():
-    """Render about us page."""
+# Static page markup, emitted as one element per page
+_ABOUT_HTML = '''
+<h2 style="font-size: 1.8rem; font-weight: 700; margin-bottom: 1.5rem;">
+    <span class="text-gradient">من نحن</span>
+</h2>
+
+<div class="about-section">
+    <h3>الرؤية</h3>
+    <p style="font-size: 1.1rem; line-height: 1.8; color: #374151;">
+        ان نكون المنصة الرائدة في تحليل بيانات المشتريات الحكومية في المملكة العربية السعودية،
+        مما يساهم في تعزيز الشفافية وتمكين القطاع الخاص من اتخاذ قرارات استثمارية مبنية على البيانات.
+    </p>
+</div>
 
-    st.markdown('''
-    <h2 style="font-size: 1.8rem; font-weight: 700; margin-bottom: 1.5rem;">
-        <span class="text-gradient">من نحن</span>
-    </h2>
-    ''', unsafe_allow_html=True)
-
-    # Vision
-    st.markdown('''
-    <div class="about-section">
-        <h3>الرؤية</h3>
-        <p style="font-size: 1.1rem; line-height: 1.8; color: #374151;">
-            ان نكون المنصة الرائدة في تحليل بيانات المشتريات الحكومية في المملكة العربية السعودية،
-            مما يساهم في تعزيز الشفافية وتمكين القطاع الخاص من اتخاذ قرارات استثمارية مبنية على البيانات.
+<div class="about-section">
+    <h3>الرسالة</h3>
+    <p style="font-size: 1.1rem; line-height: 1.8; color: #374151;">
+        تقديم حلول ذكية لتحليل بيانات المناقصات والمشاريع الحكومية باستخدام تقنيات الذكاء الاصطناعي،
+        لمساعدة الشركات والمستثمرين في فهم السوق واستكشاف الفرص المتاحة.
+    </p>
+</div>
+
+<div class="about-section">
+    <h3>مميزات المنصة</h3>
+    <ul style="font-size: 1.1rem; line-height: 2; color: #374151; list-style-type: disc; padding-right: 20px;">
+        <li>تحليل ذكي للمناقصات والمشاريع الحكومية</li>
+        <li>استعلامات طبيعية باللغة العربية</li>
+        <li>قاعدة بيانات شاملة ومحدثة</li>
+        <li>تقارير واحصائيات تفاعلية</li>
+        <li>واجهة سهلة الاستخدام</li>
+    </ul>
+</div>
+
+<div class="contact-card" style="max-width: 50%; margin: 0 auto;">
+    <h4>تواصل معنا</h4>
+    <p>للاستفسارات والدعم الفني</p>
+    <p style="font-size: 1.3rem; font-weight: 700; margin-top: 15px;">
+        insight.nabahan@gmail.com
+    </p>
+</div>
+
+<div style="text-align: center; color: #6b7280; font-size: 0.9rem; margin-top: 3rem;">
+    <p>نبهان برو 2026 | جميع الحقوق محفوظة</p>
+</div>
+'''
+
+_CONTACT_HTML = '''
+<h2 style="font-size: 1.8rem; font-weight: 700; margin-bottom: 1.5rem;">
+    <span class="text-gradient">تواصل معنا</span>
+</h2>
+
+<div class="about-section">
+    <h3>نسعد بتواصلكم</h3>
+    <p style="font-size: 1.1rem; line-height: 1.8; color: #374151;">
+        فريق نبهان مستعد دائما للاجابة على استفساراتكم وتقديم الدعم الفني اللازم.
+        لا تترددوا في التواصل معنا عبر القنوات التالية.
+    </p>
+</div>
+
+<div style="display: flex; gap: 1rem;">
+    <div class="contact-card" style="flex: 1;">
+        <h4>البريد الالكتروني</h4>
+        <p style="font-size: 1.3rem; font-weight: 700; margin-top: 15px;">
+            insight.nabahan@gmail.com
         </p>
     </div>
-    ''', unsafe_allow_html=True)
-
-    # Mission
-    st.markdown('''
-    <div class="about-section">
-        <h3>الرسالة</h3>
-        <p style="font-size: 1.1rem; line-height: 1.8; color: #374151;">
-            تقديم حلول ذكية لتحليل بيانات المناقصات والمشاريع الحكومية باستخدام تقنيات الذكاء الاصطناعي،
-            لمساعدة الشركات والمستثمرين في فهم السوق واستكشاف الفرص المتاحة.
+    <div class="contact-card" style="flex: 1;">
+        <h4>الدعم الفني</h4>
+        <p style="font-size: 1.1rem; margin-top: 15px;">
+            متاحون من الاحد الى الخميس
+        </p>
+        <p style="font-size: 1rem;">
+            9 صباحا - 5 مساء
         </p>
     </div>
-    ''', unsafe_allow_html=True)
-
-    # Features
-    st.markdown('''
-    <div class="about-section">
-        <h3>مميزات المنصة</h3>
-        <ul style="font-size: 1.1rem; line-height: 2; color: #374151; list-style-type: disc; padding-right: 20px;">
-            <li>تحليل ذكي للمناقصات والمشاريع الحكومية</li>
-            <li>استعلامات طبيعية باللغة العربية</li>
-            <li>قاعدة بيانات شاملة ومحدثة</li>
-            <li>تقارير واحصائيات تفاعلية</li>
-            <li>واجهة سهلة الاستخدام</li>
-        </ul>
-    </div>
-    ''', unsafe_allow_html=True)
+</div>
 
-    # Contact
-    col1, col2, col3 = st.columns([1, 2, 1])
-    with col2:
-        st.markdown('''
-        <div class="contact-card">
-            <h4>تواصل معنا</h4>
-            <p>للاستفسارات والدعم الفني</p>
-            <p style="font-size: 1.3rem; font-weight: 700; margin-top: 15px;">
-                insight.nabahan@gmail.com
-            </p>
-        </div>
-        ''', unsafe_allow_html=True)
+<div class="about-section" style="margin-top: 3rem;">
+    <h3>الاسئلة الشائعة</h3>
+</div>
+'''
 
-    # Footer info
-    st.write("")
-    st.write("")
-    st.markdown('''
-    <div style="text-align: center; color: #6b7280; font-size: 0.9rem;">
-        <p>نبهان برو 2026 | جميع الحقوق محفوظة</p>
-    </div>
-    ''', unsafe_allow_html=True)
+_PAGE_FOOTER_HTML = '''
+<div style="text-align: center; color: #6b7280; font-size: 0.9rem; margin-top: 1.5rem;">
+    <p>نبهان برو 2026 | جميع الحقوق محفوظة</p>
+</div>
+'''
+
+
+def render_about_page():
+    """Render about us page."""
+    st.markdown(_ABOUT_HTML, unsafe_allow_html=True)
 
 
 # =============================================
@@ -1098,60 +1414,9 @@ def render_about_page():
 # =============================================
 def render_contact_page():
     """Render contact us page."""
+    st.markdown(_CONTACT_HTML, unsafe_allow_html=True)
 
-    st.markdown('''
-    <h2 style="font-size: 1.8rem; font-weight: 700; margin-bottom: 1.5rem;">
-        <span class="text-gradient">تواصل معنا</span>
-    </h2>
-    ''', unsafe_allow_html=True)
-
-    # Contact intro
-    st.markdown('''
-    <div class="about-section">
-        <h3>نسعد بتواصلكم</h3>
-        <p style="font-size: 1.1rem; line-height: 1.8; color: #374151;">
-            فريق نبهان مستعد دائما للاجابة على استفساراتكم وتقديم الدعم الفني اللازم.
-            لا تترددوا في التواصل معنا عبر القنوات التالية.
-        </p>
-    </div>
-    ''', unsafe_allow_html=True)
-
-    # Contact cards
-    col1, col2 = st.columns(2)
-
-    with col1:
-        st.markdown(f'''
-        <div class="contact-card">
-            <h4>البريد الالكتروني</h4>
-            <p style="font-size: 1.3rem; font-weight: 700; margin-top: 15px;">
-                insight.nabahan@gmail.com
-            </p>
-        </div>
-        ''', unsafe_allow_html=True)
-
-    with col2:
-        st.markdown(f'''
-        <div class="contact-card">
-            <h4>الدعم الفني</h4>
-            <p style="font-size: 1.1rem; margin-top: 15px;">
-                متاحون من الاحد الى الخميس
-            </p>
-            <p style="font-size: 1rem;">
-                9 صباحا - 5 مساء
-            </p>
-        </div>
-        ''', unsafe_allow_html=True)
-
-    st.write("")
-    st.write("")
-
-    # FAQ Section
-    st.markdown('''
-    <div class="about-section">
-        <h3>الاسئلة الشائعة</h3>
-    </div>
-    ''', unsafe_allow_html=True)
-
+    # FAQ (expanders are widgets, so they stay separate elements)
     with st.expander("ما هي مصادر البيانات المستخدمة؟"):
         st.write("نستخدم بيانات المشتريات الحكومية المتاحة من منصة اعتماد الرسمية.")
 
@@ -1161,18 +1426,21 @@ def render_contact_page():
     with st.expander("هل البيانات محدثة؟"):
         st.write("نعم، يتم تحديث البيانات بشكل دوري لضمان دقة المعلومات المقدمة.")
 
-    # Footer
-    st.write("")
-    st.markdown('''
-    <div style="text-align: center; color: #6b7280; font-size: 0.9rem;">
-        <p>نبهان برو 2026 | جميع الحقوق محفوظة</p>
-    </div>
-    ''', unsafe_allow_html=True)
+    st.markdown(_PAGE_FOOTER_HTML, unsafe_allow_html=True)
 
 
 # =============================================
 # MAIN APPLICATION
 # =============================================
+# Page key -> render function
+_PAGES = {
+    'home': render_home_page,
+    'tenders': render_tenders_page,
+    'projects': render_projects_page,
+    'about': render_about_page
+}
+
+
 def main():
     """Main application."""
     init_state()
@@ -1181,22 +1449,10 @@ def main():
     render_header()
 
     # Route to current page
-    if st.session_state.current_page == 'home':
-        render_home_page()
-    elif st.session_state.current_page == 'tenders':
-        render_tenders_page()
-    elif st.session_state.current_page == 'projects':
-        render_projects_page()
-    elif st.session_state.current_page == 'about':
-        render_about_page()
+    _PAGES.get(st.session_state.current_page, render_home_page)()
 
     # Footer
-    st.markdown(f'''
-    <br><hr>
-    <p style="text-align: center; color: #6b7280; font-size: 0.9rem;">
-        نبهان برو 2026 | منصة تحليل بيانات المشتريات الحكومية
-    </p>
-    ''', unsafe_allow_html=True)
+    st.markdown(_APP_FOOTER_HTML, unsafe_allow_html=True)
 
 
 if __name__ == "__main__":
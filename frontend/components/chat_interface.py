@@ -2,6 +2,8 @@
 # Chat Interface Component for Nabahan
 # =====================================
 
+import json
+import html
 import streamlit as st
 import pandas as pd
 from typing import Dict, Any, List, Optional, Callable
@@ -195,6 +197,46 @@ def get_chat_css() -> str:
     """
 
 
+# Agent functions by key, so cached responses can be keyed on a plain string
+_AGENTS: Dict[str, Callable] = {}
+
+
+def _filter_key(filters: Optional[Dict]) -> str:
+    """Canonical, hashable form of a filters dict."""
+    return json.dumps(filters or {}, sort_keys=True, ensure_ascii=False, default=str)
+
+
+# Responses worth reusing; errors are usually transient and must not be replayed
+_CACHEABLE_STATUSES = frozenset({"success", "no_data"})
+
+
+class _UncachedResponse(Exception):
+    """Carries an agent response out of _cached_agent so st.cache_data does not store it."""
+
+    def __init__(self, response: Dict[str, Any]):
+        super().__init__(response.get('status'))
+        self.response = response
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _cached_agent(agent_key: str, query: str, filter_key: str) -> Dict[str, Any]:
+    """Agent response for (query, filters), reused for repeated questions."""
+    filters = json.loads(filter_key)
+    response = _AGENTS[agent_key](query, filters if filters else None)
+    if response.get('status') not in _CACHEABLE_STATUSES:
+        raise _UncachedResponse(response)
+    return response
+
+
+# Stylesheet and header emitted as one element per rerun (built once at import)
+_CHAT_SHELL_HTML = get_chat_css() + """
+        <div style="text-align: center; padding: 20px;">
+            <h2 style="color: #1f77b4;">💬 محادثة نبهان</h2>
+            <p style="color: #666;">اسأل نبهان عن أي شيء متعلق بالمناقصات والمشاريع الحكومية</p>
+        </div>
+"""
+
+
 class ChatMessage:
     """Represents a single chat message."""
 
@@ -213,6 +255,14 @@ class ChatMessage:
         self.plot_type = plot_type
         self.sql = sql
         self.status = status
+        self._preview: Optional[pd.DataFrame] = None
+
+    @property
+    def preview(self) -> pd.DataFrame:
+        """First 50 data rows, sliced once on first display."""
+        if self._preview is None:
+            self._preview = self.data.head(50)
+        return self._preview
 
 
 class ChatInterface:
@@ -234,15 +284,14 @@ class ChatInterface:
         """
         self.agent_function = agent_function
         self.filters = filters or {}
-        self._initialize_session_state()
-
-    def _initialize_session_state(self):
-        """Initialize session state for chat history."""
-        if 'chat_messages' not in st.session_state:
-            st.session_state.chat_messages = []
+        self._agent_key = f"{agent_function.__module__}.{agent_function.__qualname__}"
+        _AGENTS[self._agent_key] = agent_function
 
-        if 'processing' not in st.session_state:
-            st.session_state.processing = False
+    @staticmethod
+    def _initialize_session_state():
+        """Initialize session state for chat history (per session; the instance may be shared)."""
+        st.session_state.setdefault('chat_messages', [])
+        st.session_state.setdefault('processing', False)
 
     def add_message(self, message: ChatMessage):
         """Add a message to the chat history."""
@@ -252,8 +301,13 @@ class ChatInterface:
         """Clear chat history."""
         st.session_state.chat_messages = []
 
-    def render_message(self, message: ChatMessage):
-        """Render a single chat message."""
+    def render_message(self, message: ChatMessage, key: Optional[str] = None):
+        """
+        Render a single chat message.
+
+        The data preview is only built when its toggle is on; key makes the toggle unique
+        in the history (without one the preview is not offered).
+        """
         if message.role == "user":
             with st.chat_message("user", avatar="👤"):
                 st.markdown(message.content)
@@ -261,11 +315,11 @@ class ChatInterface:
             with st.chat_message("assistant", avatar="🤖"):
                 st.markdown(message.content)
 
-                # Render data if available
-                if message.data is not None and not message.data.empty:
-                    with st.expander(f"📊 عرض البيانات ({len(message.data)} صف)", expanded=False):
+                # Render data if available (lazily: collapsed previews cost nothing)
+                if key is not None and message.data is not None and not message.data.empty:
+                    if st.toggle(f"📊 عرض البيانات ({len(message.data)} صف)", key=f"chat_data_{key}"):
                         st.dataframe(
-                            message.data.head(50),
+                            message.preview,
                             use_container_width=True
                         )
 
@@ -303,8 +357,11 @@ class ChatInterface:
         Returns:
             ChatMessage with the agent's response
         """
-        # Call the agent function
-        response = self.agent_function(query, self.filters if self.filters else None)
+        # Call the agent function (cached per question and filters, errors excepted)
+        try:
+            response = _cached_agent(self._agent_key, query, _filter_key(self.filters))
+        except _UncachedResponse as e:
+            response = e.response
 
         return ChatMessage(
             role="assistant",
@@ -315,53 +372,39 @@ class ChatInterface:
             status=response.get('status')
         )
 
+    def _answer(self, query: str):
+        """Add a user turn and the agent's reply (drawn by the history fragment afterwards)."""
+        self.add_message(ChatMessage(role="user", content=query))
+
+        # Get and add bot response
+        with st.spinner("نبهان يفكر..."):
+            self.add_message(self.process_query(query))
+
     def render(self):
         """Render the complete chat interface."""
-        # Inject CSS
-        st.markdown(get_chat_css(), unsafe_allow_html=True)
+        self._initialize_session_state()
 
-        # Header
-        st.markdown("""
-        <div style="text-align: center; padding: 20px;">
-            <h2 style="color: #1f77b4;">💬 محادثة نبهان</h2>
-            <p style="color: #666;">اسأل نبهان عن أي شيء متعلق بالمناقصات والمشاريع الحكومية</p>
-        </div>
-        """, unsafe_allow_html=True)
+        # CSS + header (re-sent every rerun: Streamlit drops elements a rerun omits)
+        st.markdown(_CHAT_SHELL_HTML, unsafe_allow_html=True)
 
         # Quick suggestions (only show if no messages)
+        suggestion = None
         if len(st.session_state.chat_messages) == 0:
-            suggestion = self.render_quick_suggestions()
+            suggestions_slot = st.empty()
+            with suggestions_slot.container():
+                suggestion = self.render_quick_suggestions()
             if suggestion:
-                # Add user message
-                user_msg = ChatMessage(role="user", content=suggestion)
-                self.add_message(user_msg)
-
-                # Get and add bot response
-                with st.spinner("نبهان يفكر..."):
-                    bot_msg = self.process_query(suggestion)
-                    self.add_message(bot_msg)
-
-                st.rerun()
+                suggestions_slot.empty()
 
-        # Display chat history
-        for message in st.session_state.chat_messages:
-            self.render_message(message)
-
-        # Chat input
+        # Chat input (pinned to the bottom; read first so a new turn is in the history below)
         user_input = st.chat_input("اكتب سؤالك هنا...")
 
-        if user_input:
-            # Add user message
-            user_msg = ChatMessage(role="user", content=user_input)
-            self.add_message(user_msg)
-            self.render_message(user_msg)
-
-            # Get and add bot response
-            with st.spinner("نبهان يفكر..."):
-                bot_msg = self.process_query(user_input)
-                self.add_message(bot_msg)
+        query = suggestion or user_input
+        if query:
+            self._answer(query)
 
-            st.rerun()
+        # Display chat history, drawn once per run and only by the fragment
+        _render_history(self)
 
         # Clear history button
         if len(st.session_state.chat_messages) > 0:
@@ -372,6 +415,35 @@ class ChatInterface:
                     st.rerun()
 
 
+def _bubble_html(message: ChatMessage) -> str:
+    """One plain-text message as a styled bubble."""
+    css_class = "user-bubble" if message.role == "user" else "bot-bubble"
+    text = html.escape(message.content).replace("\n", "<br>")
+    return f'<div class="message-bubble {css_class}">{text}</div>'
+
+
+@st.fragment
+def _render_history(chat: ChatInterface):
+    """
+    Chat history; toggling a data preview reruns only this fragment.
+
+    Runs of plain messages are emitted as one HTML element; messages carrying data or SQL
+    keep the full chat_message rendering.
+    """
+    bubbles = []
+    for i, message in enumerate(st.session_state.chat_messages):
+        has_data = message.data is not None and not message.data.empty
+        if not has_data and not message.sql:
+            bubbles.append(_bubble_html(message))
+            continue
+        if bubbles:
+            st.markdown("".join(bubbles), unsafe_allow_html=True)
+            bubbles = []
+        chat.render_message(message, key=str(i))
+    if bubbles:
+        st.markdown("".join(bubbles), unsafe_allow_html=True)
+
+
 def render_chat_interface(agent_function: Callable, filters: Optional[Dict] = None):
     """
     Convenience function to render the chat interface.
@@ -380,5 +452,14 @@ def render_chat_interface(agent_function: Callable, filters: Optional[Dict] = No
         agent_function: The function to call for generating responses
         filters: Optional filters to apply to queries
     """
-    chat = ChatInterface(agent_function, filters)
+    chat = _get_chat(agent_function, id(agent_function), _filter_key(filters))
     chat.render()
+
+
+@st.cache_resource(show_spinner=False)
+def _get_chat(_agent_function: Callable, agent_id: int, filter_key: str) -> ChatInterface:
+    """
+    ChatInterface reused across reruns and sessions.
+    It holds no per-user state (history lives in st.session_state), so sharing is safe.
+    """
+    return ChatInterface(_agent_function, json.loads(filter_key))
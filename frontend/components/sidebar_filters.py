@@ -2,13 +2,13 @@
 # Collapsible Sidebar Filters with Hamburger Menu
 # ================================================
 
+from itertools import chain, islice
+
 import streamlit as st
 from typing import Dict, List, Callable, Optional
 
 
-def get_hamburger_css() -> str:
-    """Return CSS for hamburger menu and collapsible sidebar."""
-    return """
+_HAMBURGER_CSS = """
     <style>
         /* Hamburger Button Container */
         .hamburger-container {
@@ -44,16 +44,16 @@ def get_hamburger_css() -> str:
             transition: all 0.3s ease;
         }
 
-        /* Hamburger Animation when open */
-        .hamburger-button.open .hamburger-line:nth-child(1) {
+        /* Hamburger Animation when open (follows the hidden #sb-toggle checkbox) */
+        body:has(#sb-toggle:checked) .hamburger-button .hamburger-line:nth-child(1) {
             transform: rotate(45deg) translate(5px, 5px);
         }
 
-        .hamburger-button.open .hamburger-line:nth-child(2) {
+        body:has(#sb-toggle:checked) .hamburger-button .hamburger-line:nth-child(2) {
             opacity: 0;
         }
 
-        .hamburger-button.open .hamburger-line:nth-child(3) {
+        body:has(#sb-toggle:checked) .hamburger-button .hamburger-line:nth-child(3) {
             transform: rotate(-45deg) translate(7px, -6px);
         }
 
@@ -67,32 +67,35 @@ def get_hamburger_css() -> str:
             background-color: rgba(0, 0, 0, 0.5);
             z-index: 998;
             opacity: 0;
-            visibility: hidden;
-            transition: opacity 0.3s ease, visibility 0.3s ease;
+            pointer-events: none;  /* Hidden overlay must not swallow clicks */
+            transition: opacity 0.3s ease;
+            will-change: opacity;
         }
 
-        .sidebar-overlay.visible {
+        #sb-toggle:checked ~ .sidebar-overlay {
             opacity: 1;
-            visibility: visible;
+            pointer-events: auto;
         }
 
         /* Custom Sidebar Panel */
         .filter-sidebar {
             position: fixed;
             top: 0;
-            left: -350px;
+            left: 0;
             width: 350px;
             height: 100%;
             background-color: #ffffff;
             box-shadow: 2px 0 10px rgba(0, 0, 0, 0.2);
             z-index: 999;
-            transition: left 0.3s ease;
+            transform: translateX(-100%);
+            transition: transform 0.3s ease;  /* Compositor-only; animating left re-lays out every frame */
+            will-change: transform;
             overflow-y: auto;
             direction: rtl;
         }
 
-        .filter-sidebar.open {
-            left: 0;
+        #sb-toggle:checked ~ .filter-sidebar {
+            transform: translateX(0);
         }
 
         /* Sidebar Header */
@@ -211,28 +214,47 @@ def get_hamburger_css() -> str:
     """
 
 
+def get_hamburger_css() -> str:
+    """Return CSS for hamburger menu and collapsible sidebar."""
+    return _HAMBURGER_CSS
+
+
 def render_hamburger_button(is_open: bool = False) -> str:
     """
     Render the hamburger menu button HTML.
 
     Args:
-        is_open: Whether the sidebar is currently open
+        is_open: Kept for compatibility; the open state comes from render_filter_sidebar's checkbox
 
     Returns:
         HTML string for the hamburger button
     """
-    open_class = "open" if is_open else ""
-    return f"""
+    # Open/closed state lives in the #sb-toggle checkbox (see render_filter_sidebar);
+    # the label toggles it with no JavaScript
+    return """
     <div class="hamburger-container">
-        <button class="hamburger-button {open_class}" onclick="toggleSidebar()">
+        <label for="sb-toggle" class="hamburger-button">
             <span class="hamburger-line"></span>
             <span class="hamburger-line"></span>
             <span class="hamburger-line"></span>
-        </button>
+        </label>
     </div>
     """
 
 
+# One filter section; Streamlit multiselects are rendered into the {fid} div
+_SECTION_TPL = (
+    '<div class="filter-section">'
+    '<div class="filter-section-title"><span class="filter-section-icon">{icon}</span>'
+    '<span>{title} {badge}</span></div><div id="{fid}"></div></div>'
+)
+
+
+def _badge(selected: List[str]) -> str:
+    """Count badge for a filter section title (empty when nothing is selected)."""
+    return f'<span class="filter-badge">{len(selected)}</span>' if selected else ''
+
+
 def render_filter_sidebar(
         filter_options: Dict[str, List[str]],
         selected_filters: Dict[str, List[str]],
@@ -249,110 +271,68 @@ def render_filter_sidebar(
     Returns:
         HTML string for the filter sidebar
     """
-    open_class = "open" if is_open else ""
+    if not is_open and not any(selected_filters.values()):
+        return _EMPTY_SIDEBAR
+    return _build_filter_sidebar(filter_options, selected_filters, is_open)
+
+
+def _build_filter_sidebar(
+        filter_options: Dict[str, List[str]],
+        selected_filters: Dict[str, List[str]],
+        is_open: bool
+) -> str:
+    """Build the filter sidebar HTML (see render_filter_sidebar)."""
+    checked = "checked" if is_open else ""
 
     # Count active filters
     active_count = sum(len(v) for v in selected_filters.values() if v)
 
-    # Build filter sections
-    filter_sections = ""
-
-    # Regions
-    regions = filter_options.get('regions', [])
     selected_regions = selected_filters.get('regions', [])
-    region_badge = f'<span class="filter-badge">{len(selected_regions)}</span>' if selected_regions else ''
-    filter_sections += f"""
-    <div class="filter-section">
-        <div class="filter-section-title">
-            <span class="filter-section-icon">📍</span>
-            <span>المناطق {region_badge}</span>
-        </div>
-        <div id="region-filters">
-            <!-- Streamlit multiselect will be rendered here -->
-        </div>
-    </div>
-    """
-
-    # Government Entities
-    entities = filter_options.get('government_entity', [])
     selected_entities = selected_filters.get('government_entity', [])
-    entity_badge = f'<span class="filter-badge">{len(selected_entities)}</span>' if selected_entities else ''
-    filter_sections += f"""
-    <div class="filter-section">
-        <div class="filter-section-title">
-            <span class="filter-section-icon">🏛️</span>
-            <span>الجهات الحكومية {entity_badge}</span>
-        </div>
-        <div id="entity-filters">
-            <!-- Streamlit multiselect will be rendered here -->
-        </div>
-    </div>
-    """
-
-    # Tender Statuses
-    statuses = filter_options.get('tender_statuses', [])
     selected_statuses = selected_filters.get('tender_statuses', [])
-    status_badge = f'<span class="filter-badge">{len(selected_statuses)}</span>' if selected_statuses else ''
-    filter_sections += f"""
-    <div class="filter-section">
-        <div class="filter-section-title">
-            <span class="filter-section-icon">📋</span>
-            <span>حالة المناقصة {status_badge}</span>
-        </div>
-        <div id="status-filters">
-            <!-- Streamlit multiselect will be rendered here -->
-        </div>
-    </div>
-    """
-
-    # Tender Types
-    types = filter_options.get('tender_types', [])
     selected_types = selected_filters.get('tender_types', [])
-    type_badge = f'<span class="filter-badge">{len(selected_types)}</span>' if selected_types else ''
-    filter_sections += f"""
-    <div class="filter-section">
-        <div class="filter-section-title">
-            <span class="filter-section-icon">📑</span>
-            <span>نوع المناقصة {type_badge}</span>
-        </div>
-        <div id="type-filters">
-            <!-- Streamlit multiselect will be rendered here -->
-        </div>
-    </div>
-    """
+
+    # Build filter sections
+    configs = (
+        {"icon": "📍", "title": "المناطق", "badge": _badge(selected_regions), "fid": "region-filters"},
+        {"icon": "🏛️", "title": "الجهات الحكومية", "badge": _badge(selected_entities), "fid": "entity-filters"},
+        {"icon": "📋", "title": "حالة المناقصة", "badge": _badge(selected_statuses), "fid": "status-filters"},
+        {"icon": "📑", "title": "نوع المناقصة", "badge": _badge(selected_types), "fid": "type-filters"},
+    )
+    sections_html = "".join(_SECTION_TPL.format_map(c) for c in configs)
 
     # Active filters summary
     active_summary = ""
     if active_count > 0:
-        tags = ""
-        for region in selected_regions:
-            tags += f'<span class="active-filter-tag">{region}</span>'
-        for entity in selected_entities[:3]:
-            tags += f'<span class="active-filter-tag">{entity[:20]}...</span>'
-        for status in selected_statuses:
-            tags += f'<span class="active-filter-tag">{status}</span>'
-        for t in selected_types:
-            tags += f'<span class="active-filter-tag">{t}</span>'
+        # Entity names are long: preview the first three, truncated
+        labels = chain(
+            selected_regions,
+            (f"{entity[:20]}..." for entity in islice(selected_entities, 3)),
+            selected_statuses,
+            selected_types
+        )
+        tags_html = "".join(f'<span class="active-filter-tag">{label}</span>' for label in labels)
 
         active_summary = f"""
         <div class="active-filters-summary">
             <h4>✓ الفلاتر النشطة ({active_count})</h4>
-            {tags}
+            {tags_html}
         </div>
         """
 
     return f"""
-    <div class="sidebar-overlay {'visible' if is_open else ''}" onclick="toggleSidebar()"></div>
-    <div class="filter-sidebar {open_class}">
+    <input type="checkbox" id="sb-toggle" hidden {checked}>
+    <label for="sb-toggle" class="sidebar-overlay"></label>
+    <div class="filter-sidebar">
         <div class="sidebar-header">
-            <button class="close-sidebar-btn" onclick="toggleSidebar()">×</button>
+            <label for="sb-toggle" class="close-sidebar-btn">×</label>
             <h2>☰ فلاتر البحث</h2>
             <p>تصفية وتخصيص النتائج</p>
         </div>
 
         {active_summary}
 
-        {filter_sections}
+        {sections_html}
 
         <button class="clear-filters-btn" onclick="clearAllFilters()">
             🗑️ مسح جميع الفلاتر
@@ -361,44 +341,47 @@ def render_filter_sidebar(
     """
 
 
-def get_sidebar_js() -> str:
-    """Return JavaScript for sidebar interactions."""
-    return """
-    <script>
-        function toggleSidebar() {
-            const sidebar = document.querySelector('.filter-sidebar');
-            const overlay = document.querySelector('.sidebar-overlay');
-            const hamburger = document.querySelector('.hamburger-button');
+# Closed sidebar with no active filters: the common case, built once
+_EMPTY_SIDEBAR = _build_filter_sidebar({}, {}, False)
 
-            if (sidebar) {
-                sidebar.classList.toggle('open');
-            }
-            if (overlay) {
-                overlay.classList.toggle('visible');
-            }
-            if (hamburger) {
-                hamburger.classList.toggle('open');
-            }
-        }
-
-        function clearAllFilters() {
-            // Trigger Streamlit to clear filters
-            window.parent.postMessage({type: 'streamlit:clearFilters'}, '*');
-        }
 
-        // Close sidebar on escape key
-        document.addEventListener('keydown', function(e) {
-            if (e.key === 'Escape') {
-                const sidebar = document.querySelector('.filter-sidebar');
-                if (sidebar && sidebar.classList.contains('open')) {
-                    toggleSidebar();
+_SIDEBAR_JS = """
+    <script>
+        // Set up once, however often Streamlit re-injects this script
+        if (!window.__nabahanSidebarInit) {
+            window.__nabahanSidebarInit = true;
+
+            window.clearAllFilters = function() {
+                // Trigger Streamlit to clear filters
+                window.parent.postMessage({type: 'streamlit:clearFilters'}, '*');
+            };
+
+            // Close sidebar on escape key
+            document.addEventListener('keydown', function(e) {
+                const toggle = document.getElementById('sb-toggle');
+                if (e.key === 'Escape' && toggle && toggle.checked) {
+                    toggle.checked = false;
                 }
-            }
-        });
+            });
+        }
     </script>
     """
 
 
+def get_sidebar_js() -> str:
+    """Return JavaScript for sidebar interactions."""
+    return _SIDEBAR_JS
+
+
+# Sidebar stylesheet and header, emitted as one element per rerun
+_SIDEBAR_SHELL_HTML = _HAMBURGER_CSS + """
+            <div style="text-align: center; padding: 20px; background: linear-gradient(135deg, #1f77b4 0%, #0d47a1 100%); color: white; margin: -1rem -1rem 1rem -1rem; border-radius: 0;">
+                <h2 style="margin: 0;">☰ فلاتر البحث</h2>
+                <p style="margin: 5px 0 0 0; opacity: 0.8;">تصفية وتخصيص النتائج</p>
+            </div>
+"""
+
+
 class SidebarFilters:
     """
     A reusable class for managing collapsible sidebar filters.
@@ -411,7 +394,9 @@ class SidebarFilters:
         Args:
             filter_options: Dictionary of available filter options
         """
-        self.filter_options = filter_options
+        # Tuples: immutable option lists, built once instead of per rerun
+        self.filter_options = {k: tuple(v) for k, v in filter_options.items()}
+        self._entities_top100 = self.filter_options.get('government_entity', ())[:100]
         self._initialize_session_state()
 
     def _initialize_session_state(self):
@@ -434,25 +419,18 @@ class SidebarFilters:
         Returns:
             Dictionary of selected filter values
         """
-        # Inject CSS
-        st.markdown(get_hamburger_css(), unsafe_allow_html=True)
-
         # Render hamburger button (handled by Streamlit's native sidebar toggle)
         # The actual filtering is done in the Streamlit sidebar
 
         with st.sidebar:
-            st.markdown("""
-            <div style="text-align: center; padding: 20px; background: linear-gradient(135deg, #1f77b4 0%, #0d47a1 100%); color: white; margin: -1rem -1rem 1rem -1rem; border-radius: 0;">
-                <h2 style="margin: 0;">☰ فلاتر البحث</h2>
-                <p style="margin: 5px 0 0 0; opacity: 0.8;">تصفية وتخصيص النتائج</p>
-            </div>
-            """, unsafe_allow_html=True)
+            # CSS + header in one element
+            st.markdown(_SIDEBAR_SHELL_HTML, unsafe_allow_html=True)
 
             # Region filter
             st.markdown("##### 📍 المناطق")
             selected_regions = st.multiselect(
                 "اختر المناطق",
-                options=self.filter_options.get('regions', []),
+                options=self.filter_options.get('regions', ()),
                 default=st.session_state.selected_filters.get('regions', []),
                 key='filter_regions',
                 label_visibility="collapsed"
@@ -463,7 +441,7 @@ class SidebarFilters:
 
             # Government entity filter
             st.markdown("##### 🏛️ الجهات الحكومية")
-            entities = self.filter_options.get('government_entity', [])[:100]
+            entities = self._entities_top100
             selected_entities = st.multiselect(
                 "اختر الجهات",
                 options=entities,
@@ -479,7 +457,7 @@ class SidebarFilters:
             st.markdown("##### 📋 حالة المناقصة")
             selected_statuses = st.multiselect(
                 "اختر الحالات",
-                options=self.filter_options.get('tender_statuses', []),
+                options=self.filter_options.get('tender_statuses', ()),
                 default=st.session_state.selected_filters.get('tender_statuses', []),
                 key='filter_statuses',
                 label_visibility="collapsed"
@@ -492,7 +470,7 @@ class SidebarFilters:
             st.markdown("##### 📑 نوع المناقصة")
             selected_types = st.multiselect(
                 "اختر الأنواع",
-                options=self.filter_options.get('tender_types', []),
+                options=self.filter_options.get('tender_types', ()),
                 default=st.session_state.selected_filters.get('tender_types', []),
                 key='filter_types',
                 label_visibility="collapsed"
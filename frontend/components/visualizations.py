@@ -2,16 +2,21 @@
 # Visualization Components for Nabahan Dashboard
 # ===============================================
 
+import hashlib
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
-from typing import Optional, List, Dict, Any
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, NamedTuple, Union
 
+try:
+    import xxhash
+except ImportError:  # Optional: falls back to hashlib.blake2b
+    xxhash = None
 
-def get_visualization_css() -> str:
-    """Return CSS styles for visualizations."""
-    return """
+
+_VIZ_CSS = """
     <style>
         /* Chart Container */
         .chart-container {
@@ -86,6 +91,42 @@ def get_visualization_css() -> str:
     """
 
 
+def get_visualization_css() -> str:
+    """Return CSS styles for visualizations."""
+    return _VIZ_CSS
+
+
+def _frame_key(df: pd.DataFrame):
+    """Cheap, content-based cache key for a chart's DataFrame (row order matters)."""
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()
+    if xxhash is not None:
+        digest = xxhash.xxh3_64_intdigest(row_hashes)
+    else:
+        digest = hashlib.blake2b(row_hashes, digest_size=8).hexdigest()
+    return df.shape, tuple(df.columns), digest
+
+
+def _trace_groups(data: pd.DataFrame, color_col: Optional[str]):
+    """(name, rows) per trace: one per color_col value in order of appearance, else the whole frame."""
+    if color_col is None:
+        return [(None, data)]
+    return [(str(name), group) for name, group in data.groupby(color_col, sort=False, observed=True)]
+
+
+# Figures are rebuilt only when their data or options change
+_cache_figure = st.cache_data(show_spinner=False, max_entries=64, hash_funcs={pd.DataFrame: _frame_key})
+
+
+# Shared Plotly layout settings
+_BASE_LAYOUT = dict(
+    font=dict(family="Arial", size=12),
+    title_font_size=16,
+    margin=dict(l=20, r=20, t=60, b=20)
+)
+_TRANSPARENT_BG = dict(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
+_AXIS_GRID = dict(showgrid=True, gridwidth=1, gridcolor='#f0f0f0')
+
+
 # Color palette for consistent styling
 COLOR_PALETTE = [
     '#1f77b4',  # Blue
@@ -101,6 +142,7 @@ COLOR_PALETTE = [
 ]
 
 
+@_cache_figure
 def render_bar_chart(
         data: pd.DataFrame,
         x_col: str,
@@ -125,41 +167,37 @@ def render_bar_chart(
     Returns:
         Plotly Figure object
     """
-    if orientation == 'h':
-        fig = px.bar(
-            data,
-            x=y_col,
-            y=x_col,
-            orientation='h',
-            color=color_col,
-            color_discrete_sequence=COLOR_PALETTE,
-            title=title
-        )
-    else:
-        fig = px.bar(
-            data,
-            x=x_col,
-            y=y_col,
-            color=color_col,
-            color_discrete_sequence=COLOR_PALETTE,
-            title=title
-        )
+    horizontal = orientation == 'h'
+    traces = []
+    for i, (name, group) in enumerate(_trace_groups(data, color_col)):
+        labels, values = group[x_col].to_numpy(), group[y_col].to_numpy()
+        traces.append(go.Bar(
+            x=values if horizontal else labels,
+            y=labels if horizontal else values,
+            orientation=orientation,
+            name=name,
+            marker_color=COLOR_PALETTE[i % len(COLOR_PALETTE)]
+        ))
+
+    fig = go.Figure(data=traces)
+    fig.update_layout(
+        **_BASE_LAYOUT,
+        **_TRANSPARENT_BG,
+        title=title,
+        barmode='relative',
+        xaxis_title=y_col if horizontal else x_col,
+        yaxis_title=x_col if horizontal else y_col,
+        legend_title_text=color_col,
+        showlegend=color_col is not None
+    )
 
     if show_values:
         fig.update_traces(texttemplate='%{value:,.0f}', textposition='outside')
 
-    fig.update_layout(
-        font=dict(family="Arial", size=12),
-        title_font_size=16,
-        showlegend=color_col is not None,
-        margin=dict(l=20, r=20, t=60, b=20),
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)'
-    )
-
     return fig
 
 
+@_cache_figure
 def render_pie_chart(
         data: pd.DataFrame,
         names_col: str,
@@ -180,29 +218,23 @@ def render_pie_chart(
     Returns:
         Plotly Figure object
     """
-    fig = px.pie(
-        data,
-        names=names_col,
-        values=values_col,
-        title=title,
+    fig = go.Figure(data=[go.Pie(
+        labels=data[names_col].to_numpy(),
+        values=data[values_col].to_numpy(),
         hole=hole,
-        color_discrete_sequence=COLOR_PALETTE
-    )
+        marker_colors=COLOR_PALETTE
+    )])
+    fig.update_layout(**_BASE_LAYOUT, title=title)
 
     fig.update_traces(
         textposition='inside',
         textinfo='percent+label'
     )
 
-    fig.update_layout(
-        font=dict(family="Arial", size=12),
-        title_font_size=16,
-        margin=dict(l=20, r=20, t=60, b=20)
-    )
-
     return fig
 
 
+@_cache_figure
 def render_line_chart(
         data: pd.DataFrame,
         x_col: str,
@@ -225,25 +257,25 @@ def render_line_chart(
     Returns:
         Plotly Figure object
     """
-    fig = px.line(
-        data,
-        x=x_col,
-        y=y_col,
-        color=color_col,
-        markers=markers,
-        title=title,
-        color_discrete_sequence=COLOR_PALETTE
-    )
-
+    mode = 'lines+markers' if markers else 'lines'
+    fig = go.Figure(data=[
+        go.Scatter(
+            x=group[x_col].to_numpy(),
+            y=group[y_col].to_numpy(),
+            mode=mode,
+            name=name,
+            line_color=COLOR_PALETTE[i % len(COLOR_PALETTE)]
+        )
+        for i, (name, group) in enumerate(_trace_groups(data, color_col))
+    ])
     fig.update_layout(
-        font=dict(family="Arial", size=12),
-        title_font_size=16,
+        **_BASE_LAYOUT,
+        **_TRANSPARENT_BG,
+        title=title,
+        legend_title_text=color_col,
         showlegend=color_col is not None,
-        margin=dict(l=20, r=20, t=60, b=20),
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        xaxis=dict(showgrid=True, gridwidth=1, gridcolor='#f0f0f0'),
-        yaxis=dict(showgrid=True, gridwidth=1, gridcolor='#f0f0f0')
+        xaxis=dict(_AXIS_GRID, title_text=x_col),
+        yaxis=dict(_AXIS_GRID, title_text=y_col)
     )
 
     return fig
@@ -268,6 +300,19 @@ def render_metric_card(
         prefix: Prefix for the value (e.g., "$")
         suffix: Suffix for the value (e.g., "%")
     """
+    st.markdown(_metric_card_html(value, label, delta, delta_label, prefix, suffix), unsafe_allow_html=True)
+
+
+@lru_cache(maxsize=256)
+def _metric_card_html(
+        value: Any,
+        label: str,
+        delta: Optional[float] = None,
+        delta_label: str = "",
+        prefix: str = "",
+        suffix: str = ""
+) -> str:
+    """Metric card markup (memoised: unchanged KPIs cost a dict lookup per rerun)."""
     formatted_value = f"{prefix}{value:,}{suffix}" if isinstance(value, (int, float)) else f"{prefix}{value}{suffix}"
 
     delta_html = ""
@@ -276,13 +321,16 @@ def render_metric_card(
         delta_sign = "+" if delta >= 0 else ""
         delta_html = f'<div class="{delta_class}">{delta_sign}{delta:,.1f}% {delta_label}</div>'
 
-    st.markdown(f"""
+    return _METRIC_CARD_TMPL.format(value=formatted_value, label=label, delta_html=delta_html)
+
+
+_METRIC_CARD_TMPL = """
     <div class="metric-card">
-        <div class="metric-value">{formatted_value}</div>
+        <div class="metric-value">{value}</div>
         <div class="metric-label">{label}</div>
         {delta_html}
     </div>
-    """, unsafe_allow_html=True)
+    """
 
 
 def render_data_table(
@@ -313,17 +361,37 @@ def render_data_table(
         st.markdown(f'<div class="chart-title">{title}</div>', unsafe_allow_html=True)
 
     st.dataframe(
-        data.head(max_rows),
+        data.iloc[:max_rows],
         use_container_width=True,
         height=height
     )
 
 
+# Simple charts up to this many rows may use Streamlit's native (Vega-Lite) charts
+NATIVE_CHART_MAX_ROWS = 50
+
+
+class NativeChart(NamedTuple):
+    """A single-series chart for st.bar_chart / st.line_chart."""
+    plot_type: str  # "Bar" or "Line"
+    series: pd.Series  # Values indexed by label
+    horizontal: bool = False
+
+
+def render_native_chart(chart: NativeChart):
+    """Render a NativeChart with Streamlit's built-in charts."""
+    if chart.plot_type == "Line":
+        st.line_chart(chart.series)
+    else:
+        st.bar_chart(chart.series, horizontal=chart.horizontal)
+
+
 def auto_visualize(
         data: pd.DataFrame,
         plot_type: str = "auto",
-        title: str = ""
-) -> Optional[go.Figure]:
+        title: str = "",
+        allow_native: bool = False
+) -> Optional[Union[go.Figure, NativeChart]]:
     """
     Automatically create the best visualization for the data.
 
@@ -331,16 +399,19 @@ def auto_visualize(
         data: DataFrame to visualize
         plot_type: Type of plot ("Bar", "Pie", "Line", "auto")
         title: Chart title
+        allow_native: Return a NativeChart for small untitled bar/line charts instead of
+                      building a Plotly figure
 
     Returns:
-        Plotly Figure or None
+        Plotly Figure, NativeChart or None
     """
     if data.empty or len(data.columns) < 1:
         return None
 
-    # Identify column types
-    numeric_cols = data.select_dtypes(include=['number']).columns.tolist()
-    categorical_cols = data.select_dtypes(include=['object', 'category']).columns.tolist()
+    # Identify column types in one pass over the dtypes (category/string dtypes report kind 'O')
+    kinds = list(zip(data.columns, (dtype.kind for dtype in data.dtypes)))
+    numeric_cols = [c for c, k in kinds if k in 'iufc']
+    categorical_cols = [c for c, k in kinds if k in 'OUS']
 
     if len(data.columns) < 2:
         return None
@@ -358,10 +429,16 @@ def auto_visualize(
         else:
             plot_type = "Bar"
 
-    # Create the appropriate chart
+    # Create the appropriate chart (bar and pie only need the leading rows)
+    top_rows = data.iloc[:20]
+    # Native charts need a distinct index column (an all-numeric frame has x_col == y_col)
+    if (allow_native and not title and x_col != y_col
+            and plot_type in ("Bar", "Line") and len(data) < NATIVE_CHART_MAX_ROWS):
+        rows = top_rows if plot_type == "Bar" else data
+        return NativeChart(plot_type, rows.set_index(x_col)[y_col], horizontal=len(data) > 5)
     if plot_type == "Bar":
         return render_bar_chart(
-            data.head(20),
+            top_rows,
             x_col=x_col,
             y_col=y_col,
             title=title,
@@ -369,7 +446,7 @@ def auto_visualize(
         )
     elif plot_type == "Pie":
         return render_pie_chart(
-            data.head(10),
+            top_rows.iloc[:10],
             names_col=x_col,
             values_col=y_col,
             title=title
@@ -393,18 +470,64 @@ def render_dashboard_metrics(metrics: List[Dict[str, Any]]):
         metrics: List of metric dictionaries with keys:
                  value, label, delta (optional), prefix (optional), suffix (optional)
     """
-    cols = st.columns(len(metrics))
+    htmls = [
+        _metric_card_html(
+            metric.get('value', 0),
+            metric.get('label', ''),
+            metric.get('delta'),
+            metric.get('delta_label', ''),
+            metric.get('prefix', ''),
+            metric.get('suffix', '')
+        )
+        for metric in metrics
+    ]
+
+    for col, html in zip(st.columns(len(metrics)), htmls):
+        with col:
+            st.markdown(html, unsafe_allow_html=True)
+
+
+def render_dashboard_metrics_vec(
+        values: List[Any],
+        labels: List[str],
+        deltas: np.ndarray,
+        prefixes: Optional[List[str]] = None,
+        suffixes: Optional[List[str]] = None,
+        delta_label: str = ""
+):
+    """
+    Render a row of metric cards from parallel arrays.
+
+    Delta sign, class and text are formatted for the whole row at once;
+    a NaN delta renders no delta line. Use render_metric_card for one tile.
+    """
+    n = len(values)
+    prefixes = prefixes or [""] * n
+    suffixes = suffixes or [""] * n
+
+    deltas = np.asarray(deltas, dtype=np.float64)
+    positive = deltas >= 0
+    delta_html = np.char.add(
+        np.char.add('<div class="', np.where(positive, 'metric-delta-positive', 'metric-delta-negative')),
+        np.char.add(
+            np.char.add('">', np.where(positive, '+', '')),
+            np.char.add(np.char.mod('%.1f', deltas), f'% {delta_label}</div>')
+        )
+    )
+    delta_html = np.where(np.isnan(deltas), '', delta_html)
+
+    htmls = [
+        _METRIC_CARD_TMPL.format(
+            value=f"{prefix}{value:,}{suffix}" if isinstance(value, (int, float)) else f"{prefix}{value}{suffix}",
+            label=label,
+            delta_html=delta
+        )
+        for value, label, delta, prefix, suffix in zip(values, labels, delta_html.tolist(), prefixes, suffixes)
+    ]
 
-    for i, metric in enumerate(metrics):
-        with cols[i]:
-            render_metric_card(
-                value=metric.get('value', 0),
-                label=metric.get('label', ''),
-                delta=metric.get('delta'),
-                delta_label=metric.get('delta_label', ''),
-                prefix=metric.get('prefix', ''),
-                suffix=metric.get('suffix', '')
-            )
+    for col, html in zip(st.columns(n), htmls):
+        with col:
+            st.markdown(html, unsafe_allow_html=True)
 
 
 def render_chart_with_options(
@@ -436,9 +559,11 @@ def render_chart_with_options(
         )
 
     # Render chart
-    fig = auto_visualize(data, plot_type=chart_type)
-    if fig:
-        st.plotly_chart(fig, use_container_width=True)
+    chart = auto_visualize(data, plot_type=chart_type, allow_native=True)
+    if isinstance(chart, NativeChart):
+        render_native_chart(chart)
+    elif chart:
+        st.plotly_chart(chart, use_container_width=True)
 
 
 class DashboardSection: